@@ -0,0 +1,70 @@
+"""
+python -m bench run --sizes 10k,100k,1M -o bench.json
+python -m bench compare baseline.json bench.json
+python -m bench run --sizes 100k --baseline baseline.json   # run and compare in one go
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+
+from bench.harness import CASES, compare, parse_size, run_suite
+
+def _print_comparison(rows, file=None) -> bool:
+    regressed = False
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else "ok"
+        regressed |= r["regression"]
+        print(f"{r['case']:<32} {r['rows']:>10,} rows  time x{r['time_ratio']:.2f}  memory x{r['memory_ratio']:.2f}  {flag}", file=file)
+    return regressed
+
+def _load(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench", description="Benchmarks on synthetic messy data.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the suite and write results JSON")
+    run.add_argument("--sizes", default="10k,100k,1M", help="comma separated row counts, e.g. 10k,1M,10M")
+    run.add_argument("--cols", type=int, default=10)
+    run.add_argument("--repeat", type=int, default=3, help="timed runs per case; the best is kept")
+    run.add_argument("--cases", help=f"comma separated case names or prefixes (default: all of {', '.join(CASES)})")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--data-dir", help="where generated CSVs are kept (default: temp dir)")
+    run.add_argument("-o", "--output", help="results JSON file (default: stdout)")
+    run.add_argument("--baseline", help="compare against this results file and exit 1 on regression")
+    run.add_argument("--time-tolerance", type=float, default=0.2)
+    run.add_argument("--memory-tolerance", type=float, default=0.2)
+
+    cmp_ = sub.add_parser("compare", help="compare two results files; exit 1 on regression")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--time-tolerance", type=float, default=0.2)
+    cmp_.add_argument("--memory-tolerance", type=float, default=0.2)
+
+    args = p.parse_args(argv)
+    if args.command == "run":
+        sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+        cases = args.cases.split(",") if args.cases else None
+        doc = run_suite(sizes, cols=args.cols, repeat=args.repeat, cases=cases, seed=args.seed,
+                        data_dir=args.data_dir, log=lambda line: print(line, file=sys.stderr))
+        text = json.dumps(doc, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        if not args.baseline:
+            return 0
+        baseline, current = _load(args.baseline), doc
+    else:
+        baseline, current = _load(args.baseline), _load(args.current)
+    rows = compare(baseline, current, args.time_tolerance, args.memory_tolerance)
+    # With results on stdout, keep the comparison off it
+    out = sys.stderr if args.command == "run" and not args.output else sys.stdout
+    return 1 if _print_comparison(rows, file=out) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
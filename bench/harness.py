@@ -0,0 +1,194 @@
+"""
+Benchmark harness. Every case runs on a synthetic CSV from bench.synth at
+each requested size; wall time is the best of several runs and peak memory
+comes from a separate tracemalloc run, so tracing never slows the timings.
+Results are plain JSON so runs can be saved and compared.
+"""
+from __future__ import annotations
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+
+from bench.synth import write_messy
+from core.io import load_csv
+from radar import memo, plots, recipes
+from radar.dq_checks import basic_profile
+from radar.neardup import near_duplicate_summary
+from radar.pipeline import Pipeline
+from radar.repair import auto_repair
+
+RESULTS_VERSION = 1
+_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+def parse_size(text: str) -> int:
+    """
+    "10k" -> 10_000, "1M" -> 1_000_000, "2500" -> 2500.
+    """
+    text = text.strip().lower().replace("_", "")
+    if text[-1:] in _SUFFIXES:
+        return int(float(text[:-1]) * _SUFFIXES[text[-1]])
+    return int(text)
+
+def _columns(df: pd.DataFrame, kind: str) -> List[str]:
+    return [c for c in df.columns if c.startswith(kind + "_")]
+
+def _cases() -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    """
+    Case name -> function of the context (path, df). Each call gets a fresh
+    shallow copy of df so per-frame caches never carry over between runs.
+    """
+    def fl(ctx):
+        return _columns(ctx["df"], "float")
+
+    def cat(ctx):
+        return _columns(ctx["df"], "category")
+
+    return {
+        "load_csv": lambda ctx: load_csv(ctx["path"]),
+        "basic_profile": lambda ctx: basic_profile(ctx["df"]),
+        "auto_repair": lambda ctx: auto_repair(ctx["df"]),
+        "near_duplicates": lambda ctx: near_duplicate_summary(ctx["df"]),
+        "recipes.impute_mode": lambda ctx: recipes.impute_mode(ctx["df"], cat(ctx)),
+        "recipes.impute_group_median": lambda ctx: recipes.impute_group_median(ctx["df"], fl(ctx)[0], cat(ctx)[:1]),
+        "recipes.impute_grouped": lambda ctx: recipes.impute_grouped(ctx["df"], fl(ctx), cat(ctx)[:2]),
+        "recipes.add_known_indicator": lambda ctx: recipes.add_known_indicator(ctx["df"], fl(ctx)[0]),
+        "recipes.winsorize_iqr": lambda ctx: recipes.winsorize_iqr(ctx["df"], fl(ctx)),
+        "pipeline.run": lambda ctx: Pipeline().impute_mode(cat(ctx)).impute_grouped(fl(ctx), cat(ctx)[:1])
+                                              .winsorize_iqr(fl(ctx)).run(ctx["df"]),
+        "plots.hist": lambda ctx: plots.figure_png(plots.plot_hist, ctx["df"][fl(ctx)[0]]),
+        "plots.bar_counts": lambda ctx: plots.figure_png(plots.plot_bar_counts, ctx["df"][cat(ctx)[0]]),
+        "plots.group_mean": lambda ctx: plots.figure_png(plots.plot_group_mean, ctx["df"], cat(ctx)[0], fl(ctx)[0]),
+        "plots.scatter_colored": lambda ctx: plots.figure_png(plots.plot_scatter_colored, ctx["df"], fl(ctx)[0], fl(ctx)[1],
+                                                              cat(ctx)[0]),
+        "plots.corr_heatmap": lambda ctx: plots.figure_png(plots.plot_corr_heatmap, ctx["df"]),
+    }
+
+CASES = tuple(_cases())
+
+def _select(patterns: Sequence[str] | None) -> List[str]:
+    if not patterns:
+        return list(CASES)
+    # A pattern names a case or a group prefix such as "recipes" or "plots."
+    return [c for c in CASES if any(c == p or c.startswith(p.rstrip(".") + ".") for p in patterns)]
+
+def _fresh(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    memo.CACHE.clear()
+    return dict(ctx, df=ctx["df"].copy(deep=False))
+
+def _measure(func: Callable, ctx: Dict[str, Any], repeat: int) -> Tuple[List[float], int]:
+    runs = []
+    for _ in range(repeat):
+        run_ctx = _fresh(ctx)
+        t0 = time.perf_counter()
+        func(run_ctx)
+        runs.append(time.perf_counter() - t0)
+    run_ctx = _fresh(ctx)
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        func(run_ctx)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return runs, int(peak)
+
+def dataset_path(data_dir: str, rows: int, cols: int, seed: int) -> str:
+    """
+    Generated CSVs are kept and reused across runs; the name pins every
+    generator argument that changes the content.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"messy_{rows}x{cols}_s{seed}.csv")
+    if not os.path.exists(path):
+        tmp = path + ".part"
+        write_messy(tmp, rows, cols=cols, seed=seed)
+        os.replace(tmp, path)
+    return path
+
+def default_data_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), "dqr-bench")
+
+def run_suite(sizes: Sequence[int], cols: int = 10, repeat: int = 3, cases: Sequence[str] | None = None,
+              seed: int = 0, data_dir: str | None = None, log: Callable[[str], None] | None = None) -> Dict[str, Any]:
+    """
+    Run the selected cases at every size. Returns the results document:
+    {"version", "meta", "results": [{"case", "rows", "cols", "seconds",
+    "runs", "peak_bytes"}, ...]} with seconds the best of repeat runs.
+    """
+    data_dir = data_dir or default_data_dir()
+    table = _cases()
+    selected = _select(cases)
+    results = []
+    for rows in sizes:
+        path = dataset_path(data_dir, rows, cols, seed)
+        ctx = {"path": path, "df": load_csv(path)}
+        for name in selected:
+            runs, peak = _measure(table[name], ctx, repeat)
+            results.append({
+                "case": name,
+                "rows": rows,
+                "cols": cols,
+                "seconds": min(runs),
+                "runs": runs,
+                "peak_bytes": peak,
+            })
+            if log:
+                log(f"{name:<32} {rows:>10,} rows  {min(runs):9.4f} s  {peak / 1e6:9.1f} MB")
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], time_tolerance: float = 0.2,
+            memory_tolerance: float = 0.2, min_seconds: float = 0.005) -> List[Dict[str, Any]]:
+    """
+    One row per (case, rows, cols) present in both documents, with the
+    current/baseline ratios and a "regression" flag: slower by more than
+    time_tolerance (and by more than min_seconds, which filters timer noise
+    on tiny cases) or peak memory up by more than memory_tolerance.
+    """
+    for doc in (baseline, current):
+        if doc.get("version") != RESULTS_VERSION:
+            raise ValueError(f"unsupported results version {doc.get('version')!r}")
+    base = {(r["case"], r["rows"], r["cols"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get((r["case"], r["rows"], r["cols"]))
+        if b is None:
+            continue
+        time_ratio = r["seconds"] / b["seconds"] if b["seconds"] else float("inf")
+        mem_ratio = r["peak_bytes"] / b["peak_bytes"] if b["peak_bytes"] else 1.0
+        slower = time_ratio > 1 + time_tolerance and r["seconds"] - b["seconds"] > min_seconds
+        bigger = mem_ratio > 1 + memory_tolerance
+        rows.append({
+            "case": r["case"],
+            "rows": r["rows"],
+            "cols": r["cols"],
+            "seconds": r["seconds"],
+            "baseline_seconds": b["seconds"],
+            "time_ratio": time_ratio,
+            "peak_bytes": r["peak_bytes"],
+            "baseline_peak_bytes": b["peak_bytes"],
+            "memory_ratio": mem_ratio,
+            "regression": slower or bigger,
+        })
+    return rows
@@ -0,0 +1,93 @@
+"""
+Synthetic messy tables shaped like the uploads the app sees: numeric,
+integer, low-cardinality text and date-string columns, with tunable rates of
+missing cells, exact duplicate rows and outliers. Everything derives from
+one seed, so the same arguments always give the same frame.
+"""
+from __future__ import annotations
+from typing import Dict, Any, List
+import numpy as np
+import pandas as pd
+
+DEFAULT_MIX = {"float": 0.4, "int": 0.2, "category": 0.3, "date": 0.1}
+_COUNTRIES = np.array(["IN", "US", "GB", "DE", "FR", "BR", "JP", "NG", "CA", "AU", "MX", "ES"])
+
+def _column_kinds(cols: int, mix: Dict[str, float]) -> list:
+    kinds = [k for k in mix if mix[k] > 0]
+    weights = np.array([mix[k] for k in kinds], dtype=float)
+    counts = np.floor(weights / weights.sum() * cols).astype(int)
+    # Hand the remainder to the largest shares first
+    for i in np.argsort(-weights)[: cols - counts.sum()]:
+        counts[i] += 1
+    return [k for k, c in zip(kinds, counts) for _ in range(c)]
+
+def _schema(cols: int, mix: Dict[str, float], seed: int) -> List[Dict[str, Any]]:
+    """
+    Per-column parameters, drawn once so every chunk of a large file shares them.
+    """
+    rng = np.random.default_rng([seed, 0])
+    schema = []
+    counters: Dict[str, int] = {}
+    for kind in _column_kinds(cols, mix):
+        i = counters[kind] = counters.get(kind, -1) + 1
+        col: Dict[str, Any] = {"name": f"{kind}_{i}", "kind": kind}
+        if kind == "float":
+            col.update(loc=rng.uniform(-100, 100), scale=rng.uniform(1, 50))
+        elif kind == "int":
+            col.update(lam=rng.uniform(1, 20))
+        elif kind == "category":
+            col["pool"] = _COUNTRIES if i == 0 else np.array([f"{col['name']}_v{j}" for j in range(int(rng.integers(3, 60)))])
+        schema.append(col)
+    return schema
+
+def _generate(schema, rows: int, missing_rate: float, duplicate_rate: float, outlier_rate: float, rng) -> pd.DataFrame:
+    n_dup = int(rows * duplicate_rate) if rows > 1 else 0
+    targets = rng.choice(rows, n_dup, replace=False)
+    sources = rng.integers(0, rows, n_dup)
+    data = {}
+    for col in schema:
+        kind = col["kind"]
+        if kind == "float":
+            values = rng.normal(col["loc"], col["scale"], rows).round(2)
+            out = rng.random(rows) < outlier_rate
+            values[out] *= rng.choice([-25.0, 25.0], out.sum())
+            values[rng.random(rows) < missing_rate] = np.nan
+        elif kind == "int":
+            values = rng.poisson(col["lam"], rows).astype(np.int64)
+            out = rng.random(rows) < outlier_rate
+            values[out] += rng.integers(1_000, 10_000, out.sum())
+        elif kind == "category":
+            values = col["pool"][rng.zipf(1.6, rows) % len(col["pool"])].astype(object)
+            values[rng.random(rows) < missing_rate] = None
+        else:
+            days = rng.integers(0, 3 * 365, rows)
+            values = (np.datetime64("2022-01-01") + days.astype("timedelta64[D]")).astype(str).astype(object)
+            values[rng.random(rows) < missing_rate] = None
+        # Duplicates copy whole rows, so every column takes the same positions
+        values[targets] = values[sources]
+        data[col["name"]] = values
+    return pd.DataFrame(data)
+
+def make_messy(rows: int, cols: int = 10, mix: Dict[str, float] | None = None, missing_rate: float = 0.05,
+               duplicate_rate: float = 0.02, outlier_rate: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    """
+    A rows x cols frame. mix gives the share of "float", "int", "category"
+    and "date" columns; missing_rate is per cell (not applied to int columns,
+    which stay integer), duplicate_rate the share of rows replaced by a copy
+    of another row, outlier_rate the share of numeric cells pushed far out.
+    """
+    schema = _schema(cols, mix or DEFAULT_MIX, seed)
+    return _generate(schema, rows, missing_rate, duplicate_rate, outlier_rate, np.random.default_rng([seed, 1]))
+
+def write_messy(path: str, rows: int, cols: int = 10, mix: Dict[str, float] | None = None, missing_rate: float = 0.05,
+                duplicate_rate: float = 0.02, outlier_rate: float = 0.01, seed: int = 0, chunk: int = 1_000_000) -> str:
+    """
+    Same kind of table written straight to CSV in row chunks, so 10M rows
+    never sit in memory at once. Duplicates are drawn within each chunk.
+    """
+    schema = _schema(cols, mix or DEFAULT_MIX, seed)
+    for n, start in enumerate(range(0, max(rows, 1), chunk)):
+        rng = np.random.default_rng([seed, 1, n])
+        part = _generate(schema, min(chunk, rows - start), missing_rate, duplicate_rate, outlier_rate, rng)
+        part.to_csv(path, mode="w" if n == 0 else "a", header=n == 0, index=False)
+    return path
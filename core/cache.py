@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from core.compact import compact_dtypes
+from core.io import load_csv, source_format, _has_pyarrow, _part_files
+from core.trace import traced
+
+# Bump when the on-disk layout changes so stale entries are never read.
+_CACHE_VERSION = 1
+_HASH_BLOCK = 1 << 22
+
+def default_cache_dir() -> str:
+    return os.environ.get("DQR_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "dqr-cache")
+
+def default_cache_bytes() -> int:
+    return int(os.environ.get("DQR_CACHE_BYTES", 2 * 1024 ** 3))
+
+def content_key(uploaded_file, **load_kwargs) -> str:
+    """
+    Hash of the raw bytes plus the loader options, so changing an option
+    such as encoding_fallbacks or engine maps to a different entry. A
+    directory or glob of partitions is keyed by its sorted member paths with
+    their sizes and modification times instead of their bytes.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    if source_format(uploaded_file) == "partitions":
+        members = []
+        for path in _part_files(os.fspath(uploaded_file)):
+            st = os.stat(path)
+            members.append((path, st.st_size, st.st_mtime_ns))
+        h.update(json.dumps([os.fspath(uploaded_file), members]).encode("utf-8"))
+    elif hasattr(uploaded_file, "getbuffer"):
+        h.update(uploaded_file.getbuffer())
+    elif hasattr(uploaded_file, "read"):
+        uploaded_file.seek(0)
+        for block in iter(lambda: uploaded_file.read(_HASH_BLOCK), b""):
+            h.update(block)
+        uploaded_file.seek(0)
+    else:
+        with open(uploaded_file, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                h.update(block)
+    opts = {k: list(v) if isinstance(v, tuple) else v for k, v in sorted(load_kwargs.items())}
+    h.update(json.dumps([_CACHE_VERSION, pd.__version__, opts], default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def _write_npy(df: pd.DataFrame, path: str) -> None:
+    meta = {"columns": [str(c) for c in df.columns], "dtypes": [str(t) for t in df.dtypes], "mapped": []}
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        mapped = isinstance(s.dtype, np.dtype) and s.dtype != object
+        values = s.to_numpy() if mapped else s.to_numpy(dtype=object)
+        np.save(os.path.join(path, f"{i}.npy"), values, allow_pickle=not mapped)
+        meta["mapped"].append(mapped)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+def _read_npy(path: str) -> pd.DataFrame:
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    data = {}
+    for i, (col, dtype, mapped) in enumerate(zip(meta["columns"], meta["dtypes"], meta["mapped"])):
+        file = os.path.join(path, f"{i}.npy")
+        if mapped:
+            # Copy-on-write mapping: pages load lazily and edits never reach disk
+            data[col] = pd.Series(np.load(file, mmap_mode="c"))
+        else:
+            data[col] = pd.Series(np.load(file, allow_pickle=True), dtype=dtype)
+    return pd.DataFrame(data)
+
+def _entry_size(path: str) -> int:
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+def evict(cache_dir: str | None = None, max_bytes: int | None = None) -> int:
+    """
+    Delete least recently used entries until the cache fits max_bytes.
+    Returns the number of entries removed.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    max_bytes = default_cache_bytes() if max_bytes is None else max_bytes
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for e in os.scandir(cache_dir):
+        if e.is_dir() and not e.name.startswith("."):
+            entries.append((e.stat().st_mtime, _entry_size(e.path), e.path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+def invalidate(key: str | None = None, cache_dir: str | None = None) -> None:
+    """
+    Drop one entry, or the whole cache when key is None.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    target = os.path.join(cache_dir, key) if key else cache_dir
+    shutil.rmtree(target, ignore_errors=True)
+
+@traced
+def cached_load_csv(uploaded_file, cache_dir: str | None = None, max_bytes: int | None = None,
+                    compact: bool = False, **load_kwargs) -> pd.DataFrame:
+    """
+    load_csv backed by a content-addressed columnar cache on disk. Entries are
+    Arrow IPC (Feather) files when pyarrow is installed, else one .npy per column.
+    compact=True runs core.compact.compact_dtypes before caching; the frame's
+    attrs (source dtypes, memory report) are cached alongside.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    key = content_key(uploaded_file, **load_kwargs, **({"compact": True} if compact else {}))
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry):
+        try:
+            if os.path.exists(os.path.join(entry, "data.feather")):
+                df = pd.read_feather(os.path.join(entry, "data.feather"))
+            else:
+                df = _read_npy(entry)
+            if os.path.exists(os.path.join(entry, "attrs.json")):
+                with open(os.path.join(entry, "attrs.json"), encoding="utf-8") as f:
+                    df.attrs.update(json.load(f))
+            os.utime(entry)
+            return df
+        except Exception:
+            # Corrupt or unreadable entry: rebuild it below
+            invalidate(key, cache_dir)
+
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    df = load_csv(uploaded_file, **load_kwargs)
+    if compact:
+        df, _ = compact_dtypes(df)
+    tmp = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=cache_dir)
+        if _has_pyarrow():
+            df.to_feather(os.path.join(tmp, "data.feather"), compression="uncompressed")
+        else:
+            _write_npy(df, tmp)
+        if df.attrs:
+            with open(os.path.join(tmp, "attrs.json"), "w", encoding="utf-8") as f:
+                json.dump(df.attrs, f, default=str)
+        os.replace(tmp, entry)
+        evict(cache_dir, max_bytes)
+    except Exception:
+        # Columns arrow cannot store (mixed objects) or a full disk: just skip caching
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return df
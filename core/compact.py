@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from core.io import _has_pyarrow
+
+# df.attrs key holding the dtypes a column had before compact_dtypes, so
+# profiles keep reporting the dtype the CSV was parsed with.
+SOURCE_DTYPES = "source_dtypes"
+MEMORY_REPORT = "memory_report"
+
+def _mixed_nulls(values: np.ndarray) -> bool:
+    # Converting would merge None and NaN, which duplicated() tells apart
+    nulls = values[pd.isna(values)]
+    return len({type(v) for v in nulls}) > 1
+
+def _compact_column(s: pd.Series, max_category_ratio: float, arrow: bool):
+    if pd.api.types.is_integer_dtype(s.dtype) and isinstance(s.dtype, np.dtype):
+        small = pd.to_numeric(s, downcast="integer")
+        return small if small.dtype.itemsize < s.dtype.itemsize else None
+    if isinstance(s.dtype, pd.StringDtype):
+        text = True
+    elif s.dtype == object:
+        values = s.to_numpy()
+        text = pd.api.types.infer_dtype(values, skipna=True) == "string" and not _mixed_nulls(values)
+    else:
+        # Floats stay float64: pandas accumulates float32 reductions in float32
+        return None
+    if not text:
+        return None
+    n = s.notna().sum()
+    if n and s.nunique(dropna=True) <= max_category_ratio * n:
+        return s.astype("category")
+    if arrow and s.dtype == object:
+        return s.astype("string[pyarrow]")
+    return None
+
+def compact_dtypes(df: pd.DataFrame, max_category_ratio: float = 0.5, arrow_strings: bool | None = None):
+    """
+    Shrink a freshly loaded frame without changing any value:
+    - integer columns are downcast to the smallest integer type that holds them
+    - string columns with at most max_category_ratio distinct values per
+      non-null value become category, the rest Arrow-backed strings when
+      pyarrow is installed
+    Returns the compacted frame and a per-column memory report; both the
+    report and the original dtypes are also kept in the frame's attrs.
+    """
+    if arrow_strings is None:
+        arrow_strings = _has_pyarrow()
+    out = df.copy(deep=False)
+    source = dict(df.attrs.get(SOURCE_DTYPES, {}))
+    report = []
+    for i, col in enumerate(df.columns):
+        s = df.iloc[:, i]
+        before = int(s.memory_usage(index=False, deep=True))
+        small = _compact_column(s, max_category_ratio, arrow_strings)
+        if small is not None:
+            out.isetitem(i, small)
+            source.setdefault(str(col), str(s.dtype))
+        after = int(small.memory_usage(index=False, deep=True)) if small is not None else before
+        report.append({
+            "column": col,
+            "dtype_before": str(s.dtype),
+            "dtype_after": str(small.dtype) if small is not None else str(s.dtype),
+            "bytes_before": before,
+            "bytes_after": after,
+        })
+    out.attrs[SOURCE_DTYPES] = source
+    out.attrs[MEMORY_REPORT] = report
+    return out, report
@@ -1,21 +1,458 @@
+import codecs
+import contextlib
+import glob
+import gzip
+import importlib.util
 import io
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
-def load_csv(uploaded_file, encoding_fallbacks=("utf-8", "latin-1")) -> pd.DataFrame:
+from core.trace import traced
+
+# Bytes inspected up front to pick an encoding before any parsing happens.
+_SAMPLE_BYTES = 1 << 20
+# Files picked from a directory of partitions
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+_MAGIC = ((b"\x1f\x8b", "gzip"), (b"\x28\xb5\x2f\xfd", "zstd"), (b"PK\x03\x04", "zip"))
+# Threads parsing partitions or byte ranges; pandas' tokenizer releases the GIL
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+# Smallest byte range handed to a parser thread
+_MIN_BLOCK = 1 << 20
+
+def _has_pyarrow() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _has_zstandard() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+def _rewind(uploaded_file) -> None:
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+
+def _read_sample(uploaded_file, size: int = _SAMPLE_BYTES) -> bytes:
+    if hasattr(uploaded_file, "read"):
+        _rewind(uploaded_file)
+        sample = uploaded_file.read(size)
+        _rewind(uploaded_file)
+        return sample
+    with open(uploaded_file, "rb") as f:
+        return f.read(size)
+
+def _is_path(source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+def source_format(source) -> str:
     """
-    Read a CSV from a Streamlit UploadedFile or a file path with simple robustness.
+    "csv", "gzip", "zstd" or "zip" from a file's leading bytes, or
+    "partitions" for a directory or a glob pattern.
     """
-    if hasattr(uploaded_file, "read"):
-        raw = uploaded_file.read()
+    if _is_path(source):
+        path = os.fspath(source)
+        if os.path.isdir(path) or (not os.path.exists(path) and glob.has_magic(path)):
+            return "partitions"
+    head = _read_sample(source, 4)
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return "csv"
+
+def source_name(source) -> str:
+    """
+    File or directory name without its CSV, compression or zip suffixes;
+    "" for a file object without a name.
+    """
+    name = getattr(source, "name", None) or (os.fspath(source) if _is_path(source) else "")
+    if not name:
+        return ""
+    name = os.path.basename(os.path.normpath(str(name)))
+    for suffix in (".zip", ".gz", ".zst", ".csv"):
+        if name.lower().endswith(suffix):
+            name = name[:-len(suffix)]
+    return name
+
+class _Borrowed(io.RawIOBase):
+    """
+    Reads through to a stream owned by someone else. pyarrow closes the file
+    it wraps when its stream is dropped; closing this view leaves raw open.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._raw.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+def _zstd_reader(raw):
+    if _has_zstandard():
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+    if _has_pyarrow():
+        import pyarrow as pa
+        return pa.CompressedInputStream(pa.PythonFile(_Borrowed(raw), mode="r"), "zstd")
+    raise ImportError("zstd input needs the zstandard package or pyarrow")
+
+class _Decompressed(io.RawIOBase):
+    """
+    Read-only stream over a gzip or zstd source, decompressed as it is read.
+    The only seek it supports is back to the start, which restarts the
+    decompressor; that covers the encoding retries and pyarrow's re-read.
+    """
+
+    def __init__(self, raw, method: str):
+        self._raw = raw
+        self._method = method
+        self._restart()
+
+    def _restart(self) -> None:
+        self._raw.seek(0)
+        if self._method == "gzip":
+            self._reader = gzip.GzipFile(fileobj=self._raw, mode="rb")
+        else:
+            self._reader = _zstd_reader(self._raw)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._reader.read(len(b))
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET and offset == 0:
+            self._restart()
+        elif not (whence == io.SEEK_CUR and offset == 0):
+            raise io.UnsupportedOperation("compressed input can only be rewound")
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+def _part_files(pattern_or_dir: str):
+    if os.path.isdir(pattern_or_dir):
+        found = [
+            f for f in glob.glob(os.path.join(pattern_or_dir, "**", "*"), recursive=True)
+            if os.path.isfile(f) and f.lower().endswith(CSV_SUFFIXES)
+        ]
     else:
-        with open(uploaded_file, "rb") as f:
-            raw = f.read()
+        found = [f for f in glob.glob(pattern_or_dir, recursive=True) if os.path.isfile(f)]
+    return sorted(found)
 
-    last_err = None
+@contextlib.contextmanager
+def _partitions(source):
+    """
+    The CSV partitions behind source, in order: the source itself, the CSV
+    members of a zip (as (ZipFile, member) pairs), or the files under a
+    directory or matching a glob. Zip archives stay open until exit.
+    """
+    fmt = source_format(source)
+    if fmt == "partitions":
+        parts = _part_files(os.fspath(source))
+        if not parts:
+            raise FileNotFoundError(f"no CSV files in {os.fspath(source)}")
+        yield parts
+    elif fmt == "zip":
+        _rewind(source)
+        # ZipFile serializes member reads on a lock, so parts can be read from several threads
+        with zipfile.ZipFile(source) as zf:
+            members = sorted(
+                i.filename for i in zf.infolist()
+                if not i.is_dir() and not i.filename.startswith("__MACOSX/")
+                and i.filename.lower().endswith(CSV_SUFFIXES)
+            )
+            if not members:
+                raise FileNotFoundError(f"no CSV files in {source_name(source)}.zip")
+            yield [(zf, m) for m in members]
+    else:
+        yield [source]
+
+def _part_name(part) -> str:
+    if isinstance(part, tuple):
+        return part[1]
+    return str(getattr(part, "name", None) or os.fspath(part))
+
+@contextlib.contextmanager
+def _open_part(part, keep_path: bool = False):
+    """
+    A readable binary stream of one partition's CSV text, decompressed on the
+    fly. keep_path hands plain CSV paths back unopened so they can be mapped.
+    """
+    with contextlib.ExitStack() as stack:
+        if isinstance(part, tuple):
+            raw = stack.enter_context(part[0].open(part[1]))
+        elif hasattr(part, "read"):
+            _rewind(part)
+            raw = part
+        else:
+            raw = stack.enter_context(open(part, "rb"))
+        fmt = source_format(raw)
+        if fmt == "zip":
+            raise ValueError(f"{_part_name(part)}: zip archives inside a partitioned input are not supported")
+        if fmt == "csv":
+            if keep_path and _is_path(part):
+                stack.close()
+                yield part
+            else:
+                _rewind(raw)
+                yield raw
+        else:
+            yield _Decompressed(raw, fmt)
+
+def _align(frame: pd.DataFrame, columns, part) -> pd.DataFrame:
+    """
+    Partitions must share their columns; a different order is fixed up.
+    """
+    if list(frame.columns) == list(columns):
+        return frame
+    if len(frame.columns) == len(columns) and set(frame.columns) == set(columns) and not columns.has_duplicates:
+        return frame[list(columns)]
+    raise ValueError(f"{_part_name(part)} has columns {list(frame.columns)}, "
+                     f"but the first partition has {list(columns)}")
+
+def detect_encoding(sample: bytes, encoding_fallbacks=("utf-8", "latin-1")) -> str:
+    """
+    Return the first encoding that decodes the sample cleanly. A multi-byte
+    character cut off at the end of the sample is not treated as an error.
+    """
     for enc in encoding_fallbacks:
         try:
-            return pd.read_csv(io.BytesIO(raw), encoding=enc)
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+            return enc
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return encoding_fallbacks[-1]
+
+def _encoding_order(uploaded_file, encoding_fallbacks):
+    first = detect_encoding(_read_sample(uploaded_file), encoding_fallbacks)
+    return [first] + [e for e in encoding_fallbacks if e != first]
+
+def _read_c(uploaded_file, encoding: str) -> pd.DataFrame:
+    _rewind(uploaded_file)
+    # Paths are memory-mapped; file objects are parsed in place without .read()
+    return pd.read_csv(uploaded_file, encoding=encoding, memory_map=not hasattr(uploaded_file, "read"))
+
+def _read_pyarrow(uploaded_file, encoding: str) -> pd.DataFrame:
+    """
+    Multithreaded parse. pyarrow infers dates and timestamps where the C
+    engine keeps text, so those columns are re-read as text to keep the
+    frame identical apart from correctly rounded floats.
+    """
+    _rewind(uploaded_file)
+    df = pd.read_csv(uploaded_file, encoding=encoding, engine="pyarrow")
+    inferred = {c: pd.api.types.infer_dtype(df[c], skipna=True) for c in df.columns if df[c].dtype == object}
+    if "bytes" in inferred.values():
+        # pyarrow keeps undecodable text as binary instead of raising
+        raise ValueError(f"CSV is not valid {encoding}")
+    if not len(df):
+        # A header-only file gives float64 columns under pyarrow and object ones under C
+        return df.astype(object)
+    temporal = [
+        c for c in df.columns
+        if pd.api.types.is_datetime64_any_dtype(df[c]) or inferred.get(c) in ("date", "time", "datetime")
+    ]
+    if temporal:
+        _rewind(uploaded_file)
+        text = pd.read_csv(uploaded_file, encoding=encoding, usecols=temporal)
+        for c in temporal:
+            df[c] = text[c]
+    return df
+
+def _load_one(uploaded_file, encoding_fallbacks, engine: str, fallback: bool = True) -> pd.DataFrame:
+    last_err = None
+    for enc in _encoding_order(uploaded_file, encoding_fallbacks):
+        try:
+            if engine == "pyarrow":
+                try:
+                    return _read_pyarrow(uploaded_file, enc)
+                except Exception:
+                    # Anything pyarrow rejects gets the more lenient C parser
+                    if not fallback:
+                        raise
+            return _read_c(uploaded_file, enc)
         except Exception as e:
             last_err = e
             continue
     raise last_err
+
+def _load_part(part, encoding_fallbacks, engine: str, fallback: bool = True) -> pd.DataFrame:
+    with _open_part(part, keep_path=True) as f:
+        return _load_one(f, encoding_fallbacks, engine, fallback)
+
+def _load_parts(parts, encoding_fallbacks, engine: str, workers: int):
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda p: _load_part(p, encoding_fallbacks, engine, fallback=False), parts))
+    return [_load_part(p, encoding_fallbacks, engine, fallback=False) for p in parts]
+
+@traced
+def load_csv(uploaded_file, encoding_fallbacks=("utf-8", "latin-1"), engine: str | None = None,
+             workers: int | None = None) -> pd.DataFrame:
+    """
+    Read a CSV from a Streamlit UploadedFile or a file path with simple robustness.
+    The encoding is picked from a byte sample before parsing, so a latin-1 file is
+    parsed once. engine defaults to "pyarrow" when installed, else "c".
+    gzip and zstd files are decompressed as they are parsed. A zip, a directory
+    or a glob of CSV partitions is read as one frame, up to workers partitions
+    at a time (default PARSE_WORKERS); partitions must share their columns.
+    All partitions go through the same engine: if pyarrow rejects one, every
+    partition is read again with the C parser.
+    """
+    if engine is None:
+        engine = "pyarrow" if _has_pyarrow() else "c"
+    workers = PARSE_WORKERS if workers is None else workers
+
+    with _partitions(uploaded_file) as parts:
+        if len(parts) == 1:
+            return _load_part(parts[0], encoding_fallbacks, engine)
+        try:
+            frames = _load_parts(parts, encoding_fallbacks, engine, workers)
+        except Exception:
+            # Mixing engines could type the same column differently across partitions
+            if engine != "pyarrow":
+                raise
+            frames = _load_parts(parts, encoding_fallbacks, "c", workers)
+    columns = frames[0].columns
+    frames = [_align(frame, columns, part) for frame, part in zip(frames, parts)]
+    return pd.concat(frames, ignore_index=True)
+
+def _first_row_end(buf) -> int:
+    # A newline inside a quoted field doesn't end a row: the quotes before it must pair up
+    end = buf.find(b"\n")
+    while end >= 0 and buf.count(b'"', 0, end) % 2:
+        end = buf.find(b"\n", end + 1)
+    return end + 1
+
+def _last_row_end(buf) -> int:
+    end = buf.rfind(b"\n")
+    if end < 0:
+        return 0
+    quotes = buf.count(b'"', 0, end)
+    while quotes % 2:
+        prev = buf.rfind(b"\n", 0, end)
+        if prev < 0:
+            return 0
+        quotes -= buf.count(b'"', prev, end)
+        end = prev
+    return end + 1
+
+def _blocks(f, chunksize: int):
+    """
+    (header, rows) byte pairs covering one CSV stream. Each rows block holds
+    about chunksize rows, judging by the first megabyte, and ends on a row end.
+    """
+    buf = bytearray(f.read(_SAMPLE_BYTES))
+    eof = not buf
+    cut = _first_row_end(buf)
+    while not cut and not eof:
+        more = f.read(_SAMPLE_BYTES)
+        eof = not more
+        buf += more
+        cut = _first_row_end(buf)
+    if not buf:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    cut = cut or len(buf)
+    header = bytes(buf[:cut])
+    del buf[:cut]
+    row_bytes = len(buf) / max(buf.count(b"\n"), 1) if buf else 1.0
+    size = max(_MIN_BLOCK, int(chunksize * row_bytes))
+    while buf or not eof:
+        while not eof and len(buf) < size:
+            more = f.read(size - len(buf))
+            eof = not more
+            buf += more
+        end = len(buf) if eof else _last_row_end(buf)
+        if not end:
+            # One row longer than the block
+            size *= 2
+            continue
+        if buf[:end].strip():
+            yield header, bytes(buf[:end])
+        del buf[:end]
+
+def _parse_block(header: bytes, rows: bytes, encoding: str, usecols) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(header + rows), encoding=encoding, usecols=usecols)
+
+def _serial_frames(parts, encoding: str, chunksize: int, usecols):
+    for part in parts:
+        with _open_part(part) as f:
+            for chunk in pd.read_csv(f, encoding=encoding, chunksize=chunksize, usecols=usecols):
+                yield part, chunk
+
+def _parallel_frames(parts, encoding: str, chunksize: int, usecols, workers: int):
+    """
+    Partitions are read and cut into row-aligned byte ranges on the calling
+    thread while the pool parses the ranges; frames come back in file order
+    with at most 2 * workers ranges in flight.
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for part in parts:
+                with _open_part(part) as f:
+                    for header, rows in _blocks(f, chunksize):
+                        pending.append((part, pool.submit(_parse_block, header, rows, encoding, usecols)))
+                        while len(pending) > 2 * workers:
+                            done, fut = pending.popleft()
+                            yield done, fut.result()
+            while pending:
+                done, fut = pending.popleft()
+                yield done, fut.result()
+        finally:
+            for _, fut in pending:
+                fut.cancel()
+
+def _chunks(parts, encoding: str, chunksize: int, usecols, workers: int):
+    if workers > 1:
+        frames = _parallel_frames(parts, encoding, chunksize, usecols, workers)
+    else:
+        frames = _serial_frames(parts, encoding, chunksize, usecols)
+    columns, total = None, 0
+    for part, frame in frames:
+        columns = frame.columns if columns is None else columns
+        frame = _align(frame, columns, part)
+        for start in range(0, len(frame), chunksize):
+            chunk = frame.iloc[start:start + chunksize]
+            chunk.index = pd.RangeIndex(total, total + len(chunk))
+            total += len(chunk)
+            yield chunk
+
+def iter_csv(uploaded_file, chunksize: int = 100_000, encoding_fallbacks=("utf-8", "latin-1"), usecols=None,
+             workers: int | None = None):
+    """
+    Yield a CSV as DataFrame chunks of at most chunksize rows so it never has
+    to fit in memory at once. Falls back to the next encoding only while no
+    chunk has been yielded yet. usecols limits parsing to those columns.
+    Accepts the same compressed and partitioned inputs as load_csv, read in
+    order. With workers > 1 (default PARSE_WORKERS) each partition is cut
+    into byte ranges at row ends and the ranges are parsed on a thread pool;
+    workers=1 parses with pandas' own chunked reader.
+    """
+    workers = PARSE_WORKERS if workers is None else workers
+    with _partitions(uploaded_file) as parts:
+        with _open_part(parts[0]) as first:
+            order = _encoding_order(first, encoding_fallbacks)
+        last_err = None
+        for enc in order:
+            yielded = False
+            try:
+                for chunk in _chunks(parts, enc, chunksize, usecols, workers):
+                    yielded = True
+                    yield chunk
+                return
+            except Exception as e:
+                if yielded:
+                    raise
+                last_err = e
+                continue
+        raise last_err
@@ -0,0 +1,202 @@
+"""
+Lightweight tracing of the hot paths. Functions decorated with @traced and
+blocks wrapped in span() record nested spans with wall time, process CPU
+time, row and column counts and, optionally, peak traced memory. Nothing is
+recorded unless a Trace is active in the current context, and then the
+check is a single ContextVar lookup:
+
+    trace = Trace(memory=True)
+    with trace:
+        run_checks(load_csv(path))
+    json.dump(trace.to_chrome(), f)   # open in chrome://tracing or Perfetto
+"""
+from __future__ import annotations
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Any, List
+
+_active: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("dqr_trace", default=None)
+
+def _shape(value) -> Dict[str, int]:
+    shape = getattr(value, "shape", None)
+    if not isinstance(shape, tuple) or not shape:
+        return {}
+    out = {"rows": int(shape[0])}
+    if len(shape) > 1:
+        out["cols"] = int(shape[1])
+    return out
+
+class Trace:
+    """
+    Collects spans while active. memory=True turns on tracemalloc for the
+    duration, which gives each span its peak allocation on top of what was
+    live when it started, at the price of slowing Python allocations down.
+    tracemalloc is process wide, so concurrent traces share its peaks.
+    Spans nest per thread, so work handed to a thread with the trace's
+    context (contextvars.copy_context) records alongside the caller's.
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.spans: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter_ns()
+        self._stacks: Dict[int, List[Dict[str, Any]]] = {}
+        self._tokens: List[contextvars.Token] = []
+        self._owns_tracemalloc = False
+
+    def start(self) -> "Trace":
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        self._tokens.append(_active.set(self))
+        return self
+
+    def stop(self) -> "Trace":
+        if self._tokens:
+            _active.reset(self._tokens.pop())
+        if self._owns_tracemalloc and not self._tokens:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        return self
+
+    def __enter__(self) -> "Trace":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _open(self, name: str, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        thread = threading.get_ident()
+        stack = self._stacks.setdefault(thread, [])
+        record = {
+            "name": name,
+            "depth": len(stack),
+            "parent": stack[-1]["name"] if stack else None,
+            "thread": thread,
+            "attrs": attrs,
+            "_t0": time.perf_counter_ns(),
+            "_c0": time.process_time_ns(),
+        }
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Fold the running peak into the parent before resetting it for the child
+                parent = stack[-1]
+                parent["_peak"] = max(parent["_peak"], peak)
+            tracemalloc.reset_peak()
+            record["_m0"] = current
+            record["_peak"] = current
+        stack.append(record)
+        return record
+
+    def _close(self, record: Dict[str, Any], result=None) -> None:
+        t1, c1 = time.perf_counter_ns(), time.process_time_ns()
+        stack = self._stacks[record["thread"]]
+        stack.remove(record)
+        if isinstance(result, tuple) and result:
+            # (frame, changelog) style returns: count the frame
+            result = result[0]
+        for key, value in _shape(result).items():
+            record["attrs"].setdefault(key, value)
+        span = {
+            "name": record["name"],
+            "depth": record["depth"],
+            "parent": record["parent"],
+            "thread": record["thread"],
+            "start_ms": (record["_t0"] - self._origin) / 1e6,
+            "wall_ms": (t1 - record["_t0"]) / 1e6,
+            "cpu_ms": (c1 - record["_c0"]) / 1e6,
+            **record["attrs"],
+        }
+        if "_m0" in record and tracemalloc.is_tracing():
+            peak = max(record["_peak"], tracemalloc.get_traced_memory()[1])
+            span["peak_bytes"] = peak - record["_m0"]
+            if stack:
+                parent = stack[-1]
+                parent["_peak"] = max(parent["_peak"], peak)
+            tracemalloc.reset_peak()
+        self.spans.append(span)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Spans in start order, ready for a table.
+        """
+        return sorted(self.spans, key=lambda s: s["start_ms"])
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        Chrome trace-event JSON ("X" complete events, microseconds).
+        """
+        pid = os.getpid()
+        events = []
+        for s in self.summary():
+            args = {k: v for k, v in s.items() if k not in ("name", "depth", "parent", "thread", "start_ms", "wall_ms")}
+            events.append({
+                "name": s["name"],
+                "cat": s["name"].split(".")[0],
+                "ph": "X",
+                "ts": s["start_ms"] * 1e3,
+                "dur": s["wall_ms"] * 1e3,
+                "pid": pid,
+                "tid": s["thread"],
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def current() -> Trace | None:
+    return _active.get()
+
+@contextlib.contextmanager
+def _recording(trace: Trace, name: str, attrs: Dict[str, Any]):
+    record = trace._open(name, attrs)
+    try:
+        yield record["attrs"]
+    finally:
+        trace._close(record)
+
+_NULL = contextlib.nullcontext()
+
+def span(name: str, data=None, **attrs):
+    """
+    Context manager for one span; data (a DataFrame or Series) adds its
+    row and column counts. Yields the span's attribute dict, or None from a
+    shared no-op context when no trace is active.
+    """
+    trace = _active.get()
+    if trace is None:
+        return _NULL
+    return _recording(trace, name, {**_shape(data), **attrs})
+
+def traced(name: str | Callable | None = None):
+    """
+    Decorator recording a span per call, named module.function unless
+    given. Row and column counts come from the first argument with a shape,
+    else from the return value.
+    """
+    def decorate(func: Callable) -> Callable:
+        label = name if isinstance(name, str) else f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _active.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            shape = next((s for s in map(_shape, args) if s), {})
+            record = trace._open(label, shape)
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                trace._close(record, result if not shape else None)
+
+        return wrapper
+
+    if callable(name):
+        return decorate(name)
+    return decorate
@@ -1,6 +1,7 @@
 import io
 import json
 import time
+import uuid
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -11,10 +12,12 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 
-from core.io import load_csv
-from radar.dq_checks import run_checks, to_mpl_missingness
-from radar.repair import auto_repair
-from radar.summarize import narrate
+from core.compact import MEMORY_REPORT
+from core.io import _has_pyarrow, _has_zstandard, source_format, source_name
+from core.trace import Trace
+from radar import background
+from radar.dq_checks import missingness_from_profile
+from radar.memo import corr_matrix
 import os, sys
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
@@ -25,13 +28,105 @@ st.set_page_config(page_title="Data Quality Radar", layout="wide")
 st.title("Data Quality Radar")
 st.caption("Upload a CSV. Get a quality report, reversible fixes, and a narrative summary.")
 
-uploaded = st.file_uploader("Upload CSV", type=["csv"])
+workers = st.sidebar.number_input("Profiling workers", min_value=1, max_value=os.cpu_count() or 1, value=1,
+                                  help="Above 1, wide or long files are profiled across processes. "
+                                       "The speed-up hasn't been measured on multi-core machines yet.")
+compact = st.sidebar.checkbox("Compact dtypes after load", value=True,
+                              help="Downcast integers and store repeated strings as categories. Values and reports stay the same.")
+incremental = st.sidebar.checkbox("Incremental profile", value=False,
+                                  help="For files that only grow by appended rows: re-uploads parse just the new rows. "
+                                       "Quantiles, unique counts and top values become estimates on large files.")
+sampled = st.sidebar.checkbox("Sampled profile", value=False, disabled=incremental,
+                              help="Profile a sample of the file with 95% confidence intervals. Columns close to "
+                                   "the missing-value cutoff are recounted exactly.")
+near_dups = st.sidebar.checkbox("Find near-duplicate rows", value=False, disabled=incremental or sampled,
+                                help="Rows that match after normalizing case and punctuation, or differ in a few cells. "
+                                     "Adds a few seconds per 100k rows.")
+near_keys = st.sidebar.text_input("Near-duplicate key columns", value="", disabled=not near_dups or incremental or sampled,
+                                  help="Comma-separated columns to compare, such as name,email. Defaults to all columns.")
+redundant = st.sidebar.checkbox("Flag redundant numeric columns", value=False, disabled=incremental or sampled,
+                                help="Report pairs of numeric columns correlated at 0.95 or more. "
+                                     "On wide tables this can take as long as the rest of the profile.")
+track_drift = st.sidebar.checkbox("Compare with previous upload", value=True,
+                                  help="Save each profile locally and report drift against the last upload of the same dataset.")
+dataset_name = st.sidebar.text_input("Dataset name", value="", disabled=not track_drift,
+                                     help="Uploads are compared within a dataset. Defaults to the file name.")
+trace_on = st.sidebar.checkbox("Trace performance", value=False,
+                               help="Time every stage of this run; see the Performance tab.")
+trace_memory = st.sidebar.checkbox("Trace memory", value=False, disabled=not trace_on,
+                                   help="Adds peak memory per stage. Slows the run down while on.")
+
+uploaded = st.file_uploader("Upload CSV", type=["csv", "gz", "zst", "zip"],
+                            help="A CSV, a gzip or zstd compressed CSV, or a zip of CSV partitions with the same columns.")
+# Analysis runs in a background job per upload and options; reruns reattach to it
+watcher = st.session_state.setdefault("analysis_watcher", uuid.uuid4().hex)
+previous_job = st.session_state.get("analysis_job")
 if uploaded is None:
+    if previous_job is not None:
+        background.release(previous_job, watcher)
+        st.session_state["analysis_job"] = None
     st.info("Waiting for a CSV upload to begin analysis.")
     st.stop()
 
-with st.spinner("Reading CSV..."):
-    df = load_csv(uploaded)
+trace = Trace(memory=trace_memory).start() if trace_on else None
+
+if incremental and source_format(uploaded) != "csv":
+    # Appended rows can only be found in a plain CSV's bytes
+    st.sidebar.caption("Incremental profiles need an uncompressed CSV; this upload gets a full profile.")
+    incremental = False
+profile_mode = "incremental" if incremental else "sampled" if sampled else "full"
+dataset = (dataset_name.strip() or source_name(uploaded)) if track_drift else None
+job = background.submit(getattr(uploaded, "file_id", uploaded.name), uploaded, watcher,
+                        compact=compact, workers=int(workers), mode=profile_mode, dataset=dataset,
+                        near_duplicates=near_dups and profile_mode == "full",
+                        near_subset=tuple(c.strip() for c in near_keys.split(",") if c.strip()) or None,
+                        correlations=redundant and profile_mode == "full")
+if previous_job is not None and previous_job != job.key:
+    # A new upload or new options: the old job is cancelled unless another session still watches it
+    background.release(previous_job, watcher)
+st.session_state["analysis_job"] = job.key
+
+_STAGES = {"queued": "Waiting to start", "loading": "Reading CSV", "profiling": "Profiling columns",
+           "narrating": "Writing the summary", "comparing": "Comparing with the previous upload"}
+
+@st.fragment(run_every=0.5)
+def analysis_progress(had_df: bool):
+    """
+    Polls the job and draws what it has published so far; reruns the whole
+    page once the frame is loaded or the analysis is done.
+    """
+    state = job.snapshot()
+    if state["done"] or (state["df"] is not None) != had_df:
+        st.rerun()
+    st.caption(f"{_STAGES.get(state['stage'], state['stage'])}...")
+    profile = state["profile"]
+    if profile is None:
+        return
+    finished = [c for c in profile["columns"] if c is not None]
+    cols_m = st.columns(3)
+    cols_m[0].metric("Rows", profile["rows"])
+    cols_m[1].metric("Columns", profile["cols"])
+    cols_m[2].metric("Duplicate rows", "..." if profile["duplicate_rows"] is None else profile["duplicate_rows"])
+    st.progress(len(finished) / max(profile["cols"], 1), text=f"{len(finished)} of {profile['cols']} columns profiled")
+    if finished:
+        shown = pd.DataFrame(finished)
+        st.dataframe(shown[[c for c in ("column", "dtype", "missing", "missing_pct", "unique", "mean", "p05", "p95")
+                            if c in shown]], use_container_width=True)
+
+state = job.snapshot()
+if state["error"]:
+    st.error(f"Analysis failed: {state['error']}")
+    st.stop()
+if state["stage"] == "cancelled":
+    st.warning("Analysis was cancelled. Upload the file again to restart it.")
+    st.stop()
+df = state["df"]
+if df is None and not state["done"]:
+    analysis_progress(False)
+    st.stop()
+# The report is shown once the narrative is written too, so both arrive in the same rerun
+report = state["report"] if state["done"] else None
+profile = report["profile"] if report else None
 
 
 # --------- Minimal styling ---------
@@ -43,171 +138,297 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-tab_overview, tab_eda, tab_recipes, tab_downloads = st.tabs(["Overview", "EDA", "Recipes", "Downloads"])
+def show_issues(items):
+    for itm in items:
+        level = itm.get("level", "info")
+        msg = itm["message"]
+        sug = itm.get("suggestion", "")
+        if level == "error":
+            st.error(f"{msg} Suggestion: {sug}")
+        elif level == "warning":
+            st.warning(f"{msg} Suggestion: {sug}")
+        else:
+            st.info(f"{msg} Suggestion: {sug}")
+
+# Sampled and incremental profiles never parse the whole upload; the frame is read only when asked for
+_NEEDS_FRAME = "Load the full data above to use this tab."
+if df is None:
+    st.info("This profile was computed without reading the whole file. Charts, recipes and cleaned downloads need it loaded.")
+    if st.button("Load full data"):
+        with st.spinner("Reading CSV..."):
+            job.load_frame()
+        st.rerun()
+
+tab_overview, tab_eda, tab_recipes, tab_downloads, tab_perf = st.tabs(["Overview", "EDA", "Recipes", "Downloads", "Performance"])
 
 with tab_overview:
-    st.subheader("Preview")
-    st.dataframe(df.head(20), use_container_width=True)
-
-    # Run checks
-    with st.spinner("Running checks..."):
-        report = run_checks(df)
+    if df is not None:
+        st.subheader("Preview")
+        st.dataframe(df.head(20), use_container_width=True)
 
-    profile = report["profile"]
-    issues = report["issues"]
-
-    # Metrics row
-    cols_m = st.columns(3)
-    cols_m[0].metric("Rows", profile["rows"])
-    cols_m[1].metric("Columns", profile["cols"])
-    cols_m[2].metric("Duplicate rows", profile["duplicate_rows"])
-
-    st.markdown('<span class="smallcaps">Missingness</span>', unsafe_allow_html=True)
-    cols, miss = to_mpl_missingness(df)
-    fig, ax = plt.subplots(figsize=(max(6, len(cols) * 0.4), 3.5))
-    ax.bar(range(len(cols)), miss)
-    ax.set_xticks(range(len(cols)))
-    ax.set_xticklabels(cols, rotation=45, ha="right")
-    ax.set_ylabel("Missing count")
-    ax.set_title("Missing values per column")
-    st.pyplot(fig, clear_figure=True)
-
-    st.subheader("Issues")
-    if not issues:
-        st.success("No issues detected by basic checks.")
+    if report is None:
+        analysis_progress(True)
     else:
-        for itm in issues:
-            level = itm.get("level", "info")
-            msg = itm["message"]
-            sug = itm.get("suggestion", "")
-            if level == "error":
-                st.error(f"{msg} Suggestion: {sug}")
-            elif level == "warning":
-                st.warning(f"{msg} Suggestion: {sug}")
+        issues = report["issues"]
+        if "incremental" in profile:
+            inc = profile["incremental"]
+            st.caption(f"Incremental profile: {inc['mode']}, {inc['new_rows']} rows parsed this run.")
+        if "sampling" in profile:
+            smp = profile["sampling"]
+            lo, hi = smp.get("duplicate_rows_ci", (profile["duplicate_rows"],) * 2)
+            st.caption(f"Sampled profile: {smp['sample_rows']:,} rows ({smp['method']}), "
+                       f"duplicate rows {lo:,.0f} to {hi:,.0f} at {smp['confidence']:.0%}. "
+                       f"Recounted exactly: {', '.join(smp['escalated']) or 'none'}.")
+
+        # Metrics row
+        cols_m = st.columns(3)
+        cols_m[0].metric("Rows", profile["rows"])
+        cols_m[1].metric("Columns", profile["cols"])
+        cols_m[2].metric("Duplicate rows", profile["duplicate_rows"])
+
+        st.markdown('<span class="smallcaps">Missingness</span>', unsafe_allow_html=True)
+        cols, miss = missingness_from_profile(profile)
+        fig, ax = plt.subplots(figsize=(max(6, len(cols) * 0.4), 3.5))
+        ax.bar(range(len(cols)), miss)
+        ax.set_xticks(range(len(cols)))
+        ax.set_xticklabels(cols, rotation=45, ha="right")
+        ax.set_ylabel("Missing count")
+        ax.set_title("Missing values per column")
+        st.pyplot(fig, clear_figure=True)
+
+        mem_report = df.attrs.get(MEMORY_REPORT) if df is not None else None
+        if mem_report:
+            before = sum(r["bytes_before"] for r in mem_report)
+            after = sum(r["bytes_after"] for r in mem_report)
+            with st.expander(f"Memory: {before / 1e6:.1f} MB as parsed, {after / 1e6:.1f} MB after compacting"):
+                st.dataframe(pd.DataFrame(mem_report), use_container_width=True)
+
+        st.subheader("Issues")
+        if not issues:
+            st.success("No issues detected by basic checks.")
+        else:
+            show_issues(issues)
+        near = profile.get("near_duplicates")
+        if near and near["examples"] and df is not None:
+            with st.expander(f"Closest near-duplicate pairs of {near['groups']} groups"):
+                for example in near["examples"]:
+                    st.caption(f"Rows {example['rows'][0]} and {example['rows'][1]}, similarity {example['similarity']:.2f}")
+                    st.dataframe(df.iloc[example["rows"]], use_container_width=True)
+
+        if dataset:
+            st.subheader("Drift")
+            drift = state["drift"]
+            if drift is None:
+                st.caption(f"First saved profile of '{dataset}'. The next upload under this name is compared with it.")
             else:
-                st.info(f"{msg} Suggestion: {sug}")
+                st.caption(f"Compared with the upload of {drift['reference']['created']} "
+                           f"({drift['rows_ref']:,} rows, now {drift['rows_cur']:,}).")
+                if not state["drift_issues"]:
+                    st.success("No drift detected.")
+                else:
+                    show_issues(state["drift_issues"])
 
 with tab_eda:
-    from radar.plots import plot_hist, plot_bar_counts, plot_corr_heatmap, plot_group_mean, plot_scatter_colored
-
-    st.subheader("Quick EDA")
-    ncols = df.select_dtypes(include=[np.number]).columns.tolist()
-    ccols = df.select_dtypes(exclude=[np.number]).columns.tolist()
-
-    # Univariate
-    st.markdown("**Univariate**")
-    col1, col2 = st.columns(2)
-    with col1:
-        num_choice = st.selectbox("Numeric column", ncols or ["(none)"], index=0 if ncols else None)
-        if ncols:
-            fig1, ax1 = plt.subplots(figsize=(5.5, 3.5))
-            plot_hist(ax1, df[num_choice], title=f"Histogram: {num_choice}")
-            st.pyplot(fig1, clear_figure=True)
-    with col2:
-        cat_choice = st.selectbox("Categorical column", ccols or ["(none)"], index=0 if ccols else None)
-        if ccols:
-            fig2, ax2 = plt.subplots(figsize=(5.5, 3.5))
-            plot_bar_counts(ax2, df[cat_choice], title=f"Counts: {cat_choice}")
-            st.pyplot(fig2, clear_figure=True)
-
-    # Bivariate
-    st.markdown("**Bivariate**")
-    col3, col4 = st.columns(2)
-    with col3:
-        if ccols and ncols:
-            cat_bi = st.selectbox("Category for mean comparison", ccols, key="eda_cat_bi")
-            num_bi = st.selectbox("Numeric for mean comparison", ncols, key="eda_num_bi")
-            fig3, ax3 = plt.subplots(figsize=(5.5, 3.5))
-            plot_group_mean(ax3, df, cat_bi, num_bi, title=f"Mean of {num_bi} by {cat_bi}")
-            st.pyplot(fig3, clear_figure=True)
-    with col4:
-        if len(ncols) >= 2:
-            x_sc = st.selectbox("X numeric", ncols, key="eda_x_sc")
-            y_sc = st.selectbox("Y numeric", [c for c in ncols if c != x_sc], key="eda_y_sc")
-            color_cat = st.selectbox("Color by category (optional)", ["(none)"] + ccols, key="eda_color")
-            fig4, ax4 = plt.subplots(figsize=(5.5, 3.5))
-            plot_scatter_colored(ax4, df, x_sc, y_sc, None if color_cat == "(none)" else color_cat, alpha=0.7)
-            st.pyplot(fig4, clear_figure=True)
-
-    # Correlation
-    st.markdown("**Correlation**")
-    fig5, ax5 = plt.subplots(figsize=(6.5, 4.5))
-    plot_corr_heatmap(ax5, df)
-    st.pyplot(fig5, clear_figure=True)
+    if df is None:
+        st.info(_NEEDS_FRAME)
+    else:
+        from radar.plots import (
+            chart_png, profile_counts, plot_hist, plot_bar_counts, plot_corr_heatmap, plot_group_mean, plot_scatter_colored,
+        )
+        from radar.correlation import top_pairs
+
+        st.subheader("Quick EDA")
+        ncols = df.select_dtypes(include=[np.number]).columns.tolist()
+        ccols = df.select_dtypes(exclude=[np.number]).columns.tolist()
+
+        # Univariate
+        st.markdown("**Univariate**")
+        col1, col2 = st.columns(2)
+        with col1:
+            num_choice = st.selectbox("Numeric column", ncols or ["(none)"], index=0 if ncols else None)
+            if ncols:
+                st.image(chart_png(plot_hist, df[num_choice], title=f"Histogram: {num_choice}"), use_column_width=True)
+        with col2:
+            cat_choice = st.selectbox("Categorical column", ccols or ["(none)"], index=0 if ccols else None)
+            if ccols:
+                st.image(chart_png(plot_bar_counts, df[cat_choice], title=f"Counts: {cat_choice}",
+                                   counts=profile_counts(profile, cat_choice) if profile else None), use_column_width=True)
+
+        # Bivariate
+        st.markdown("**Bivariate**")
+        col3, col4 = st.columns(2)
+        with col3:
+            if ccols and ncols:
+                cat_bi = st.selectbox("Category for mean comparison", ccols, key="eda_cat_bi")
+                num_bi = st.selectbox("Numeric for mean comparison", ncols, key="eda_num_bi")
+                st.image(chart_png(plot_group_mean, df[[cat_bi, num_bi]], cat_bi, num_bi, title=f"Mean of {num_bi} by {cat_bi}"), use_column_width=True)
+        with col4:
+            if len(ncols) >= 2:
+                x_sc = st.selectbox("X numeric", ncols, key="eda_x_sc")
+                y_sc = st.selectbox("Y numeric", [c for c in ncols if c != x_sc], key="eda_y_sc")
+                color_cat = st.selectbox("Color by category (optional)", ["(none)"] + ccols, key="eda_color")
+                color = None if color_cat == "(none)" else color_cat
+                # Only the plotted columns go in, so the chart cache keys on just them
+                used = list(dict.fromkeys([x_sc, y_sc] + ([color] if color else [])))
+                st.image(chart_png(plot_scatter_colored, df[used], x_sc, y_sc, color, alpha=0.7), use_column_width=True)
+
+        # Correlation
+        st.markdown("**Correlation**")
+        cluster = st.checkbox("Cluster correlated columns", value=False, key="eda_corr_cluster")
+        st.image(chart_png(plot_corr_heatmap, df, cluster=cluster, figsize=(6.5, 4.5)), use_column_width=True)
+        pairs = top_pairs(corr_matrix(df), k=10)
+        if pairs:
+            st.caption("Strongest pairs")
+            st.dataframe(pd.DataFrame(pairs), use_container_width=True)
 
 with tab_recipes:
-    st.subheader("Notebook-inspired recipes")
-    st.caption("These are optional. They mirror common steps like mode imputation, group median imputation, presence indicators, and IQR winsorization.")
-    from radar.recipes import impute_mode, impute_group_median, add_known_indicator, winsorize_iqr
-
-    work = df.copy()
-    change_log = []
-
-    st.markdown("**1) Mode impute for categoricals**")
-    cat_opts = df.select_dtypes(exclude=[np.number]).columns.tolist()
-    cat_select = st.multiselect("Columns to fill with mode", cat_opts, default=[c for c in cat_opts if df[c].isna().sum() > 0][:2])
-    if st.button("Apply mode impute", key="btn_mode"):
-        work, log = impute_mode(work, cat_select)
-        change_log.extend(log)
-        st.success("Mode impute applied.")
-
-    st.markdown("**2) Group median impute for a numeric target**")
-    num_opts = df.select_dtypes(include=[np.number]).columns.tolist()
-    target = st.selectbox("Target numeric column", num_opts or ["(none)"], index=0 if num_opts else None)
-    group_by = st.multiselect("Group by columns", cat_opts, max_selections=2)
-    if st.button("Apply group median impute", key="btn_gmed"):
-        work, log = impute_group_median(work, target, group_by)
-        change_log.extend(log)
-        st.success("Group median impute applied.")
-
-    st.markdown("**3) Presence indicator for a sparse column**")
-    ind_col = st.selectbox("Column to create indicator for", df.columns, index=min( len(df.columns)-1, max(0, list(df.columns).index(next((c for c in df.columns if df[c].isna().sum()>0), df.columns[0])) ) ))
-    drop_src = st.checkbox("Drop original column after indicator is created", value=False)
-    if st.button("Add indicator", key="btn_ind"):
-        work, log = add_known_indicator(work, ind_col, None, drop_original=drop_src)
-        change_log.extend(log)
-        st.success("Indicator added.")
-
-    st.markdown("**4) Winsorize numeric columns by IQR (cap extremes)**")
-    nums_for_win = st.multiselect("Numeric columns to winsorize", num_opts, default=num_opts[:1])
-    factor = st.slider("IQR factor", 1.0, 3.0, 1.5, 0.1)
-    if st.button("Apply winsorization", key="btn_win"):
-        work, log = winsorize_iqr(work, nums_for_win, factor=factor, suffix="_w")
-        change_log.extend(log)
-        st.success("Winsorization applied.")
-
-    st.markdown("**Preview after recipes**")
-    st.dataframe(work.head(20), use_container_width=True)
-
-    # Save results in session state to be used in Downloads tab
-    st.session_state['recipe_df'] = work
-    st.session_state['recipe_log'] = change_log
+    if df is None:
+        st.info(_NEEDS_FRAME)
+    else:
+        st.subheader("Notebook-inspired recipes")
+        st.caption("These are optional. They mirror common steps like mode imputation, group median imputation, presence indicators, and IQR winsorization.")
+        from radar.memo import run_plan
+        from radar.pipeline import Pipeline
+
+        # Recipes are recorded as a plan and replayed on the upload in one pass
+        plan = Pipeline.from_dict(st.session_state.get('recipe_plan', Pipeline().to_dict()))
+
+        st.markdown("**1) Mode impute for categoricals**")
+        cat_opts = df.select_dtypes(exclude=[np.number]).columns.tolist()
+        cat_select = st.multiselect("Columns to fill with mode", cat_opts, default=[c for c in cat_opts if df[c].isna().sum() > 0][:2])
+        if st.button("Apply mode impute", key="btn_mode"):
+            plan = plan.impute_mode(cat_select)
+            st.success("Mode impute applied.")
+
+        st.markdown("**2) Group impute for numeric targets**")
+        num_opts = df.select_dtypes(include=[np.number]).columns.tolist()
+        targets = st.multiselect("Target numeric columns", num_opts, default=num_opts[:1])
+        group_by = st.multiselect("Group by columns", cat_opts, max_selections=2)
+        group_stat = st.selectbox("Statistic", ["median", "mean", "mode"], index=0)
+        group_fallback = st.checkbox("Fall back to coarser groups, then the whole column", value=False)
+        if st.button("Apply group impute", key="btn_gmed"):
+            plan = plan.impute_grouped(targets, group_by, stat=group_stat, fallback=group_fallback)
+            st.success("Group impute applied.")
+
+        st.markdown("**3) Presence indicator for a sparse column**")
+        ind_col = st.selectbox("Column to create indicator for", df.columns, index=min( len(df.columns)-1, max(0, list(df.columns).index(next((c for c in df.columns if df[c].isna().sum()>0), df.columns[0])) ) ))
+        drop_src = st.checkbox("Drop original column after indicator is created", value=False)
+        if st.button("Add indicator", key="btn_ind"):
+            plan = plan.add_known_indicator(ind_col, None, drop_original=drop_src)
+            st.success("Indicator added.")
+
+        st.markdown("**4) Winsorize numeric columns by IQR (cap extremes)**")
+        nums_for_win = st.multiselect("Numeric columns to winsorize", num_opts, default=num_opts[:1])
+        factor = st.slider("IQR factor", 1.0, 3.0, 1.5, 0.1)
+        if st.button("Apply winsorization", key="btn_win"):
+            plan = plan.winsorize_iqr(nums_for_win, factor=factor, suffix="_w")
+            st.success("Winsorization applied.")
+
+        if st.button("Reset recipes", key="btn_reset"):
+            plan = Pipeline()
+        st.session_state['recipe_plan'] = plan.to_dict()
+        st.caption(f"{len(plan)} recipe steps recorded, {len(plan.stages())} passes after fusing.")
+
+        work, change_log = run_plan(df, plan.to_dict())
+
+        st.markdown("**Preview after recipes**")
+        st.dataframe(work.head(20), use_container_width=True)
+
+        # Save results in session state to be used in Downloads tab
+        st.session_state['recipe_df'] = work
+        st.session_state['recipe_log'] = change_log
 
 with tab_downloads:
     st.subheader("Downloads")
-    # Narrative from the original report
-    from radar.summarize import narrate
-    report = run_checks(df)
-    summary = narrate(report, [])
-
-    # Which data to download: original auto repair vs recipe output vs raw
-    mode = st.radio("Choose dataset to download", ["Original upload", "Auto-repaired (median/mode + drop duplicates)", "Recipes output (from previous tab)"], index=1)
-    if mode == "Original upload":
-        to_save = df.copy()
-    elif mode == "Auto-repaired (median/mode + drop duplicates)":
-        from radar.repair import auto_repair
-        to_save, _log = auto_repair(df)
+    from radar.export import export_to_path, fit_plan, suffix_for
+    from radar.memo import run_plan_with_diff
+    from radar.pipeline import Pipeline
+    # Narrative from the original report, written by the background job
+    summary = state["narrative"]
+
+    if df is None:
+        st.info(_NEEDS_FRAME)
     else:
-        to_save = st.session_state.get('recipe_df', df)
-
-    cleaned_csv = to_save.to_csv(index=False).encode("utf-8")
-    st.download_button("Download CSV", cleaned_csv, file_name="export.csv", mime="text/csv")
-
-    summary_txt = summary.encode("utf-8")
-    st.download_button("Download summary text", summary_txt, file_name="summary.txt", mime="text/plain")
+        # Which data to download: original auto repair vs recipe output vs raw
+        mode = st.radio("Choose dataset to download", ["Original upload", "Auto-repaired (median/mode + drop duplicates)", "Recipes output (from previous tab)"], index=1)
+        plan = None
+        if mode == "Auto-repaired (median/mode + drop duplicates)":
+            near_mode = None
+            if profile and (profile.get("near_duplicates") or {}).get("rows"):
+                choice = st.selectbox("Near-duplicate rows", ["Keep", "Merge into the first of each group", "Drop all but the first"])
+                near_mode = {"Keep": None, "Merge into the first of each group": "merge", "Drop all but the first": "drop"}[choice]
+            plan = Pipeline().auto_repair(near_duplicates=near_mode,
+                                          near_subset=profile["near_duplicates"].get("subset") if near_mode else None).to_dict()
+        elif mode == "Recipes output (from previous tab)" and st.session_state.get('recipe_plan', {}).get("steps"):
+            plan = st.session_state['recipe_plan']
+
+        formats = {"CSV": ("csv", None), "CSV, gzip": ("csv", "gzip")}
+        if _has_zstandard() or _has_pyarrow():
+            formats["CSV, zstd"] = ("csv", "zstd")
+        if _has_pyarrow():
+            formats["Parquet"] = ("parquet", None)
+        fmt, compression = formats[st.selectbox("Format", list(formats), index=0)]
+
+        # Written chunk by chunk to a temp file owned by the job, only when asked for, and read
+        # into the page only in the run that asked; other reruns don't hold the export in memory
+        export_key = (job.key, json.dumps(plan, sort_keys=True, default=str), fmt, compression)
+        export = st.session_state.get("export")
+        if export is not None and export["key"] != export_key:
+            job.disown(export["path"])
+            export = st.session_state["export"] = None
+        if st.button("Prepare download", key="btn_export"):
+            if export is None or not os.path.exists(export["path"]):
+                with st.spinner("Writing export..."):
+                    path = export_to_path(fit_plan(df, plan).chunks(), fmt=fmt, compression=compression)
+                export = st.session_state["export"] = {"key": export_key, "path": job.own(path)}
+            mime = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}[fmt]
+            with open(export["path"], "rb") as f:
+                st.download_button("Download data", f, file_name="export" + suffix_for(fmt, compression),
+                                   mime="application/octet-stream" if compression else mime)
+        if plan is not None and st.checkbox("Also prepare an undo diff", value=False,
+                                            help="Keeps a full cleaned copy in memory while the diff is built."):
+            _cleaned, _log, undo = run_plan_with_diff(df, plan)
+            st.download_button("Download undo diff", undo, file_name="export.dqdiff", mime="application/octet-stream",
+                               help="Cell-level diff: radar.diff.FrameDiff.from_bytes(...).reconstruct(cleaned) returns the upload. "
+                                    "Read a cleaned CSV with pd.read_csv(..., float_precision=\"round_trip\").")
+
+    if summary is None:
+        st.caption("The summary text is available once the analysis finishes.")
+    else:
+        summary_txt = summary.encode("utf-8")
+        st.download_button("Download summary text", summary_txt, file_name="summary.txt", mime="text/plain")
 
     # If user used recipes, offer log
     rlog = st.session_state.get('recipe_log', [])
     if rlog:
         rlog_json = json.dumps(rlog, indent=2).encode("utf-8")
         st.download_button("Download recipes changelog", rlog_json, file_name="recipes_changelog.json", mime="application/json")
+    rplan = st.session_state.get('recipe_plan', {})
+    if rplan.get("steps"):
+        st.download_button("Download recipe plan", json.dumps(rplan, indent=2).encode("utf-8"), file_name="recipe_plan.json",
+                           mime="application/json", help="Replay on another upload with radar.pipeline.run_plan.")
+
+with tab_perf:
+    st.subheader("Performance")
+    if trace is None:
+        st.info("Turn on 'Trace performance' in the sidebar to time each stage of the next run.")
+    else:
+        trace.stop()
+        # The background job records into the trace active when it started, which may be an earlier run's
+        spans = trace.summary()
+        if job.trace is not None and job.trace is not trace and job.done:
+            spans = job.trace.summary() + spans
+            st.caption("Includes the background analysis, traced in the run that started it.")
+        if not spans:
+            st.caption("Nothing was computed in this run: every result came from a cache.")
+        else:
+            st.caption("Stages computed in this run, nested by indentation. Results served from a cache don't appear.")
+            perf = pd.DataFrame(spans)
+            perf["stage"] = ["\u2003" * d + n for d, n in zip(perf["depth"], perf["name"])]
+            if "peak_bytes" in perf:
+                perf["peak_mb"] = perf["peak_bytes"] / 1e6
+            shown = [c for c in ("stage", "wall_ms", "cpu_ms", "peak_mb", "rows", "cols") if c in perf]
+            st.dataframe(perf[shown], use_container_width=True)
+            st.download_button("Download Chrome trace", json.dumps(trace.to_chrome(), default=str).encode("utf-8"),
+                               file_name="radar_trace.json", mime="application/json",
+                               help="Open in chrome://tracing, Perfetto or speedscope.")
@@ -0,0 +1,267 @@
+"""
+Analysis jobs that run off the Streamlit script thread. A job loads an
+upload, profiles it and writes the narrative in a worker thread, publishing
+each piece as soon as it exists: row and column counts first, then every
+column's stats as it finishes, then duplicates, issues and the narrative.
+The page polls job.snapshot() and draws whatever is there.
+
+Jobs live in a process-wide registry keyed by upload and options, so a
+script rerun finds the job already running for its upload instead of
+starting another. A session that moves on to a new upload releases its old
+job, which is cancelled once no session is watching it. Files a session
+writes for a job (exports) are handed to job.own() and deleted when the job
+leaves the registry.
+"""
+from __future__ import annotations
+import contextvars
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable
+
+from core.cache import cached_load_csv
+from core.trace import current, span
+from radar.dq_checks import basic_profile, issues_from_profile, iter_profile
+from radar.drift import drift_issues
+from radar.summarize import narrate
+
+# Finished jobs kept for reruns and other sessions; each holds its frame
+_MAX_FINISHED = 4
+
+class Cancelled(Exception):
+    """
+    Raised inside a job's worker thread at the next checkpoint after cancel().
+    """
+
+class AnalysisJob:
+    """
+    One upload analysed in a daemon thread. options: compact (bool), workers
+    (int; above 1 the profile arrives in one piece from radar.parallel), mode
+    ("full", "incremental" or "sampled"; the last two read the upload
+    themselves and leave "df" None until load_frame()), near_duplicates (bool;
+    full profiles only), near_subset (tuple of columns they're compared on,
+    default all), correlations (bool; full profiles only) and dataset: when
+    set, the report is
+    saved to radar.store under that name and compared with the previous
+    upload, published as "drift" and "drift_issues". The worker runs in a copy of
+    the submitting context, so an active core.trace.Trace records its spans.
+    """
+
+    def __init__(self, key: Hashable, uploaded_file, options: Dict[str, Any]):
+        self.key = key
+        self.options = options
+        self.trace = current()
+        self.watchers: set = set()
+        self._upload = uploaded_file
+        self._files: set = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._state: Dict[str, Any] = {
+            "stage": "queued",
+            "df": None,
+            "profile": None,
+            "report": None,
+            "narrative": None,
+            "drift": None,
+            "drift_issues": [],
+            "error": None,
+            "done": False,
+        }
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run, uploaded_file), daemon=True,
+                                        name=f"radar-analysis-{abs(hash(key)) % 10_000:04d}")
+
+    def start(self) -> "AnalysisJob":
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._state["done"]
+
+    def wait(self, timeout: float | None = None) -> bool:
+        self._thread.join(timeout)
+        return self.done
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        A consistent copy of the published state. The profile's column list
+        is copied and holds None for columns still being profiled.
+        """
+        with self._lock:
+            state = dict(self._state)
+            if state["profile"] is not None:
+                state["profile"] = dict(state["profile"], columns=list(state["profile"]["columns"]))
+            return state
+
+    def load_frame(self):
+        """
+        The upload as a frame, read on the calling thread the first time it's
+        asked for and published as "df". Full profiles have it already.
+        """
+        with self._load_lock:
+            if self._state["df"] is None:
+                with span("background.load_frame"):
+                    df = cached_load_csv(self._upload, compact=self.options.get("compact", False))
+                self._publish(df=df)
+            return self._state["df"]
+
+    def own(self, path: str) -> str:
+        """
+        Delete path with the job's other files when the job is dropped.
+        """
+        with self._lock:
+            self._files.add(path)
+        return path
+
+    def disown(self, path: str) -> None:
+        """
+        Delete one owned file now.
+        """
+        with self._lock:
+            self._files.discard(path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def drop_files(self) -> None:
+        with self._lock:
+            files, self._files = self._files, set()
+        for path in files:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _publish(self, **updates) -> None:
+        with self._lock:
+            self._state.update(updates)
+
+    def _checkpoint(self) -> None:
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def _profile(self, df, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fill the published skeleton in place as iter_profile yields.
+        """
+        workers = self.options.get("workers")
+        near_duplicates = self.options.get("near_duplicates", False)
+        near_subset = self.options.get("near_subset")
+        correlations = self.options.get("correlations", False)
+        if workers is not None and workers > 1:
+            return basic_profile(df, workers=workers, near_duplicates=near_duplicates, near_subset=near_subset,
+                                 correlations=correlations)
+        for kind, value in iter_profile(df, near_duplicates=near_duplicates, near_subset=near_subset,
+                                        correlations=correlations):
+            with self._lock:
+                if kind == "column":
+                    pos, summary = value
+                    profile["columns"][pos] = summary
+                else:
+                    profile[kind] = value
+            self._checkpoint()
+        return profile
+
+    def _remember(self, dataset: str, report: Dict[str, Any], df) -> None:
+        from radar.store import ProfileStore
+        try:
+            store = ProfileStore()
+            saved = store.save(dataset, report, df)
+            drift = store.drift(dataset, current=saved)
+        except (sqlite3.Error, OSError):
+            # A locked or unwritable store costs the comparison, not the analysis
+            return
+        if drift is not None:
+            self._publish(drift=drift, drift_issues=drift_issues(drift))
+
+    def _run(self, uploaded_file) -> None:
+        try:
+            with span("background.analysis"):
+                mode = self.options.get("mode", "full")
+                df = None
+                if mode == "incremental":
+                    # Both read the file themselves, so the whole frame is never parsed here
+                    from radar.incremental import run_checks_incremental
+                    self._publish(stage="profiling")
+                    report = run_checks_incremental(uploaded_file)
+                elif mode == "sampled":
+                    from radar.sampling import run_checks_sampled
+                    self._publish(stage="profiling")
+                    report = run_checks_sampled(uploaded_file)
+                else:
+                    self._publish(stage="loading")
+                    df = cached_load_csv(uploaded_file, compact=self.options.get("compact", False))
+                    self._checkpoint()
+                    profile = {
+                        "rows": len(df),
+                        "cols": df.shape[1],
+                        "duplicate_rows": None,
+                        "columns": [None] * df.shape[1],
+                        "correlations": None,
+                    }
+                    self._publish(stage="profiling", df=df, profile=profile)
+                    profile = self._profile(df, profile)
+                    report = {"profile": profile, "issues": issues_from_profile(profile)}
+                self._checkpoint()
+                self._publish(stage="narrating", profile=report["profile"], report=report)
+                narrative = narrate(report, [])
+                self._publish(narrative=narrative)
+                if self.options.get("dataset"):
+                    self._checkpoint()
+                    self._publish(stage="comparing")
+                    self._remember(self.options["dataset"], report, df)
+            self._publish(stage="done", done=True)
+        except Cancelled:
+            self._publish(stage="cancelled", done=True)
+        except Exception as e:
+            self._publish(stage="failed", error=f"{type(e).__name__}: {e}", done=True)
+
+_jobs: "OrderedDict[Hashable, AnalysisJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+def job_key(upload_id: Hashable, **options) -> Hashable:
+    return (upload_id, tuple(sorted(options.items())))
+
+def _prune() -> None:
+    finished = [k for k, job in _jobs.items() if job.done]
+    for key in finished[:max(0, len(finished) - _MAX_FINISHED)]:
+        _jobs.pop(key).drop_files()
+
+def submit(upload_id: Hashable, uploaded_file, watcher: Hashable, **options) -> AnalysisJob:
+    """
+    The job for this upload and options, started if none is running or
+    finished. upload_id names the upload (Streamlit's file_id); watcher names
+    the session so release() knows when nobody needs the job any more.
+    """
+    key = job_key(upload_id, **options)
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is None or job.cancelled:
+            job = _jobs[key] = AnalysisJob(key, uploaded_file, options).start()
+        _jobs.move_to_end(key)
+        job.watchers.add(watcher)
+        _prune()
+    return job
+
+def release(key: Hashable, watcher: Hashable) -> None:
+    """
+    Stop watching a job; a job nobody watches is cancelled if still running
+    and dropped from the registry.
+    """
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is None:
+            return
+        job.watchers.discard(watcher)
+        if not job.watchers:
+            if not job.done:
+                job.cancel()
+            del _jobs[key]
+            job.drop_files()
@@ -0,0 +1,217 @@
+"""
+Headless batch runner: python -m radar data/*.csv --repair > report.jsonl
+
+Each file goes through load_csv -> run_checks -> auto_repair (optional) ->
+narrate in a process pool, and one JSON object per file is written as soon
+as it finishes. Files may be gzip or zstd compressed; with --partitioned a
+directory, glob or zip of CSV partitions is one input. Only pandas, numpy
+and the radar/core modules are imported on this path; matplotlib and
+streamlit never load.
+"""
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Sequence
+
+from core.io import CSV_SUFFIXES, load_csv, source_name
+from radar.dq_checks import run_checks
+from radar.drift import drift_issues
+from radar.repair import NEAR_DUP_MODES, auto_repair
+from radar.sampling import run_checks_sampled
+from radar.streaming import run_checks_streaming
+from radar.store import ProfileStore
+from radar.summarize import narrate
+
+_LEVELS = ("info", "warning", "error")
+
+def expand_inputs(inputs: Sequence[str], pattern: str | None = None, partitioned: bool = False) -> List[str]:
+    """
+    Files named by paths, directories (searched recursively for pattern,
+    default any of core.io.CSV_SUFFIXES) and glob expressions, sorted and
+    without repeats. A missing path is kept so its record reports the load
+    error. With partitioned, directories and globs are kept whole: load_csv
+    reads each one as a single dataset.
+    """
+    if partitioned:
+        return sorted({os.path.abspath(item) for item in inputs})
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if pattern is None:
+                found = glob.glob(os.path.join(item, "**", "*"), recursive=True)
+                files.extend(f for f in found if os.path.isfile(f) and f.lower().endswith(CSV_SUFFIXES))
+            else:
+                files.extend(glob.glob(os.path.join(item, "**", pattern), recursive=True))
+        elif glob.has_magic(item):
+            files.extend(glob.glob(item, recursive=True))
+        else:
+            files.append(item)
+    return sorted({os.path.abspath(f) for f in files})
+
+def process_file(path: str, repair: bool = False, strategy: str = "safe", repaired_dir: str | None = None,
+                 full_profile: bool = False, sample: int | None = None, store: str | None = None,
+                 dataset: str | None = None, near_duplicates: str | None = None, near_columns: List[str] | None = None,
+                 stream: bool = False, correlations: bool = False) -> Dict[str, Any]:
+    """
+    Run the pipeline on one file. Never raises: failures are reported in the
+    record with the stage they happened in. With sample or stream and no
+    repair or store the file is never loaded whole: checks run on a sample
+    of that many rows, or on the streaming profiler chunk by chunk. With
+    store (a radar.store database) the report is saved under dataset,
+    default the file name without its suffixes, and the record gets drift
+    issues against the previous profile saved under that name.
+    near_duplicates ("report", "drop" or "merge") adds near-duplicate rows to
+    the full checks, compared on near_columns (default all); "drop" and
+    "merge" also pass on to auto_repair. correlations adds redundant-column
+    pairs to the full checks.
+    """
+    record: Dict[str, Any] = {"file": path, "ok": True, "timings": {}}
+    timings = record["timings"]
+    stage = "load"
+    try:
+        df = None
+        if not (sample or stream) or repair or store:
+            t0 = time.perf_counter()
+            df = load_csv(path)
+            timings["load"] = time.perf_counter() - t0
+
+        stage = "checks"
+        t0 = time.perf_counter()
+        if sample:
+            report = run_checks_sampled(path, sample_rows=sample)
+        elif stream:
+            report = run_checks_streaming(path)
+        else:
+            report = run_checks(df, near_duplicates=bool(near_duplicates), near_subset=near_columns,
+                                correlations=correlations)
+        timings["checks"] = time.perf_counter() - t0
+
+        if store:
+            stage = "store"
+            t0 = time.perf_counter()
+            profiles = ProfileStore(store)
+            name = dataset or source_name(path)
+            drift = profiles.drift(name, current=profiles.save(name, report, df))
+            record["dataset"] = name
+            record["drift"] = None if drift is None else {
+                "reference": drift["reference"],
+                "issues": drift_issues(drift),
+            }
+            timings["store"] = time.perf_counter() - t0
+
+        changelog: List[Dict[str, Any]] = []
+        if repair:
+            stage = "repair"
+            t0 = time.perf_counter()
+            cleaned, changelog = auto_repair(df, strategy=strategy,
+                                             near_duplicates=None if near_duplicates == "report" else near_duplicates,
+                                             near_subset=near_columns)
+            if repaired_dir:
+                os.makedirs(repaired_dir, exist_ok=True)
+                cleaned.to_csv(os.path.join(repaired_dir, f"{source_name(path)}.csv"), index=False)
+            timings["repair"] = time.perf_counter() - t0
+
+        stage = "narrate"
+        t0 = time.perf_counter()
+        record["narrative"] = narrate(report, changelog)
+        timings["narrate"] = time.perf_counter() - t0
+
+        profile = report["profile"]
+        record.update({
+            "rows": profile["rows"],
+            "cols": profile["cols"],
+            "duplicate_rows": profile["duplicate_rows"],
+            "issues": report["issues"],
+        })
+        if "sampling" in profile:
+            record["sampling"] = profile["sampling"]
+        if repair:
+            record["changelog"] = changelog
+        if full_profile:
+            record["profile"] = profile
+    except Exception as e:
+        record.update({"ok": False, "stage": stage, "error": f"{type(e).__name__}: {e}"})
+    timings["total"] = sum(timings.values())
+    return record
+
+def _worst_level(record: Dict[str, Any]) -> int:
+    levels = [_LEVELS.index(i.get("level", "info")) for i in record.get("issues", [])]
+    return max(levels, default=-1)
+
+def _parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m radar", description="Profile CSV files and write one JSON line per file.")
+    p.add_argument("inputs", nargs="+", help="CSV files (optionally .gz or .zst), directories, glob patterns or zips")
+    p.add_argument("--pattern", help="file pattern used inside directories (default: .csv, .csv.gz and .csv.zst files)")
+    p.add_argument("--partitioned", action="store_true",
+                   help="read each directory, glob or zip as one dataset split across files")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    p.add_argument("-o", "--output", default="-", help="JSON lines output file (default: stdout)")
+    p.add_argument("--repair", action="store_true", help="run auto_repair and include its changelog")
+    p.add_argument("--strategy", default="safe", help="auto_repair strategy (default: safe)")
+    p.add_argument("--repaired-dir", help="write repaired CSVs here (implies --repair)")
+    p.add_argument("--near-duplicates", choices=("report",) + NEAR_DUP_MODES,
+                   help="look for near-duplicate rows; drop or merge them too when repairing")
+    p.add_argument("--near-columns", metavar="COLS",
+                   help="comma-separated key columns near-duplicates are compared on (default: all columns)")
+    p.add_argument("--correlations", action="store_true",
+                   help="flag numeric columns correlated at 0.95 or more (slow on wide tables)")
+    p.add_argument("--full-profile", action="store_true", help="include the full profile in each record")
+    p.add_argument("--sample", type=int, metavar="N", help="profile a sample of N rows with confidence intervals")
+    p.add_argument("--stream", action="store_true", help="profile chunk by chunk without loading each file whole")
+    p.add_argument("--store", metavar="DB", help="save each profile to this profile store and report drift")
+    p.add_argument("--dataset", help="dataset name in the store (default: each file's name without extension)")
+    p.add_argument("--fail-on", choices=_LEVELS, help="exit with status 1 if any issue reaches this level")
+    return p
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _parser().parse_args(argv)
+    files = expand_inputs(args.inputs, args.pattern, partitioned=args.partitioned)
+    if not files:
+        print("no input files found", file=sys.stderr)
+        return 2
+    options = {
+        "repair": args.repair or bool(args.repaired_dir),
+        "strategy": args.strategy,
+        "repaired_dir": args.repaired_dir,
+        "full_profile": args.full_profile,
+        "sample": args.sample,
+        "store": args.store,
+        "dataset": args.dataset,
+        "near_duplicates": args.near_duplicates,
+        "near_columns": args.near_columns.split(",") if args.near_columns else None,
+        "stream": args.stream,
+        "correlations": args.correlations,
+    }
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    failed = flagged = False
+    threshold = _LEVELS.index(args.fail_on) if args.fail_on else None
+
+    def emit(record: Dict[str, Any]) -> None:
+        nonlocal failed, flagged
+        failed |= not record["ok"]
+        flagged |= threshold is not None and _worst_level(record) >= threshold
+        out.write(json.dumps(record, default=str) + "\n")
+        out.flush()
+
+    try:
+        jobs = max(1, min(args.jobs, len(files)))
+        if jobs == 1:
+            for path in files:
+                emit(process_file(path, **options))
+        else:
+            # Records arrive in completion order; each one names its file
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(process_file, path, **options) for path in files]
+                for fut in as_completed(futures):
+                    emit(fut.result())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if failed:
+        return 2
+    return 1 if flagged else 0
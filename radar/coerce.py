@@ -0,0 +1,110 @@
+"""
+Shared type coercion. Text columns often hold numbers or dates, and the
+profile, the recipes and the charts all want them typed; parsing a million
+strings is the expensive part. Each column is parsed once per content
+version: the typed values and the mask of cells that did not parse are kept
+in radar.memo's cache, so every later caller on the same column reuses them.
+Columns that already have a numeric or datetime dtype pass straight through.
+"""
+from __future__ import annotations
+import warnings
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+KINDS = ("numeric", "datetime", "text")
+# Non-null values inspected to guess what a text column really holds
+INFER_SAMPLE = 1000
+# Share of them that must parse for the column to count as numbers or dates
+INFER_SHARE = 0.9
+
+_cached = None
+
+def _typed_kind(s: pd.Series) -> str | None:
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return "datetime"
+    if pd.api.types.is_numeric_dtype(s):
+        return "numeric"
+    return None
+
+def _is_text(s: pd.Series) -> bool:
+    return s.dtype == object or isinstance(s.dtype, (pd.StringDtype, pd.CategoricalDtype))
+
+def _parse(s: pd.Series, kind: str) -> pd.Series:
+    with warnings.catch_warnings():
+        # pandas warns when it can't infer one date format; those cells become NaT
+        warnings.simplefilter("ignore", UserWarning)
+        if kind == "numeric":
+            return pd.to_numeric(s, errors="coerce")
+        return pd.to_datetime(s, errors="coerce")
+
+def _coerce(s: pd.Series, kind: str) -> Tuple[pd.Series, np.ndarray]:
+    values = _parse(s, kind)
+    return values, (s.notna() & values.isna()).to_numpy()
+
+def _coerced(s: pd.Series, kind: str) -> Tuple[pd.Series, np.ndarray]:
+    global _cached
+    if _cached is None:
+        # radar.memo imports the modules that coerce columns, so wrap on first use
+        from radar.memo import memoize
+        _cached = memoize(_coerce)
+    return _cached(s, kind)
+
+def _sample(s: pd.Series) -> pd.Series:
+    present = np.flatnonzero(s.notna().to_numpy())
+    if len(present) > INFER_SAMPLE:
+        present = present[np.linspace(0, len(present) - 1, INFER_SAMPLE).astype(np.int64)]
+    return pd.Series(s.iloc[present].to_numpy(dtype=object))
+
+def infer_kind(s: pd.Series) -> str:
+    """
+    "numeric", "datetime" or "text". Typed columns answer from their dtype;
+    text columns from an evenly spaced sample of their non-null values.
+    """
+    typed = _typed_kind(s)
+    if typed is not None:
+        return typed
+    if not _is_text(s):
+        return "text"
+    sample = _sample(s)
+    # True/False in an object column are flags, not numbers
+    if not len(sample) or pd.api.types.infer_dtype(sample) == "boolean":
+        return "text"
+    for kind in ("numeric", "datetime"):
+        try:
+            parsed = _parse(sample, kind)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        if parsed.notna().mean() >= INFER_SHARE:
+            return kind
+    return "text"
+
+def as_numeric(s: pd.Series) -> pd.Series:
+    """
+    pd.to_numeric(s, errors="coerce"), parsed once per column version.
+    """
+    if _typed_kind(s) == "numeric":
+        return s
+    return _coerced(s, "numeric")[0]
+
+def as_datetime(s: pd.Series) -> pd.Series:
+    """
+    pd.to_datetime(s, errors="coerce"), parsed once per column version.
+    """
+    if _typed_kind(s) == "datetime":
+        return s
+    return _coerced(s, "datetime")[0]
+
+def unparseable(s: pd.Series, kind: str | None = None, cache: bool = True) -> np.ndarray:
+    """
+    Boolean mask of cells that hold a value but don't parse as kind, which
+    defaults to infer_kind(s). Text and already typed columns have none.
+    Pass cache=False for one-off data such as stream chunks, so their
+    parses don't push reusable columns out of the memo cache.
+    """
+    kind = kind or infer_kind(s)
+    if kind not in KINDS:
+        raise ValueError(f"unknown kind {kind!r}; expected one of {', '.join(KINDS)}")
+    if kind == "text" or _typed_kind(s) == kind:
+        return np.zeros(len(s), dtype=bool)
+    return (_coerced if cache else _coerce)(s, kind)[1]
@@ -0,0 +1,158 @@
+"""
+Correlation for wide numeric tables. The Pearson matrix is accumulated over
+row blocks with a few matrix products instead of pandas' per-pair loop,
+using pairwise-complete rows like DataFrame.corr(). It is computed once per
+frame and shared by the profile (redundant-column issues) and the heatmap.
+"""
+from __future__ import annotations
+import warnings
+import weakref
+from typing import Dict, Any, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# Rows per chunk times columns; bounds the float64 working copy to ~128 MB
+_CHUNK_CELLS = 1 << 24
+# Pairs at or above this |r| are reported as redundant columns
+REDUNDANT_CORR = 0.95
+_MAX_PAIRS = 50
+
+_shared: Dict[int, Tuple[weakref.ref, Dict[Tuple, pd.DataFrame]]] = {}
+
+def numeric_columns(df: pd.DataFrame) -> pd.Index:
+    return df.select_dtypes(include=[np.number]).columns
+
+def _float_rows(df: pd.DataFrame, positions: Sequence[int], start: int, stop: int) -> np.ndarray:
+    out = np.empty((stop - start, len(positions)), dtype=np.float64, order="F")
+    for j, pos in enumerate(positions):
+        out[:, j] = df.iloc[start:stop, pos].to_numpy(dtype=np.float64, na_value=np.nan)
+    return out
+
+def _finite_mean(values: np.ndarray) -> float:
+    finite = values[np.isfinite(values)]
+    return float(finite.mean()) if len(finite) else 0.0
+
+def _compute(df: pd.DataFrame, cols: pd.Index, min_periods: int) -> pd.DataFrame:
+    """
+    Pairwise-complete Pearson from moment sums accumulated over row chunks.
+    Values are shifted by their column means first, which keeps the sums
+    well conditioned; missing and infinite values are zeroed and masked out
+    of n and the per-pair sums, so a chunk without them costs one matrix
+    product. All-missing columns get NaN, without warnings.
+    """
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        # Huge values can still overflow the squares; those pairs come out NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        positions = [df.columns.get_loc(c) for c in cols]
+        p, n_rows = len(positions), len(df)
+        center = np.array([_finite_mean(df.iloc[:, pos].to_numpy(dtype=np.float64, na_value=np.nan)) for pos in positions])
+        sxy = np.zeros((p, p))
+        n = np.zeros((p, p))
+        # sx[i, j] / sxx[i, j]: sum of x_i / x_i**2 over rows where x_j is present too
+        sx = np.zeros((p, p))
+        sxx = np.zeros((p, p))
+        step = max(1, _CHUNK_CELLS // max(p, 1))
+        for start in range(0, n_rows, step):
+            x = _float_rows(df, positions, start, min(start + step, n_rows))
+            x -= center
+            present = np.isfinite(x)
+            if present.all():
+                n += len(x)
+                sx += x.sum(axis=0)[:, None]
+                sxx += (x * x).sum(axis=0)[:, None]
+            else:
+                x[~present] = 0.0
+                m = present.astype(np.float64)
+                n += m.T @ m
+                sx += x.T @ m
+                sxx += (x * x).T @ m
+            sxy += x.T @ x
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n
+        r = cov / np.sqrt(var * var.T)
+        r[(n < max(min_periods, 2)) | (var <= 0) | (var.T <= 0)] = np.nan
+        r = np.clip(r, -1.0, 1.0)
+        # A column is perfectly correlated with itself whenever it has a variance
+        diag = np.diag(r).copy()
+        diag[~np.isnan(diag)] = 1.0
+        np.fill_diagonal(r, diag)
+        return pd.DataFrame(r, index=cols, columns=cols)
+
+def corr_matrix(df: pd.DataFrame, cols: Sequence | None = None, min_periods: int = 1) -> pd.DataFrame:
+    """
+    Same matrix as df[cols].corr() (Pearson, pairwise complete rows), by
+    default over every numeric column. Cached per DataFrame object, so the
+    profile and the heatmap share one computation; don't mutate the frame
+    in place and ask again.
+    """
+    cols = numeric_columns(df) if cols is None else pd.Index(cols)
+    key = (tuple(cols), min_periods)
+    hit = _shared.get(id(df))
+    if hit is None or hit[0]() is not df:
+        frame_id = id(df)
+        hit = (weakref.ref(df, lambda _: _shared.pop(frame_id, None)), {})
+        _shared[frame_id] = hit
+    cache = hit[1]
+    if key not in cache:
+        cache[key] = _compute(df, cols, min_periods)
+    return cache[key].copy()
+
+def top_pairs(corr: pd.DataFrame, k: int = 10, threshold: float | None = None) -> List[Dict[str, Any]]:
+    """
+    The k column pairs with the largest |r|, strongest first, optionally only
+    those at or above threshold. Uses a partial sort of the upper triangle.
+    """
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    strength = np.abs(values[rows, cols])
+    keep = ~np.isnan(strength)
+    if threshold is not None:
+        keep &= strength >= threshold
+    idx = np.flatnonzero(keep)
+    if idx.size > k:
+        idx = idx[np.argpartition(-strength[idx], k - 1)[:k]]
+    idx = idx[np.argsort(-strength[idx], kind="stable")]
+    names = corr.columns
+    return [
+        {"a": names[rows[i]], "b": names[cols[i]], "corr": float(values[rows[i], cols[i]])}
+        for i in idx
+    ]
+
+def cluster_order(corr: pd.DataFrame) -> List[int]:
+    """
+    Column order that puts correlated columns next to each other: average-
+    linkage agglomerative clustering on 1 - |r|, reading the leaves off the
+    merge tree. Undefined correlations count as unrelated.
+    """
+    p = len(corr)
+    if p < 3:
+        return list(range(p))
+    dist = 1.0 - np.abs(np.nan_to_num(corr.to_numpy(), nan=0.0))
+    np.fill_diagonal(dist, np.inf)
+    sizes = np.ones(p)
+    members: List[List[int]] = [[i] for i in range(p)]
+    alive = np.ones(p, dtype=bool)
+    for _ in range(p - 1):
+        a, b = np.unravel_index(np.argmin(dist), dist.shape)
+        a, b = min(a, b), max(a, b)
+        merged = (sizes[a] * dist[a] + sizes[b] * dist[b]) / (sizes[a] + sizes[b])
+        merged[a] = np.inf
+        merged[~alive] = np.inf
+        dist[a], dist[:, a] = merged, merged
+        dist[b], dist[:, b] = np.inf, np.inf
+        sizes[a] += sizes[b]
+        members[a] = members[a] + members[b]
+        alive[b] = False
+    return members[int(np.flatnonzero(alive)[0])]
+
+def correlation_summary(df: pd.DataFrame, threshold: float = REDUNDANT_CORR, k: int = _MAX_PAIRS) -> Dict[str, Any]:
+    """
+    Profile entry: number of numeric columns and the strongest pairs at or
+    above threshold.
+    """
+    corr = corr_matrix(df)
+    return {
+        "columns": len(corr),
+        "threshold": threshold,
+        "pairs": top_pairs(corr, k=k, threshold=threshold) if len(corr) > 1 else [],
+    }
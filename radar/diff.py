@@ -0,0 +1,432 @@
+"""
+Cell-level diffs that turn a cleaned frame back into the original. A
+FrameDiff holds one entry per pipeline stage with only what that stage
+changed: dropped rows with their values, and per column the positions of
+changed cells with the original values as typed arrays. Positions are kept
+as an index array or as run lengths, whichever is smaller, so the size
+follows the number of changed cells rather than the size of the dataset.
+
+The binary form is an .npz archive of typed arrays plus a JSON header that
+lays out the stages. It never uses pickle, so a diff from elsewhere can be
+loaded safely; object columns are stored by value type instead.
+"""
+from __future__ import annotations
+import io
+import json
+import zlib
+from typing import Dict, Any, List
+import numpy as np
+import pandas as pd
+
+_DIFF_VERSION = 2
+
+def _encode_positions(pos: np.ndarray) -> Dict[str, np.ndarray]:
+    pos = np.asarray(pos, dtype=np.int64)
+    dtype = np.uint32 if (pos.size == 0 or pos[-1] < 2 ** 32) else np.int64
+    if pos.size:
+        breaks = np.flatnonzero(np.diff(pos) != 1) + 1
+        starts = pos[np.r_[0, breaks]]
+        lengths = np.diff(np.r_[0, breaks, pos.size])
+        if 2 * starts.size < pos.size:
+            return {"starts": starts.astype(dtype), "lengths": lengths.astype(dtype)}
+    return {"index": pos.astype(dtype)}
+
+def _decode_positions(enc: Dict[str, np.ndarray]) -> np.ndarray:
+    if "index" in enc:
+        return enc["index"].astype(np.int64)
+    starts = enc["starts"].astype(np.int64)
+    lengths = enc["lengths"].astype(np.int64)
+    if not starts.size:
+        return np.empty(0, dtype=np.int64)
+    # Expand runs without a Python loop: a cumulative sum of ones with a jump at each run start
+    steps = np.ones(int(lengths.sum()), dtype=np.int64)
+    heads = np.cumsum(lengths)[:-1]
+    steps[0] = starts[0]
+    steps[heads] = starts[1:] - (starts[:-1] + lengths[:-1] - 1)
+    return np.cumsum(steps)
+
+def _values(s: pd.Series, pos: np.ndarray | None = None):
+    """
+    Values of s (at pos) as a typed array: a numpy array for numpy dtypes,
+    the extension array otherwise.
+    """
+    arr = s.array if not isinstance(s.dtype, np.dtype) else s.to_numpy()
+    return arr if pos is None else arr[pos]
+
+_type_of = np.frompyfunc(type, 1, 1)
+
+def _changed(old: pd.Series, new: pd.Series) -> np.ndarray:
+    """
+    Positions where new differs from old. Values that compare equal but have
+    another type (1 and 1.0, None and NaN) count as changed so they can be
+    restored exactly.
+    """
+    if old.dtype == new.dtype and isinstance(old.dtype, np.dtype) and old.dtype.kind in "biufmM":
+        a, b = old.to_numpy(), new.to_numpy()
+        same = a == b
+        if a.dtype.kind in "fmM":
+            same |= pd.isna(a) & pd.isna(b)
+        return np.flatnonzero(~same)
+    a, b = old.to_numpy(dtype=object), new.to_numpy(dtype=object)
+    na_a, na_b = pd.isna(a), pd.isna(b)
+    same = na_a & na_b
+    both = ~na_a & ~na_b
+    x, y = a[both], b[both]
+    try:
+        same[both] = np.asarray(x == y, dtype=bool)
+    except (TypeError, ValueError):
+        same[both] = np.fromiter((u == v for u, v in zip(x, y)), dtype=bool, count=len(x))
+    same &= _type_of(a) == _type_of(b)
+    return np.flatnonzero(~same)
+
+def _same_buffer(a: pd.Series, b: pd.Series) -> bool:
+    """
+    True when b is the very same column data as a, e.g. a column a step did
+    not touch. Cheap check that lets record() skip the comparison.
+    """
+    if not isinstance(a.dtype, np.dtype) or a.dtype != b.dtype or len(a) != len(b):
+        return False
+    x, y = a.to_numpy(), b.to_numpy()
+    return x.__array_interface__ == y.__array_interface__
+
+class FrameDiff:
+    """
+    Ordered per-stage diffs. Call record(before, after) after each stage and
+    reconstruct(final) to get the first frame back.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+        # A RangeIndex on the original is restored as is, so a cleaned frame
+        # read back from CSV (which loses its index) reconstructs the same way.
+        # Read it with float_precision="round_trip", or untouched floats can be one bit off.
+        self.range_index: tuple | None = None
+
+    def record(self, before: pd.DataFrame, after: pd.DataFrame, kept: np.ndarray | None = None) -> None:
+        """
+        Add the diff of one stage. kept holds the positions in before of the
+        rows in after; by default they are looked up by index label.
+        """
+        if kept is None:
+            kept = before.index.get_indexer(after.index)
+            if (kept < 0).any():
+                raise ValueError("after has rows that are not in before; pass kept=")
+        kept = np.asarray(kept, dtype=np.int64)
+        if not self.stages and isinstance(before.index, pd.RangeIndex):
+            self.range_index = (before.index.start, before.index.stop, before.index.step, before.index.name)
+        stage: Dict[str, Any] = {"n_rows": len(before), "columns": list(before.columns), "changes": []}
+        if len(kept) != len(before) or not np.array_equal(kept, np.arange(len(before))):
+            dropped = np.setdiff1d(np.arange(len(before)), kept, assume_unique=True)
+            stage["kept"] = _encode_positions(kept)
+            stage["dropped"] = {
+                "positions": _encode_positions(dropped),
+                "index": before.index[dropped],
+                "values": [_values(before.iloc[:, i], dropped) for i in range(before.shape[1])],
+            }
+            base = before.iloc[kept]
+        else:
+            base = before
+        after_cols = set(after.columns)
+        for i, col in enumerate(before.columns):
+            old = base.iloc[:, i]
+            if col not in after_cols:
+                stage["changes"].append({"column": col, "dropped": _values(old), "dtype": old.dtype})
+                continue
+            new = after[col]
+            if _same_buffer(old, new):
+                continue
+            pos = _changed(old, new)
+            if pos.size or old.dtype != new.dtype:
+                stage["changes"].append({
+                    "column": col,
+                    "dtype": old.dtype,
+                    "positions": _encode_positions(pos),
+                    "values": _values(old, pos),
+                })
+        self.stages.append(stage)
+
+    def reconstruct(self, final: pd.DataFrame) -> pd.DataFrame:
+        """
+        Undo every recorded stage, newest first, with vectorized scatters.
+        """
+        cur = final
+        for stage in reversed(self.stages):
+            cols: Dict[Any, Any] = {}
+            for change in stage["changes"]:
+                col = change["column"]
+                if "dropped" in change:
+                    cols[col] = change["dropped"]
+                    continue
+                s = cur[col]
+                pos = _decode_positions(change["positions"])
+                if s.dtype == change["dtype"] and isinstance(s.dtype, np.dtype):
+                    out = s.to_numpy(copy=True)
+                    out[pos] = change["values"]
+                else:
+                    out = s.to_numpy(dtype=object, copy=True)
+                    out[pos] = np.asarray(change["values"], dtype=object)
+                    out = pd.array(out, dtype=change["dtype"]) if not isinstance(change["dtype"], np.dtype) else out.astype(change["dtype"])
+                cols[col] = out
+            data = {c: cols[c] if c in cols else _values(cur[c]) for c in stage["columns"]}
+            index = cur.index
+            if "kept" in stage:
+                kept = _decode_positions(stage["kept"])
+                dropped = _decode_positions(stage["dropped"]["positions"])
+                full = {}
+                for i, c in enumerate(stage["columns"]):
+                    full[c] = _scatter(data[c], stage["dropped"]["values"][i], kept, dropped, stage["n_rows"])
+                data = full
+                index = _scatter_index(index, stage["dropped"]["index"], kept, dropped, stage["n_rows"])
+            cur = pd.DataFrame({i: data[c] for i, c in enumerate(stage["columns"])}, index=index)
+            cur.columns = pd.Index(stage["columns"])
+        if self.range_index is not None:
+            start, stop, step, name = self.range_index
+            cur.index = pd.RangeIndex(start, stop, step, name=name)
+        return cur
+
+    def to_bytes(self) -> bytes:
+        """
+        Compressed binary form, loadable without pickle. Object columns may
+        hold strings, numbers, booleans, timestamps and missing markers;
+        anything else raises ValueError.
+        """
+        packer = _Packer()
+        header: Dict[str, Any] = {"version": _DIFF_VERSION, "range_index": None,
+                                  "stages": [packer.stage(stage) for stage in self.stages]}
+        if self.range_index is not None:
+            start, stop, step, name = self.range_index
+            header["range_index"] = {"bounds": [int(start), int(stop), int(step)], "name": packer.labels([name])}
+        buf = io.BytesIO()
+        np.savez(buf, allow_pickle=False, header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+                 **packer.arrays)
+        return zlib.compress(buf.getvalue(), 1)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FrameDiff":
+        """
+        Load bytes written by to_bytes. Payloads that would need pickle are
+        rejected rather than executed.
+        """
+        with np.load(io.BytesIO(zlib.decompress(data)), allow_pickle=False) as archive:
+            try:
+                header = json.loads(archive["header"].tobytes().decode("utf-8"))
+            except (KeyError, ValueError) as exc:
+                raise ValueError("not a diff written by FrameDiff.to_bytes") from exc
+            if not isinstance(header, dict) or header.get("version") != _DIFF_VERSION:
+                version = header.get("version") if isinstance(header, dict) else None
+                raise ValueError(f"unsupported diff version {version!r}")
+            unpacker = _Unpacker(archive)
+            try:
+                diff = cls()
+                if header["range_index"] is not None:
+                    start, stop, step = header["range_index"]["bounds"]
+                    diff.range_index = (start, stop, step, unpacker.labels(header["range_index"]["name"])[0])
+                diff.stages = [unpacker.stage(stage) for stage in header["stages"]]
+            except (KeyError, IndexError, TypeError) as exc:
+                raise ValueError("malformed diff") from exc
+        return diff
+
+def _scatter(kept_values, dropped_values, kept: np.ndarray, dropped: np.ndarray, n: int):
+    if isinstance(kept_values, np.ndarray) and isinstance(dropped_values, np.ndarray) and kept_values.dtype == dropped_values.dtype:
+        out = np.empty(n, dtype=kept_values.dtype)
+        out[kept] = kept_values
+        out[dropped] = dropped_values
+        return out
+    # Extension arrays: scatter through object, then restore the dtype
+    out = np.empty(n, dtype=object)
+    out[kept] = np.asarray(kept_values, dtype=object)
+    out[dropped] = np.asarray(dropped_values, dtype=object)
+    return pd.array(out, dtype=kept_values.dtype)
+
+def _scatter_index(index: pd.Index, dropped_labels: pd.Index, kept: np.ndarray, dropped: np.ndarray, n: int) -> pd.Index:
+    values = _scatter(index.to_numpy(), dropped_labels.to_numpy(), kept, dropped, n)
+    out = pd.Index(values, name=index.name)
+    if out.equals(pd.RangeIndex(n)):
+        return pd.RangeIndex(n, name=index.name)
+    return out
+
+_MASKED = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+_NO_PAYLOAD = {type(None): "None", type(pd.NA): "NA", type(pd.NaT): "NaT"}
+_SCALARS = {str: "str", bool: "bool", int: "int", float: "float"}
+
+def _index_values(index: pd.Index):
+    return index.to_numpy() if isinstance(index.dtype, np.dtype) else index.array
+
+class _Packer:
+    """
+    Flattens stages into a JSON-able header and named arrays for to_bytes.
+    """
+
+    def __init__(self):
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def array(self, arr: np.ndarray) -> str:
+        arr = np.ascontiguousarray(arr)
+        if arr.dtype.hasobject:
+            raise ValueError("object arrays can't be stored without pickle")
+        key = f"a{len(self.arrays)}"
+        self.arrays[key] = arr
+        return key
+
+    def positions(self, enc: Dict[str, np.ndarray]) -> Dict[str, str]:
+        return {k: self.array(v) for k, v in enc.items()}
+
+    def labels(self, labels: List[Any]) -> Dict[str, Any]:
+        arr = np.empty(len(labels), dtype=object)
+        arr[:] = labels
+        return self.objects(arr)
+
+    def stage(self, stage: Dict[str, Any]) -> Dict[str, Any]:
+        columns = list(stage["columns"])
+        out: Dict[str, Any] = {"n_rows": int(stage["n_rows"]), "columns": self.labels(columns), "changes": []}
+        for change in stage["changes"]:
+            entry: Dict[str, Any] = {"column": columns.index(change["column"])}
+            if "dropped" in change:
+                entry["dropped"] = self.values(change["dropped"])
+            else:
+                entry["positions"] = self.positions(change["positions"])
+                entry["values"] = self.values(change["values"])
+            out["changes"].append(entry)
+        if "kept" in stage:
+            dropped = stage["dropped"]
+            out["kept"] = self.positions(stage["kept"])
+            out["dropped"] = {
+                "positions": self.positions(dropped["positions"]),
+                "index": {"values": self.values(_index_values(dropped["index"])), "name": self.labels([dropped["index"].name])},
+                "values": [self.values(v) for v in dropped["values"]],
+            }
+        return out
+
+    def values(self, arr) -> Dict[str, Any]:
+        """
+        One typed array: numpy arrays as is, masked and categorical arrays by
+        their parts, other extension arrays by their values and dtype name.
+        """
+        if isinstance(arr, np.ndarray):
+            return self.objects(arr) if arr.dtype == object else {"array": self.array(arr)}
+        if isinstance(arr, pd.Categorical):
+            return {"codes": self.array(arr.codes), "categories": self.values(_index_values(arr.categories)),
+                    "ordered": bool(arr.ordered)}
+        if isinstance(arr, _MASKED):
+            return {"masked": str(arr.dtype), "mask": self.array(arr.isna()),
+                    "data": self.array(arr.to_numpy(dtype=arr.dtype.numpy_dtype, na_value=0))}
+        return {"extension": str(arr.dtype), **self.objects(np.asarray(arr, dtype=object))}
+
+    def objects(self, arr: np.ndarray) -> Dict[str, Any]:
+        """
+        An object array as a type code per value plus one typed payload per
+        type, so the exact Python types come back.
+        """
+        codes, types = pd.factorize(_type_of(arr))
+        groups = []
+        for k, t in enumerate(types):
+            sel = arr[codes == k]
+            if t in _NO_PAYLOAD:
+                groups.append({"type": _NO_PAYLOAD[t]})
+            elif t is str:
+                parts = [x.encode("utf-8", "surrogatepass") for x in sel]
+                groups.append({"type": "str", "lengths": self.array(np.fromiter(map(len, parts), dtype=np.int64, count=len(parts))),
+                               "data": self.array(np.frombuffer(b"".join(parts), dtype=np.uint8))})
+            elif t in _SCALARS:
+                try:
+                    payload = np.array(sel.tolist(), dtype={"bool": np.bool_, "int": np.int64, "float": np.float64}[_SCALARS[t]])
+                except OverflowError as exc:
+                    raise ValueError("integers beyond 64 bits can't be stored in a diff") from exc
+                groups.append({"type": _SCALARS[t], "data": self.array(payload)})
+            elif t is pd.Timestamp:
+                try:
+                    ns = np.fromiter((x.value for x in sel), dtype=np.int64, count=len(sel))
+                except OverflowError as exc:
+                    raise ValueError("timestamps outside the nanosecond range can't be stored in a diff") from exc
+                groups.append({"type": "Timestamp", "data": self.array(ns),
+                               "tz": self.labels([str(x.tz) if x.tz is not None else None for x in sel]),
+                               "unit": self.labels([x.unit for x in sel])})
+            elif issubclass(t, np.generic) and np.dtype(t).kind in "biufc":
+                groups.append({"type": "numpy", "dtype": np.dtype(t).str, "data": self.array(np.array(list(sel), dtype=t))})
+            else:
+                raise ValueError(f"{t.__name__} values can't be stored in a diff without pickle")
+        return {"codes": self.array(codes.astype(np.int32)), "groups": groups}
+
+class _Unpacker:
+    """
+    Rebuilds stages from a header and the arrays of an .npz archive.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+
+    def array(self, key: str) -> np.ndarray:
+        return self.archive[key]
+
+    def positions(self, enc: Dict[str, str]) -> Dict[str, np.ndarray]:
+        return {k: self.array(v) for k, v in enc.items()}
+
+    def labels(self, spec: Dict[str, Any]) -> List[Any]:
+        return self.objects(spec).tolist()
+
+    def stage(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        columns = self.labels(spec["columns"])
+        stage: Dict[str, Any] = {"n_rows": spec["n_rows"], "columns": columns, "changes": []}
+        for entry in spec["changes"]:
+            change: Dict[str, Any] = {"column": columns[entry["column"]]}
+            if "dropped" in entry:
+                change["dropped"] = self.values(entry["dropped"])
+                change["dtype"] = change["dropped"].dtype
+            else:
+                change["positions"] = self.positions(entry["positions"])
+                change["values"] = self.values(entry["values"])
+                change["dtype"] = change["values"].dtype
+            stage["changes"].append(change)
+        if "kept" in spec:
+            dropped = spec["dropped"]
+            stage["kept"] = self.positions(spec["kept"])
+            stage["dropped"] = {
+                "positions": self.positions(dropped["positions"]),
+                "index": pd.Index(self.values(dropped["index"]["values"]), name=self.labels(dropped["index"]["name"])[0]),
+                "values": [self.values(v) for v in dropped["values"]],
+            }
+        return stage
+
+    def values(self, spec: Dict[str, Any]):
+        if "array" in spec:
+            return self.array(spec["array"])
+        if "categories" in spec:
+            dtype = pd.CategoricalDtype(pd.Index(self.values(spec["categories"])), ordered=spec["ordered"])
+            return pd.Categorical.from_codes(self.array(spec["codes"]), dtype=dtype)
+        if "masked" in spec:
+            cls = pd.api.types.pandas_dtype(spec["masked"]).construct_array_type()
+            return cls(self.array(spec["data"]), self.array(spec["mask"]))
+        if "extension" in spec:
+            return pd.array(self.objects(spec), dtype=pd.api.types.pandas_dtype(spec["extension"]))
+        return self.objects(spec)
+
+    def objects(self, spec: Dict[str, Any]) -> np.ndarray:
+        codes = self.array(spec["codes"])
+        out = np.full(len(codes), None, dtype=object)
+        for k, group in enumerate(spec["groups"]):
+            at = codes == k
+            kind = group["type"]
+            if kind == "NA":
+                out[at] = pd.NA
+            elif kind == "NaT":
+                out[at] = pd.NaT
+            elif kind == "str":
+                lengths = self.array(group["lengths"])
+                ends = np.cumsum(lengths)
+                data = self.array(group["data"]).tobytes()
+                out[at] = [data[e - n:e].decode("utf-8", "surrogatepass") for e, n in zip(ends.tolist(), lengths.tolist())]
+            elif kind in ("bool", "int", "float"):
+                out[at] = self.array(group["data"]).tolist()
+            elif kind == "Timestamp":
+                tzs, units = self.labels(group["tz"]), self.labels(group["unit"])
+                out[at] = [pd.Timestamp(v, unit="ns", tz="UTC").tz_convert(tz).as_unit(unit) if tz is not None
+                           else pd.Timestamp(v, unit="ns").as_unit(unit)
+                           for v, tz, unit in zip(self.array(group["data"]).tolist(), tzs, units)]
+            elif kind == "numpy":
+                data = self.array(group["data"])
+                if data.dtype.str != group["dtype"]:
+                    raise ValueError("malformed diff")
+                out[at] = list(data)
+            elif kind != "None":
+                raise ValueError(f"unknown value type {kind!r} in diff")
+        return out
@@ -1,74 +1,307 @@
 from __future__ import annotations
 import math
-from typing import Dict, Any, List, Tuple
+import warnings
+from typing import Dict, Any, Iterator, List, Sequence, Tuple
 import numpy as np
 import pandas as pd
 
+from core.compact import SOURCE_DTYPES
+from core.trace import span, traced
+from radar.coerce import as_datetime, as_numeric, infer_kind, unparseable
+from radar.correlation import correlation_summary
+from radar.neardup import near_duplicate_summary
+from radar.rowhash import RowHashIndex
+
 def _is_numeric(series: pd.Series) -> bool:
     return pd.api.types.is_numeric_dtype(series)
 
 def _is_datetime(series: pd.Series) -> bool:
     return pd.api.types.is_datetime64_any_dtype(series)
 
-def basic_profile(df: pd.DataFrame) -> Dict[str, Any]:
+# Numeric dtypes that are stacked into 2D blocks and profiled together.
+# Anything else numeric (bool, nullable extension arrays, float32) keeps the
+# per-column path so its results stay identical to numpy's 1D behaviour.
+_BLOCK_DTYPES = (np.dtype("float64"), np.dtype("int64"))
+_BLOCK_CELLS = 1 << 24
+_PERCENTILES = (5.0, 25.0, 75.0, 95.0)
+# Most frequent values kept per categorical column; enough for the EDA bar chart
+TOP_VALUES = 15
+# Missing share above which a column's missing values are an error, not a warning
+MISSING_ERROR_PCT = 20
+
+def _outlier_bounds(q1, q3):
+    iqr = q3 - q1
+    return q1 - 1.5 * iqr, q3 + 1.5 * iqr, iqr
+
+def _lerp(a, b, t):
     """
-    Compute lightweight quality metrics without external deps.
+    Same interpolation numpy uses for the "linear" percentile method.
     """
-    n_rows, n_cols = df.shape
-    duplicate_rows = int(df.duplicated().sum())
-    col_summaries = []
-    for col in df.columns:
-        s = df[col]
+    diff_b_a = b - a
+    out = np.add(a, diff_b_a * t)
+    np.subtract(b, diff_b_a * (1 - t), out=out, where=t >= 0.5)
+    return out
+
+def _sorted_percentiles(sorted_block: np.ndarray, counts: np.ndarray, pcts=_PERCENTILES) -> np.ndarray:
+    """
+    Percentiles for every column of a block sorted along axis 0 with NaNs last.
+    Returns an array of shape (len(pcts), n_cols), NaN where a column is empty.
+    """
+    n_cols = sorted_block.shape[1]
+    out = np.full((len(pcts), n_cols), np.nan)
+    has = counts > 0
+    if not has.any():
+        return out
+    cols = np.flatnonzero(has)
+    n = counts[has]
+    for k, pct in enumerate(pcts):
+        q = np.true_divide(pct, 100)
+        virtual = (n - 1) * q
+        prev = np.floor(virtual)
+        gamma = virtual - prev
+        prev_idx = prev.astype(np.intp)
+        next_idx = prev_idx + 1
+        above = virtual >= n - 1
+        prev_idx[above] = n[above] - 1
+        next_idx[above] = n[above] - 1
+        below = virtual < 0
+        prev_idx[below] = 0
+        next_idx[below] = 0
+        a = sorted_block[prev_idx, cols]
+        b = sorted_block[next_idx, cols]
+        out[k, cols] = _lerp(a, b, gamma)
+    return out
+
+def _numeric_block_summaries(block: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Profile a Fortran-ordered (rows, cols) block of one dtype in a single pass:
+    one sort gives min, max, distinct counts and every percentile, and the
+    moments are reduced along axis 0 for all columns at once.
+    """
+    n_rows, n_cols = block.shape
+    if block.dtype.kind == "f":
+        nan_mask = np.isnan(block)
+        missing = nan_mask.sum(axis=0)
+    else:
+        nan_mask = None
+        missing = np.zeros(n_cols, dtype=np.intp)
+    counts = n_rows - missing
+    ordered = np.sort(block, axis=0)
+
+    # Distinct non-null values: one plus the number of changes in sorted order.
+    # NaNs sort last and never compare equal, so every pair touching the NaN
+    # tail counts as a change and is subtracted again.
+    changes = (ordered[1:] != ordered[:-1]).sum(axis=0)
+    unique = changes - (n_rows - np.maximum(counts, 1)) + (counts > 0)
+    unique = np.where(counts > 0, unique, 0)
+
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(block, axis=0)
+        std = np.nanstd(block, axis=0)
+    p05, q1, q3, p95 = _sorted_percentiles(ordered, counts)
+    lower, upper, iqr = _outlier_bounds(q1, q3)
+    flag = ~np.isnan(iqr) & (iqr > 0)
+    with np.errstate(invalid="ignore"):
+        out_mask = (block < lower) | (block > upper)
+    outliers = np.where(flag, out_mask.sum(axis=0), 0)
+
+    last = np.maximum(counts - 1, 0)
+    mins = ordered[0] if n_rows else np.zeros(n_cols)
+    maxs = ordered[last, np.arange(n_cols)] if n_rows else np.zeros(n_cols)
+    summaries = []
+    for j in range(n_cols):
+        has = counts[j] > 0
+        summaries.append({
+            "missing": int(missing[j]),
+            "unique": int(unique[j]),
+            "min": float(mins[j]) if has else None,
+            "max": float(maxs[j]) if has else None,
+            "mean": float(mean[j]) if has else None,
+            "std": float(std[j]) if has else None,
+            "p95": float(p95[j]) if has else None,
+            "p05": float(p05[j]) if has else None,
+            "outliers_iqr": int(outliers[j]),
+        })
+    return summaries
+
+def _numeric_column_summary(s: pd.Series) -> Dict[str, Any]:
+    s_numeric = as_numeric(s)
+    has = s_numeric.notna().any()
+    info = {
+        "min": float(np.nanmin(s_numeric)) if has else None,
+        "max": float(np.nanmax(s_numeric)) if has else None,
+        "mean": float(np.nanmean(s_numeric)) if has else None,
+        "std": float(np.nanstd(s_numeric)) if has else None,
+        "p95": float(np.nanpercentile(s_numeric, 95)) if has else None,
+        "p05": float(np.nanpercentile(s_numeric, 5)) if has else None,
+    }
+    # Simple outlier flag via IQR
+    q1 = np.nanpercentile(s_numeric, 25) if has else np.nan
+    q3 = np.nanpercentile(s_numeric, 75) if has else np.nan
+    lower, upper, iqr = _outlier_bounds(q1, q3)
+    if not np.isnan(iqr) and iqr > 0:
+        info["outliers_iqr"] = int(((s_numeric < lower) | (s_numeric > upper)).sum())
+    else:
+        info["outliers_iqr"] = 0
+    return info
+
+def _block_groups(df: pd.DataFrame) -> Dict[np.dtype, List[int]]:
+    groups: Dict[np.dtype, List[int]] = {}
+    for i, dtype in enumerate(df.dtypes):
+        if dtype in _BLOCK_DTYPES:
+            groups.setdefault(dtype, []).append(i)
+    return groups
+
+def _column_summary(s: pd.Series, n_rows: int) -> Dict[str, Any]:
+    if _is_numeric(s):
         miss = int(s.isna().sum())
         unique = int(s.nunique(dropna=True))
-        info = {
-            "column": col,
-            "dtype": str(s.dtype),
-            "missing": miss,
-            "missing_pct": (miss / n_rows * 100) if n_rows else 0.0,
-            "unique": unique,
+        extra = _numeric_column_summary(s)
+    elif _is_datetime(s):
+        miss = int(s.isna().sum())
+        unique = int(s.nunique(dropna=True))
+        s_dt = as_datetime(s)
+        extra = {
+            "min_date": str(s_dt.min()) if s_dt.notna().any() else None,
+            "max_date": str(s_dt.max()) if s_dt.notna().any() else None,
         }
-        if _is_numeric(s):
-            s_numeric = pd.to_numeric(s, errors="coerce")
-            info.update({
-                "min": float(np.nanmin(s_numeric)) if s_numeric.notna().any() else None,
-                "max": float(np.nanmax(s_numeric)) if s_numeric.notna().any() else None,
-                "mean": float(np.nanmean(s_numeric)) if s_numeric.notna().any() else None,
-                "std": float(np.nanstd(s_numeric)) if s_numeric.notna().any() else None,
-                "p95": float(np.nanpercentile(s_numeric, 95)) if s_numeric.notna().any() else None,
-                "p05": float(np.nanpercentile(s_numeric, 5)) if s_numeric.notna().any() else None,
-            })
-            # Simple outlier flag via IQR
-            q1 = np.nanpercentile(s_numeric, 25) if s_numeric.notna().any() else np.nan
-            q3 = np.nanpercentile(s_numeric, 75) if s_numeric.notna().any() else np.nan
-            iqr = q3 - q1 if not np.isnan(q1) and not np.isnan(q3) else np.nan
-            if not np.isnan(iqr) and iqr > 0:
-                lower = q1 - 1.5 * iqr
-                upper = q3 - 1.5 * iqr
-                outliers = int(((s_numeric < lower) | (s_numeric > upper)).sum())
-            else:
-                outliers = 0
-            info["outliers_iqr"] = outliers
-        elif _is_datetime(s):
-            s_dt = pd.to_datetime(s, errors="coerce")
-            info.update({
-                "min_date": str(s_dt.min()) if s_dt.notna().any() else None,
-                "max_date": str(s_dt.max()) if s_dt.notna().any() else None,
-            })
+    else:
+        # Categorical summary; one value_counts pass also gives the cardinality
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # Count codes so ties keep first-appearance order like an object column
+            codes = pd.Series(s.cat.codes.to_numpy())
+            counts = codes[codes >= 0].value_counts()
+            counts.index = s.cat.categories.take(counts.index.to_numpy())
         else:
-            # Categorical summary
-            top = s.value_counts(dropna=True).head(5)
-            info["top_values"] = top.to_dict()
-        col_summaries.append(info)
+            counts = s.value_counts(dropna=True)
+        miss = int(s.isna().sum())
+        unique = int(len(counts))
+        extra = {"top_values": counts.head(TOP_VALUES).to_dict()}
+        # Numbers or dates stored as text, and how many cells don't fit
+        kind = infer_kind(s)
+        if kind != "text":
+            extra["inferred_type"] = kind
+            extra["unparseable"] = int(unparseable(s, kind).sum())
+    return {
+        "column": s.name,
+        "dtype": str(s.dtype),
+        "missing": miss,
+        "missing_pct": (miss / n_rows * 100) if n_rows else 0.0,
+        "unique": unique,
+        **extra,
+    }
+
+def _fill_block(df: pd.DataFrame, positions: List[int], dtype, out: np.ndarray | None = None) -> np.ndarray:
+    if out is None:
+        out = np.empty((len(df), len(positions)), dtype=dtype, order="F")
+    for j, pos in enumerate(positions):
+        out[:, j] = df.iloc[:, pos].to_numpy()
+    return out
+
+def _block_column_summary(name, dtype, stats: Dict[str, Any], n_rows: int) -> Dict[str, Any]:
+    miss = stats.pop("missing")
+    return {
+        "column": name,
+        "dtype": str(dtype),
+        "missing": miss,
+        "missing_pct": (miss / n_rows * 100) if n_rows else 0.0,
+        **stats,
+    }
 
+def _report_source_dtypes(df: pd.DataFrame, col_summaries: List[Dict[str, Any]]) -> None:
+    """
+    Columns shrunk by core.compact report the dtype they were loaded with.
+    """
+    source = df.attrs.get(SOURCE_DTYPES)
+    if source:
+        for info in col_summaries:
+            info["dtype"] = source.get(str(info["column"]), info["dtype"])
+
+def iter_profile(df: pd.DataFrame, near_duplicates: bool = False,
+                 near_subset: Sequence | None = None, correlations: bool = False) -> Iterator[Tuple[str, Any]]:
+    """
+    basic_profile one piece at a time, for callers that show results as they
+    arrive: ("column", (position, summary)) as each column finishes, then
+    ("duplicate_rows", count), ("near_duplicates", summary) and
+    ("correlations", summary) if asked for.
+    """
+    n_rows, n_cols = df.shape
+    done = [False] * n_cols
+
+    width = max(1, _BLOCK_CELLS // max(n_rows, 1))
+    with span("dq_checks.numeric_blocks", df):
+        for dtype, positions in _block_groups(df).items():
+            for start in range(0, len(positions), width):
+                chunk = positions[start:start + width]
+                block = _fill_block(df, chunk, dtype)
+                for pos, stats in zip(chunk, _numeric_block_summaries(block)):
+                    summary = _block_column_summary(df.columns[pos], dtype, stats, n_rows)
+                    _report_source_dtypes(df, [summary])
+                    done[pos] = True
+                    yield "column", (pos, summary)
+
+    with span("dq_checks.other_columns", df):
+        for pos in range(n_cols):
+            if not done[pos]:
+                summary = _column_summary(df.iloc[:, pos], n_rows)
+                _report_source_dtypes(df, [summary])
+                yield "column", (pos, summary)
+
+    with span("dq_checks.duplicates", df):
+        duplicate_rows = RowHashIndex.for_frame(df).duplicate_count()
+    yield "duplicate_rows", duplicate_rows
+
+    if near_duplicates:
+        with span("dq_checks.near_duplicates", df):
+            near = near_duplicate_summary(df, near_subset)
+        yield "near_duplicates", near
+
+    if correlations:
+        with span("dq_checks.correlations", df):
+            summary = correlation_summary(df)
+        yield "correlations", summary
+
+@traced
+def basic_profile(df: pd.DataFrame, workers: int | None = None, near_duplicates: bool = False,
+                  near_subset: Sequence | None = None, correlations: bool = False) -> Dict[str, Any]:
+    """
+    Compute lightweight quality metrics without external deps.
+    Columns are grouped by dtype; float64 and int64 columns are stacked into
+    2D blocks and profiled together, everything else is summarised per column.
+    workers > 1 opts into radar.parallel, which gives identical results.
+    near_duplicates adds radar.neardup's summary under "near_duplicates",
+    comparing the near_subset columns (all by default); it costs a few
+    seconds per 100k rows, so it is off by default. correlations adds
+    radar.correlation's redundant-column pairs under "correlations" (None
+    otherwise); on wide tables it can cost as much as the rest of the
+    profile, so it is off by default too.
+    """
+    if workers is not None and workers > 1:
+        from radar.parallel import parallel_profile
+        result = parallel_profile(df, workers, correlations=correlations)
+        if near_duplicates:
+            result["near_duplicates"] = near_duplicate_summary(df, near_subset)
+        return result
+
+    n_rows, n_cols = df.shape
     result = {
         "rows": n_rows,
         "cols": n_cols,
-        "duplicate_rows": duplicate_rows,
-        "columns": col_summaries,
+        "duplicate_rows": 0,
+        "columns": [None] * n_cols,
+        "correlations": None,
     }
+    for kind, value in iter_profile(df, near_duplicates=near_duplicates, near_subset=near_subset,
+                                    correlations=correlations):
+        if kind == "column":
+            pos, summary = value
+            result["columns"][pos] = summary
+        else:
+            result[kind] = value
     return result
 
+@traced
 def issues_from_profile(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Turn metrics into human-friendly issues with severities.
@@ -83,13 +316,23 @@ def issues_from_profile(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
             "message": f"{profile['duplicate_rows']} duplicate rows detected",
             "suggestion": "Drop exact duplicates"
         })
+    # Near-duplicate rows; only profiles asked to look for them have the entry
+    near = profile.get("near_duplicates")
+    if near and near["rows"] > 0:
+        issues.append({
+            "type": "near_duplicates",
+            "level": "warning",
+            "message": f"{near['rows']} rows nearly duplicate another row ({near['groups']} groups at "
+                       f"similarity {near['threshold']:.2f} or more)",
+            "suggestion": "Review the groups; auto_repair can merge each group into its first row or drop the rest"
+        })
     # Column specific
     for col in profile["columns"]:
         name = col["column"]
         miss = col["missing"]
         miss_pct = col["missing_pct"]
         if miss > 0:
-            level = "error" if miss_pct > 20 else "warning"
+            level = "error" if miss_pct > MISSING_ERROR_PCT else "warning"
             issues.append({
                 "type": "missing_values",
                 "column": name,
@@ -97,6 +340,27 @@ def issues_from_profile(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
                 "message": f"{miss} missing values in {name} ({miss_pct:.1f} percent)",
                 "suggestion": "Impute with median for numeric, mode for categorical, or flag rows"
             })
+        if "inferred_type" in col:
+            kind = col["inferred_type"]
+            bad = col["unparseable"]
+            if bad > 0:
+                filled = n_rows - miss
+                issues.append({
+                    "type": "unparseable_values",
+                    "column": name,
+                    "level": "warning",
+                    "message": f"{bad} values in {name} don't parse as {kind} "
+                               f"({bad / filled * 100 if filled else 0.0:.1f} percent of filled cells)",
+                    "suggestion": "Fix or clear them, then convert the column; radar.coerce.unparseable finds the cells"
+                })
+            else:
+                issues.append({
+                    "type": "stored_as_text",
+                    "column": name,
+                    "level": "info",
+                    "message": f"{name} holds {kind} values stored as text",
+                    "suggestion": f"Convert it to {kind} so the matching checks and charts apply"
+                })
         if "outliers_iqr" in col and col["outliers_iqr"] and col["outliers_iqr"] > 0:
             issues.append({
                 "type": "outliers",
@@ -105,10 +369,22 @@ def issues_from_profile(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
                 "message": f"{col['outliers_iqr']} potential outliers in {name} by IQR rule",
                 "suggestion": "Review distribution and cap or winsorize if needed"
             })
+    # Redundant numeric columns; profiles from older runs have no correlations
+    for pair in (profile.get("correlations") or {}).get("pairs", []):
+        issues.append({
+            "type": "high_correlation",
+            "column": pair["b"],
+            "level": "info",
+            "message": f"{pair['a']} and {pair['b']} are highly correlated (r = {pair['corr']:.3f})",
+            "suggestion": "One of them is likely redundant; consider dropping it before modeling"
+        })
     return issues
 
-def run_checks(df: pd.DataFrame) -> Dict[str, Any]:
-    profile = basic_profile(df)
+@traced
+def run_checks(df: pd.DataFrame, workers: int | None = None, near_duplicates: bool = False,
+               near_subset: Sequence | None = None, correlations: bool = False) -> Dict[str, Any]:
+    profile = basic_profile(df, workers=workers, near_duplicates=near_duplicates, near_subset=near_subset,
+                            correlations=correlations)
     issues = issues_from_profile(profile)
     return {"profile": profile, "issues": issues}
 
@@ -119,3 +395,11 @@ def to_mpl_missingness(df: pd.DataFrame):
     cols = list(df.columns)
     missing_counts = [int(df[c].isna().sum()) for c in cols]
     return cols, missing_counts
+
+def missingness_from_profile(profile: Dict[str, Any]):
+    """
+    Same arrays as to_mpl_missingness, read from an existing profile.
+    """
+    cols = [c["column"] for c in profile["columns"]]
+    missing_counts = [c["missing"] for c in profile["columns"]]
+    return cols, missing_counts
@@ -0,0 +1,222 @@
+"""
+Drift between two profiles without going back to either CSV. profile_sketches
+condenses a frame into what the comparison needs: per numeric column a grid
+of 101 quantiles (its CDF to within one percentile) and a 20-bin histogram,
+per other column its most frequent values with counts. compare_profiles
+turns two {"profile", "sketches"} records into per-column drift:
+- missingness: change in missing percent
+- numeric: PSI over the reference's deciles and the KS distance, both read
+  off the quantile grids, so they are accurate to about one percentile
+- categorical: PSI over the reference's stored values plus an "other"
+  bucket, and values never seen in the reference
+drift_issues phrases the result like issues_from_profile.
+"""
+from __future__ import annotations
+from typing import Dict, Any, List
+import numpy as np
+import pandas as pd
+
+from core.trace import traced
+from radar.coerce import as_numeric
+from radar.dq_checks import _sorted_percentiles
+
+QUANTILE_GRID = np.linspace(0.0, 100.0, 101)
+HIST_BINS = 20
+# Values kept per categorical column; a column with at most this many is stored whole
+CATEGORY_VALUES = 100
+
+# Thresholds behind drift_issues
+PSI_WARNING = 0.25
+PSI_INFO = 0.1
+MISSING_SHIFT_PCT = 5.0
+_PSI_FLOOR = 1e-4
+# From a truncated value list only values this common get their own PSI bucket
+_MIN_BUCKET_SHARE = 0.01
+
+def _numeric_sketch(s: pd.Series) -> Dict[str, Any]:
+    values = as_numeric(s).to_numpy(dtype=np.float64, na_value=np.nan)
+    ordered = np.sort(values)
+    count = int((~np.isnan(ordered)).sum())
+    sketch: Dict[str, Any] = {"kind": "numeric", "count": count}
+    if count == 0:
+        return sketch
+    finite = ordered[:count]
+    quantiles = _sorted_percentiles(finite[:, None], np.array([count]), pcts=QUANTILE_GRID)[:, 0]
+    edges = np.linspace(finite[0], finite[-1], HIST_BINS + 1)
+    hist = np.diff(np.searchsorted(finite, edges, side="right"))
+    hist[0] += int(np.searchsorted(finite, edges[0], side="right"))
+    sketch.update(quantiles=quantiles.tolist(), hist_edges=edges.tolist(), hist_counts=hist.astype(int).tolist())
+    return sketch
+
+def _category_sketch(s: pd.Series) -> Dict[str, Any]:
+    counts = s.value_counts(dropna=True)
+    top = counts.head(CATEGORY_VALUES)
+    return {
+        "kind": "categorical",
+        "count": int(counts.sum()),
+        "complete": len(counts) <= CATEGORY_VALUES,
+        "values": {str(k): int(v) for k, v in top.items()},
+    }
+
+@traced
+def profile_sketches(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Column name -> JSON-friendly sketch for compare_profiles. Datetime
+    columns only take part through their missingness.
+    """
+    sketches = {}
+    for name, s in df.items():
+        if pd.api.types.is_datetime64_any_dtype(s):
+            sketches[str(name)] = {"kind": "other", "count": int(s.notna().sum())}
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            sketches[str(name)] = _numeric_sketch(s)
+        else:
+            sketches[str(name)] = _category_sketch(s)
+    return sketches
+
+def _cdf(quantiles: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    CDF read off a quantile grid, linear between grid points. Ties take the
+    highest rank, so a value repeated across the grid gets its full mass.
+    """
+    idx = np.searchsorted(quantiles, x, side="right")
+    lo = np.clip(idx - 1, 0, len(quantiles) - 1)
+    hi = np.clip(idx, 0, len(quantiles) - 1)
+    span = quantiles[hi] - quantiles[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(span > 0, (x - quantiles[lo]) / span, 0.0)
+    out = (QUANTILE_GRID[lo] + frac * (QUANTILE_GRID[hi] - QUANTILE_GRID[lo])) / 100
+    return np.where(idx == 0, 0.0, np.where(idx >= len(quantiles), 1.0, out))
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """
+    Population stability index between two bucket distributions.
+    """
+    e = np.maximum(np.asarray(expected, dtype=np.float64), _PSI_FLOOR)
+    a = np.maximum(np.asarray(actual, dtype=np.float64), _PSI_FLOOR)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+def _numeric_drift(ref: Dict[str, Any], cur: Dict[str, Any]) -> Dict[str, Any]:
+    q_ref, q_cur = np.asarray(ref["quantiles"]), np.asarray(cur["quantiles"])
+    edges = np.unique(q_ref[10:100:10])
+    p_ref = np.diff(np.concatenate([[0.0], _cdf(q_ref, edges), [1.0]]))
+    p_cur = np.diff(np.concatenate([[0.0], _cdf(q_cur, edges), [1.0]]))
+    points = np.union1d(q_ref, q_cur)
+    ks = float(np.max(np.abs(_cdf(q_ref, points) - _cdf(q_cur, points))))
+    return {"psi": psi(p_ref, p_cur), "ks": ks, "median_ref": float(q_ref[50]), "median_cur": float(q_cur[50])}
+
+def _category_drift(ref: Dict[str, Any], cur: Dict[str, Any]) -> Dict[str, Any]:
+    keys = list(ref["values"])
+    if not ref["complete"]:
+        # The tail of a truncated list is the values that happened to come up
+        # most often; they regress in any new sample and would read as drift
+        keys = [k for k in keys if ref["values"][k] >= _MIN_BUCKET_SHARE * ref["count"]]
+    ref_counts = np.array([ref["values"][k] for k in keys], dtype=np.float64)
+    cur_counts = np.array([cur["values"].get(k, 0) for k in keys], dtype=np.float64)
+    # Values outside the reference's list share one bucket on both sides
+    p_ref = np.append(ref_counts, ref["count"] - ref_counts.sum()) / max(ref["count"], 1)
+    p_cur = np.append(cur_counts, cur["count"] - cur_counts.sum()) / max(cur["count"], 1)
+    out: Dict[str, Any] = {"psi": psi(p_ref, p_cur), "new_categories": []}
+    if ref["complete"]:
+        # Only a reference stored whole can say a value never occurred in it
+        new = {k: v for k, v in cur["values"].items() if k not in ref["values"]}
+        out["new_categories"] = sorted(new, key=new.get, reverse=True)
+        out["new_category_rows"] = int(sum(new.values()))
+    return out
+
+def compare_profiles(reference: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Drift from reference to current, each a {"profile", "sketches"} record
+    as kept by radar.store. Returns {"rows_ref", "rows_cur", "columns": [...]}
+    with one entry per column in either profile; "status" is "added",
+    "removed" or "common", and common columns carry the missing percents,
+    dtypes and, where both sketches allow, "psi", "ks" and "new_categories".
+    """
+    ref_cols = {str(c["column"]): c for c in reference["profile"]["columns"]}
+    cur_cols = {str(c["column"]): c for c in current["profile"]["columns"]}
+    ref_sk, cur_sk = reference.get("sketches", {}), current.get("sketches", {})
+    columns = []
+    for name in list(ref_cols) + [n for n in cur_cols if n not in ref_cols]:
+        if name not in cur_cols:
+            columns.append({"column": name, "status": "removed"})
+            continue
+        if name not in ref_cols:
+            columns.append({"column": name, "status": "added"})
+            continue
+        rc, cc = ref_cols[name], cur_cols[name]
+        entry = {
+            "column": name,
+            "status": "common",
+            "dtype_ref": rc["dtype"],
+            "dtype_cur": cc["dtype"],
+            "missing_pct_ref": rc["missing_pct"],
+            "missing_pct_cur": cc["missing_pct"],
+            "missing_shift": cc["missing_pct"] - rc["missing_pct"],
+        }
+        rs, cs = ref_sk.get(name), cur_sk.get(name)
+        if rs and cs and rs["kind"] == cs["kind"] and rs["count"] and cs["count"]:
+            if rs["kind"] == "numeric":
+                entry.update(_numeric_drift(rs, cs))
+            elif rs["kind"] == "categorical":
+                entry.update(_category_drift(rs, cs))
+        columns.append(entry)
+    return {
+        "rows_ref": reference["profile"]["rows"],
+        "rows_cur": current["profile"]["rows"],
+        "columns": columns,
+    }
+
+def drift_issues(drift: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Issues in the issues_from_profile format for a compare_profiles result.
+    """
+    issues = []
+    for col in drift["columns"]:
+        name = col["column"]
+        if col["status"] != "common":
+            issues.append({
+                "type": "schema_drift",
+                "column": name,
+                "level": "warning",
+                "message": f"Column {name} was {col['status']} since the reference upload",
+                "suggestion": "Check the upstream export before comparing the two uploads"
+            })
+            continue
+        if col["dtype_ref"] != col["dtype_cur"]:
+            issues.append({
+                "type": "schema_drift",
+                "column": name,
+                "level": "warning",
+                "message": f"{name} changed type from {col['dtype_ref']} to {col['dtype_cur']}",
+                "suggestion": "Look for text or sentinel values that stopped the column parsing as before"
+            })
+        if abs(col["missing_shift"]) > MISSING_SHIFT_PCT:
+            issues.append({
+                "type": "missingness_drift",
+                "column": name,
+                "level": "warning",
+                "message": f"Missing values in {name} went from {col['missing_pct_ref']:.1f} to "
+                           f"{col['missing_pct_cur']:.1f} percent",
+                "suggestion": "Check whether a source stopped filling this field"
+            })
+        if col.get("psi") is not None and col["psi"] >= PSI_INFO:
+            detail = f", KS {col['ks']:.3f}" if "ks" in col else ""
+            issues.append({
+                "type": "distribution_drift",
+                "column": name,
+                "level": "warning" if col["psi"] >= PSI_WARNING else "info",
+                "message": f"Distribution of {name} shifted (PSI {col['psi']:.3f}{detail})",
+                "suggestion": "Compare the two uploads' histograms; retrain or recalibrate downstream models if the shift is real"
+            })
+        if col.get("new_categories"):
+            shown = ", ".join(map(str, col["new_categories"][:5]))
+            more = len(col["new_categories"]) - 5
+            issues.append({
+                "type": "new_categories",
+                "column": name,
+                "level": "info",
+                "message": f"{len(col['new_categories'])} new values in {name} ({col['new_category_rows']} rows): "
+                           f"{shown}{f' and {more} more' if more > 0 else ''}",
+                "suggestion": "Map new values to known ones or extend downstream encodings"
+            })
+    return issues
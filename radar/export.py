@@ -0,0 +1,334 @@
+"""
+Bounded-memory export. A recipe plan is fitted once on the whole frame:
+every statistic it needs (fill values, group fills, IQR bounds, which rows
+survive deduplication) is computed one column at a time and kept as a small
+per-column chain of steps. The cleaned frame is then produced chunk by
+chunk and encoded straight into the output, so exporting costs one chunk
+plus the compressor's buffers instead of a repaired copy, a CSV string and
+its encoded bytes:
+
+    plan = fit_plan(df, Pipeline().auto_repair().to_dict())
+    export_to_path(plan.chunks(), "clean.csv.gz", compression="gzip")
+
+The chunks concatenate to exactly what Pipeline.run returns (apart from the
+index, which exports never write) and plan.changelog matches its log.
+Steps are fitted with the radar.recipes kernels on one- or few-column
+frames, so both paths share their rules. An auto_repair step that follows
+other steps hashes the frame as those steps left it, which materializes the
+changed columns once, as Pipeline.run would.
+"""
+from __future__ import annotations
+import io
+import os
+import tempfile
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+
+from core.io import _has_pyarrow, _has_zstandard
+from core.trace import span, traced
+from radar import recipes, repair
+from radar.coerce import as_numeric
+from radar.pipeline import Pipeline
+from radar.rowhash import RowHashIndex
+
+CHUNK_ROWS = 100_000
+FORMATS = ("csv", "parquet")
+CSV_COMPRESSIONS = (None, "gzip", "zstd")
+_SUFFIXES = {("csv", None): ".csv", ("csv", "gzip"): ".csv.gz", ("csv", "zstd"): ".csv.zst", ("parquet", None): ".parquet"}
+
+def _first_missing(before: pd.Series) -> int:
+    return int(np.argmax(before.isna().to_numpy()))
+
+class ChunkPlan:
+    """
+    A plan fitted to one frame. columns maps each output column, in output
+    order, to (source column, steps); rows holds the source positions that
+    survive deduplication, or None for all of them. Steps are
+    ("fill", value), ("numeric", dtype), ("patch", positions, values),
+    ("clip", lower, upper) and ("known",), applied in order.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.rows: np.ndarray | None = None
+        self.columns: Dict[Any, Tuple[Any, List[tuple]]] = {c: (c, []) for c in df.columns}
+        self.changelog: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.df) if self.rows is None else len(self.rows)
+
+    def column(self, name, start: int = 0, stop: int | None = None) -> pd.Series:
+        """
+        Output rows start:stop of one column.
+        """
+        source, steps = self.columns[name]
+        stop = len(self) if stop is None else stop
+        s = self.df[source]
+        s = s.iloc[start:stop] if self.rows is None else s.iloc[self.rows[start:stop]]
+        s = s.reset_index(drop=True)
+        for step in steps:
+            kind = step[0]
+            if kind == "fill":
+                s = s.fillna(step[1])
+            elif kind == "numeric":
+                s = pd.to_numeric(s, errors="coerce").astype(step[1])
+            elif kind == "patch":
+                positions, values = step[1], step[2]
+                lo, hi = np.searchsorted(positions, [start, stop])
+                if hi > lo:
+                    s = s.copy()
+                    s.iloc[positions[lo:hi] - start] = values[lo:hi]
+            elif kind == "clip":
+                s = s.clip(lower=step[1], upper=step[2])
+            elif kind == "known":
+                s = s.notna().astype("int64")
+        s.name = name
+        return s
+
+    def frame(self) -> pd.DataFrame:
+        """
+        The whole output; the source frame itself while nothing changed it.
+        """
+        if self.rows is None and list(self.columns) == list(self.df.columns) \
+                and all(src == name and not steps for name, (src, steps) in self.columns.items()):
+            return self.df
+        return pd.DataFrame({name: self.column(name) for name in self.columns})
+
+    def chunks(self, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        The output in row chunks; an empty output still yields one frame so
+        writers see the columns.
+        """
+        n = len(self)
+        for start in range(0, n, chunksize) if n else [0]:
+            stop = min(start + chunksize, n)
+            chunk = pd.DataFrame({name: self.column(name, start, stop) for name in self.columns})
+            chunk.index = pd.RangeIndex(start, stop)
+            yield chunk
+
+    def _add_step(self, name, step: tuple) -> None:
+        source, steps = self.columns[name]
+        self.columns[name] = (source, steps + [step])
+
+    def _select(self, keep: np.ndarray) -> None:
+        """
+        Narrow the output to the sorted output positions keep; patches
+        fitted so far move with their rows.
+        """
+        self.rows = keep if self.rows is None else self.rows[keep]
+        for name, (source, steps) in self.columns.items():
+            moved = []
+            for step in steps:
+                if step[0] == "patch":
+                    kept = np.isin(step[1], keep)
+                    step = ("patch", np.searchsorted(keep, step[1][kept]), step[2][kept])
+                moved.append(step)
+            self.columns[name] = (source, moved)
+
+    def _fit_auto_repair(self, strategy: str = "safe", near_duplicates: str | None = None,
+                         near_threshold: float = repair.NEAR_DUP_THRESHOLD, near_subset: List | None = None) -> None:
+        current = self.frame()
+        keep = RowHashIndex.for_frame(current).first_positions()
+        if len(keep) < len(current):
+            self._select(keep)
+            self.changelog.append({"op": "drop_duplicates", "rows_removed": int(len(current) - len(keep))})
+        if near_duplicates is not None:
+            keep, fills, entry = repair._near_duplicate_fix(self.frame(), near_duplicates, near_threshold, near_subset)
+            if entry is not None:
+                self._select(keep)
+                for name, (positions, values) in fills.items():
+                    self._add_step(name, ("patch", np.searchsorted(keep, positions), values))
+                self.changelog.append(entry)
+        for name in list(self.columns):
+            before = self.column(name)
+            work = pd.DataFrame({name: before})
+            entry = repair._impute_column(work, name)
+            if entry is None:
+                continue
+            if entry["op"] != "impute_mode_skipped":
+                # One value fills every gap; read it back from the first one
+                self._add_step(name, ("fill", work[name].iloc[_first_missing(before)]))
+            self.changelog.append(entry)
+
+    def _fit_impute_mode(self, cols) -> None:
+        for col in cols:
+            if col not in self.columns:
+                continue
+            before = self.column(col)
+            work = pd.DataFrame({col: before})
+            entries = recipes._impute_mode(work, [col])
+            if entries:
+                self._add_step(col, ("fill", work[col].iloc[_first_missing(before)]))
+            self.changelog.extend(entries)
+
+    def _fit_impute_grouped(self, targets, by, stat: str = "median", q: float = 0.5, fallback: bool = True) -> None:
+        if isinstance(targets, str):
+            targets = [targets]
+        stats = dict(targets) if isinstance(targets, dict) else {t: stat for t in targets}
+        present = [t for t in stats if t in self.columns]
+        work = pd.DataFrame({c: self.column(c) for c in dict.fromkeys(list(by) + present) if c in self.columns})
+        masks = {}
+        for t in present:
+            before = work[t]
+            converted = recipes._fill_stat(before, stats[t])
+            if converted is not before:
+                self._add_step(t, ("numeric", converted.dtype))
+                work[t] = converted
+            masks[t] = work[t].isna().to_numpy()
+        self.changelog.extend(recipes._impute_grouped(work, stats, by, q=q, fallback=fallback))
+        for t in present:
+            filled = np.flatnonzero(masks[t] & work[t].notna().to_numpy())
+            if len(filled):
+                self._add_step(t, ("patch", filled, work[t].to_numpy()[filled]))
+
+    def _fit_add_known_indicator(self, col, name=None, drop_original: bool = False) -> None:
+        if col not in self.columns:
+            return
+        source, steps = self.columns[col]
+        ind_name = name or f"{col}Known"
+        self.columns[ind_name] = (source, steps + [("known",)])
+        self.changelog.append({"op": "add_indicator", "source": col, "indicator": ind_name})
+        if drop_original:
+            del self.columns[col]
+            self.changelog.append({"op": "drop_column", "column": col})
+
+    def _fit_winsorize_iqr(self, cols, factor: float = 1.5, suffix: str = "_w") -> None:
+        for col in cols:
+            if col not in self.columns:
+                continue
+            s = self.column(col)
+            if not pd.api.types.is_numeric_dtype(s):
+                s = as_numeric(s)
+                self._add_step(col, ("numeric", s.dtype))
+            entries = recipes._winsorize_iqr(pd.DataFrame({col: s}), [col], factor=factor, suffix=suffix)
+            source, steps = self.columns[col]
+            self.columns[f"{col}{suffix}"] = (source, steps + [("clip", entries[0]["lower"], entries[0]["upper"])])
+            self.changelog.extend(entries)
+
+@traced
+def fit_plan(df: pd.DataFrame, plan: Dict[str, Any] | None = None) -> ChunkPlan:
+    """
+    Fit a serialized plan (Pipeline.to_dict()) to df for chunked output.
+    No plan exports df as it is.
+    """
+    fitted = ChunkPlan(df)
+    for stage in Pipeline.from_dict(plan).stages() if plan else []:
+        params = {k: v for k, v in stage.items() if k != "op"}
+        with span(f"export.fit.{stage['op']}", df):
+            getattr(fitted, f"_fit_{stage['op']}")(**params)
+    return fitted
+
+class _Sink(io.RawIOBase):
+    """
+    Write-only buffer drained after every chunk; tell() keeps counting so
+    writers that track their position (Parquet) work on it.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+def _compressor(sink: _Sink, compression: str | None, level: int | None):
+    if compression is None:
+        return sink
+    if compression == "gzip":
+        import gzip
+        return gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6 if level is None else level, mtime=0)
+    if compression == "zstd":
+        if _has_zstandard():
+            import zstandard
+            return zstandard.ZstdCompressor(level=3 if level is None else level).stream_writer(sink, closefd=False)
+        if _has_pyarrow():
+            import pyarrow as pa
+            return pa.CompressedOutputStream(sink, "zstd")
+        raise ImportError("zstd output needs the zstandard package or pyarrow")
+    raise ValueError(f"unknown compression {compression!r}; expected one of {CSV_COMPRESSIONS}")
+
+def _iter_csv(chunks: Iterable[pd.DataFrame], compression: str | None, level: int | None) -> Iterator[bytes]:
+    sink = _Sink()
+    raw = _compressor(sink, compression, level)
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="", write_through=True)
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(text, header=i == 0, index=False)
+        text.flush()
+        out = sink.drain()
+        if out:
+            yield out
+    text.flush()
+    text.detach()
+    if raw is not sink:
+        # Closing the compressor writes its trailer into the sink
+        raw.close()
+    yield sink.drain()
+
+def _iter_parquet(chunks: Iterable[pd.DataFrame], compression: str | None) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _Sink()
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            # Object columns that are empty in the first chunk have no type yet
+            schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in schema],
+                               metadata=schema.metadata)
+            writer = pq.ParquetWriter(sink, schema, compression=compression or "snappy")
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        out = sink.drain()
+        if out:
+            yield out
+    writer.close()
+    yield sink.drain()
+
+def iter_export(chunks: Iterable[pd.DataFrame], fmt: str = "csv", compression: str | None = None,
+                level: int | None = None) -> Iterator[bytes]:
+    """
+    Encoded output as a stream of byte blocks, one or more per chunk. CSV
+    is UTF-8 with a header and no index, optionally gzip or zstd
+    compressed; Parquet (pyarrow required) uses compression as its column
+    codec, snappy by default.
+    """
+    if fmt == "csv":
+        return _iter_csv(chunks, compression, level)
+    if fmt == "parquet":
+        if not _has_pyarrow():
+            raise ImportError("Parquet output needs pyarrow")
+        return _iter_parquet(chunks, compression)
+    raise ValueError(f"unknown export format {fmt!r}; expected one of {FORMATS}")
+
+def suffix_for(fmt: str = "csv", compression: str | None = None) -> str:
+    return _SUFFIXES.get((fmt, compression if fmt == "csv" else None), f".{fmt}")
+
+@traced
+def export_to_path(chunks: Iterable[pd.DataFrame], path: str | None = None, fmt: str = "csv",
+                   compression: str | None = None, level: int | None = None) -> str:
+    """
+    Write iter_export's blocks to path, or to a new temp file named with
+    the matching suffix when path is None. Returns the path; the caller
+    owns the temp file.
+    """
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="radar-export-", suffix=suffix_for(fmt, compression))
+        os.close(fd)
+    with open(path, "wb") as f:
+        for block in iter_export(chunks, fmt=fmt, compression=compression, level=level):
+            f.write(block)
+    return path
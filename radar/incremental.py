@@ -0,0 +1,170 @@
+"""
+Incremental profiles for append-only files. The ProfileState of the last
+upload is saved next to the parse cache together with the byte size and a
+hash of the content it covers. When a new upload starts with exactly those
+bytes, only the appended rows are parsed and folded into the saved state;
+anything else rebuilds the state from the whole file.
+"""
+from __future__ import annotations
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+from typing import Dict, Any
+import pandas as pd
+
+from core.cache import default_cache_dir
+from core.io import _encoding_order, source_format
+from radar.dq_checks import issues_from_profile
+from radar.streaming import ProfileState
+
+# Bump when ProfileState or the record layout changes so old states are rebuilt.
+_STATE_VERSION = 2
+_HASH_BLOCK = 1 << 22
+
+def default_store_dir() -> str:
+    return os.path.join(default_cache_dir(), "profiles")
+
+def _source_key(uploaded_file) -> str:
+    name = getattr(uploaded_file, "name", None)
+    if name is None and isinstance(uploaded_file, (str, os.PathLike)):
+        name = os.path.abspath(uploaded_file)
+    if name is None:
+        raise ValueError("pass key= for file objects without a name")
+    return str(name)
+
+def _open(uploaded_file):
+    if hasattr(uploaded_file, "read"):
+        uploaded_file.seek(0)
+        return uploaded_file, False
+    return open(uploaded_file, "rb"), True
+
+def _size(f) -> int:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+def _hash_into(h, f, n: int) -> None:
+    left = n
+    while left > 0:
+        block = f.read(min(_HASH_BLOCK, left))
+        if not block:
+            break
+        h.update(block)
+        left -= len(block)
+
+def _fold(state: ProfileState, source, encoding: str, chunksize: int) -> None:
+    for chunk in pd.read_csv(source, encoding=encoding, chunksize=chunksize):
+        if len(chunk):
+            state.update(chunk)
+
+def _load_record(path: str) -> Dict[str, Any] | None:
+    try:
+        with open(path, "rb") as f:
+            record = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(record, dict) or record.get("version") != _STATE_VERSION:
+        return None
+    return record
+
+def _save_record(path: str, record: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _rebuild(f, encoding_fallbacks, chunksize: int):
+    last_err = None
+    for enc in _encoding_order(f, encoding_fallbacks):
+        state = ProfileState()
+        try:
+            f.seek(0)
+            _fold(state, f, enc, chunksize)
+            return state, enc
+        except (UnicodeDecodeError, pd.errors.ParserError) as e:
+            last_err = e
+    raise last_err
+
+def update_profile_state(uploaded_file, key: str | None = None, store_dir: str | None = None,
+                         chunksize: int = 100_000, encoding_fallbacks=("utf-8", "latin-1")):
+    """
+    Bring the saved ProfileState for this source up to date with its current
+    content. Returns (state, info) where info["mode"] is "unchanged", "append"
+    or "full" and info["new_rows"] counts the rows parsed by this call.
+    The source is identified by key, else by the upload's name or the path.
+    """
+    if source_format(uploaded_file) != "csv":
+        raise ValueError("incremental profiles need an uncompressed CSV file")
+    key = key or _source_key(uploaded_file)
+    store_dir = store_dir or default_store_dir()
+    path = os.path.join(store_dir, hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest() + ".pkl")
+
+    f, owned = _open(uploaded_file)
+    try:
+        size = _size(f)
+        record = _load_record(path)
+        h = hashlib.blake2b(digest_size=20)
+        mode, state = "full", None
+        if record is not None and record["size"] <= size and record["ends_with_newline"]:
+            _hash_into(h, f, record["size"])
+            if h.hexdigest() == record["prefix"]:
+                mode = "unchanged" if record["size"] == size else "append"
+                state, encoding = record["state"], record["encoding"]
+
+        rows_before = state.rows if state is not None else 0
+        if mode == "append":
+            delta = f.read()
+            h.update(delta)
+            try:
+                _fold(state, io.BytesIO(record["header"] + delta), encoding, chunksize)
+            except (UnicodeDecodeError, pd.errors.ParserError):
+                # The new rows don't parse like the old ones: start over
+                mode = "full"
+        if mode == "full":
+            rows_before = 0
+            state, encoding = _rebuild(f, encoding_fallbacks, chunksize)
+            h = hashlib.blake2b(digest_size=20)
+            f.seek(0)
+            _hash_into(h, f, size)
+
+        if mode != "unchanged":
+            f.seek(0)
+            header = f.readline()
+            f.seek(max(size - 1, 0))
+            _save_record(path, {
+                "version": _STATE_VERSION,
+                "size": size,
+                "prefix": h.hexdigest(),
+                "ends_with_newline": f.read(1) == b"\n",
+                "encoding": encoding,
+                "header": header,
+                "state": state,
+            })
+    finally:
+        if owned:
+            f.close()
+        else:
+            f.seek(0)
+    return state, {"mode": mode, "new_rows": state.rows - rows_before}
+
+def run_checks_incremental(uploaded_file, key: str | None = None, store_dir: str | None = None,
+                           chunksize: int = 100_000) -> Dict[str, Any]:
+    """
+    run_checks for a file that only ever grows by appended rows. The profile
+    and issues are regenerated from the saved state, so a re-upload costs a
+    hash of the known prefix plus parsing the new rows.
+    """
+    state, info = update_profile_state(uploaded_file, key=key, store_dir=store_dir, chunksize=chunksize)
+    profile = state.profile()
+    profile["incremental"] = info
+    issues = issues_from_profile(profile)
+    return {"profile": profile, "issues": issues}
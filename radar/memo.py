@@ -0,0 +1,213 @@
+from __future__ import annotations
+import copy
+import functools
+import hashlib
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Tuple
+import numpy as np
+import pandas as pd
+
+from radar import correlation, dq_checks, pipeline, recipes, repair
+
+# Digests of hashed columns and indexes, by the array or Index object that
+# holds them, so reruns and every Series over the same column skip the hash.
+# Like corr_matrix this assumes data isn't written in place once hashed.
+_digests: Dict[int, Tuple[weakref.ref, Dict[Tuple, bytes]]] = {}
+_digests_lock = threading.Lock()
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame: shape, labels, dtypes and every value.
+    Numeric and Arrow buffers are hashed as raw bytes; other columns go
+    through pandas' vectorized hash first, along with each value's type.
+    Each column is hashed once per backing array.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((df.shape, list(df.columns), [str(t) for t in df.dtypes])).encode("utf-8"))
+    if isinstance(df.index, pd.RangeIndex):
+        h.update(repr((df.index.start, df.index.stop, df.index.step)).encode("utf-8"))
+    else:
+        h.update(_digest(df.index, (), lambda: [pd.util.hash_pandas_object(df.index).to_numpy().tobytes()]))
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        storage, view = _storage(s)
+        h.update(_digest(storage, view, lambda: _column_buffers(s)))
+    return h.hexdigest()
+
+def _storage(s: pd.Series) -> Tuple[Any, Tuple]:
+    """
+    The object holding s's values and where s sits in it. Series over numpy
+    data are fresh views, so they're traced back to the array they view.
+    """
+    if isinstance(s.dtype, np.dtype):
+        values = s.to_numpy()
+        base = values
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        return base, (values.__array_interface__["data"][0], values.shape, values.strides, values.dtype.str)
+    return s.array, (str(s.dtype),)
+
+def _digest(owner, view: Tuple, buffers: Callable) -> bytes:
+    with _digests_lock:
+        hit = _digests.get(id(owner))
+        if hit is not None and hit[0]() is owner and view in hit[1]:
+            return hit[1][view]
+    h = hashlib.blake2b(digest_size=16)
+    for buf in buffers():
+        h.update(buf)
+    digest = h.digest()
+    with _digests_lock:
+        hit = _digests.get(id(owner))
+        if hit is None or hit[0]() is not owner:
+            owner_id = id(owner)
+            hit = (weakref.ref(owner, lambda _: _digests.pop(owner_id, None)), {})
+            _digests[owner_id] = hit
+        hit[1][view] = digest
+    return digest
+
+_type_of = np.frompyfunc(type, 1, 1)
+
+def _column_buffers(s: pd.Series):
+    if isinstance(s.dtype, np.dtype) and s.dtype != object:
+        yield np.ascontiguousarray(s.to_numpy()).view(np.uint8)
+    elif hasattr(s.array, "__arrow_array__"):
+        # Arrow-backed columns: hash the buffers instead of every element.
+        # A different chunk layout only costs a cache miss, never a wrong hit.
+        arr = s.array.__arrow_array__()
+        for chunk in getattr(arr, "chunks", [arr]):
+            yield repr((str(chunk.type), chunk.offset, len(chunk))).encode("utf-8")
+            for buf in chunk.buffers():
+                if buf is not None:
+                    yield buf
+    else:
+        values = s.to_numpy(dtype=object)
+        yield pd.util.hash_array(values).tobytes()
+        # hash_array goes through str(), so 1 and "1" only differ by type
+        yield pd.util.hash_array(_type_of(values)).tobytes()
+
+def _freeze(value):
+    if isinstance(value, pd.DataFrame):
+        return ("df", frame_fingerprint(value))
+    if isinstance(value, pd.Series):
+        return ("series", frame_fingerprint(value.to_frame()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+def _sizeof(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        # deep only costs extra on object columns, which is where it matters
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+def _detach(value):
+    """
+    Copy a cached value on the way out so callers can't mutate the cache.
+    DataFrames and Series get a shallow copy under copy-on-write and a deep
+    one without it (pandas 2 by default).
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return pipeline._writable_copy(value)
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    return copy.deepcopy(value)
+
+class MemoCache:
+    """
+    Thread-safe LRU cache bounded by an approximate byte budget, with
+    per-function hit and miss counters.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Tuple, Tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def get(self, name: str, key: Tuple):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return True, self._entries[key][0]
+            self.misses[name] = self.misses.get(name, 0) + 1
+            return False, None
+
+    def put(self, key: Tuple, value) -> None:
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, old) = self._entries.popitem(last=False)
+                self._bytes -= old
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits.clear()
+            self.misses.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+            }
+
+CACHE = MemoCache(int(os.environ.get("DQR_MEMO_BYTES", 512 * 1024 ** 2)))
+
+def memoize(func: Callable, cache: MemoCache | None = None) -> Callable:
+    """
+    Wrap func so repeated calls on the same data version return the cached
+    result. DataFrame arguments are keyed by frame_fingerprint.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        store = cache or CACHE
+        key = (name, _freeze(args), _freeze(kwargs))
+        hit, value = store.get(name, key)
+        if not hit:
+            value = func(*args, **kwargs)
+            store.put(key, value)
+        return _detach(value)
+
+    return wrapper
+
+def memo_stats() -> Dict[str, Any]:
+    return CACHE.stats()
+
+run_checks = memoize(dq_checks.run_checks)
+corr_matrix = memoize(correlation.corr_matrix)
+auto_repair = memoize(repair.auto_repair)
+impute_mode = memoize(recipes.impute_mode)
+impute_group_median = memoize(recipes.impute_group_median)
+impute_grouped = memoize(recipes.impute_grouped)
+add_known_indicator = memoize(recipes.add_known_indicator)
+winsorize_iqr = memoize(recipes.winsorize_iqr)
+run_plan = memoize(pipeline.run_plan)
+run_plan_with_diff = memoize(pipeline.run_plan_with_diff)
@@ -0,0 +1,422 @@
+"""
+Near-duplicate rows, such as "Jon Smith" and "jon smith" with the same email.
+Every row becomes a set of shingles: one token per cell, text normalized to
+lower case with punctuation folded to spaces, plus the character 3-grams of
+free-text cells (text columns whose values are mostly distinct, such as
+names or emails), each tagged with its column so equal values in different
+columns don't match. Codes from low-cardinality columns stay whole: a
+different status or country is a different value, not a typo.
+
+MinHash condenses each set into NUM_PERM minimums, a batch of rows at a
+time, and LSH banding puts rows that agree on a whole band in the same
+bucket. A band whose minimums all come from shingles that many rows share
+(a status, a country, the "com" of every email) is skipped, so rows alike
+only in those don't fill the same buckets. Only rows sharing a bucket are
+compared, so the work grows with the number of rows rather than pairs.
+Candidates must agree on the digits of their free text, since a different
+house number or the next sequential email is another record rather than a
+typo; they are screened with the low byte of each minimum and then
+confirmed by the exact Jaccard similarity of their shingle sets:
+
+    groups = near_duplicate_groups(df, subset=["name", "email"])
+
+Exact duplicates are left to radar.rowhash: only the first row of each
+exact-duplicate group takes part.
+"""
+from __future__ import annotations
+from typing import Dict, Any, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from core.trace import traced
+from radar.rowhash import RowHashIndex, _column_hash, _combine
+
+NUM_PERM = 120
+# 24 bands of 5 minimums: a pair at similarity 0.8 shares a band with
+# probability 0.9999, at 0.7 with 0.99, at 0.4 with 0.22 and at 0.2 with 0.008.
+# Bands whose minimums all come from common shingles don't count
+BANDS = 24
+NEAR_DUP_THRESHOLD = 0.7
+SHINGLE = 3
+# Text columns with more distinct values than this share of their filled
+# cells also contribute character 3-grams
+FREE_TEXT_SHARE = 0.5
+# Shingles in more than this share of rows, and in at least _COMMON_ROWS of
+# them, are common: they can't make up a band on their own
+COMMON_SHARE = 0.01
+_COMMON_ROWS = 100
+# Rows, evenly spaced, in which shingle frequencies are counted
+_COMMON_SAMPLE = 20_000
+# Pairs shown in a profile's near_duplicates entry
+EXAMPLES = 5
+# Shingle-by-permutation cells hashed at once; same budget as dq_checks' blocks
+_BATCH_CELLS = 1 << 24
+_ROW_BATCH = 50_000
+# A batch of _BATCH_CELLS shingles holds fewer pairs than 2 ** _PAIR_BITS
+_PAIR_BITS = 24
+# Bucket neighbours each row is paired with; larger buckets (rows that are
+# all alike) are linked through chains of pairs instead of every pair
+_WINDOW = 32
+# Candidates whose estimated similarity is this far below the threshold are
+# dropped unconfirmed; about four standard errors of a NUM_PERM estimate
+_ESTIMATE_MARGIN = 0.2
+_SEED = 0x5EED
+
+_rng = np.random.default_rng(_SEED)
+# Signatures are 32-bit: half the memory traffic of 64-bit hashing, and a
+# chance collision between two rows' minimums costs one agreement in NUM_PERM
+_PERM_MUL = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint32) * np.uint32(2) + np.uint32(1)
+_PERM_ADD = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint32)
+_EMPTY = np.iinfo(np.uint32).max
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """
+    splitmix64 finalizer; spreads 3-gram codes over all 64 bits.
+    """
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _is_text(s: pd.Series) -> bool:
+    return not (pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s))
+
+def _free_text(frame: pd.DataFrame) -> List[int]:
+    """
+    Positions of the text columns that get character 3-grams.
+    """
+    out = []
+    for pos in range(frame.shape[1]):
+        s = frame.iloc[:, pos]
+        if _is_text(s) and s.nunique(dropna=True) > FREE_TEXT_SHARE * s.count():
+            out.append(pos)
+    return out
+
+def _normalized(s: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    present = s.notna().to_numpy()
+    norm = (s[present].astype(str).str.lower()
+            .str.replace(r"[\W_]+", " ", regex=True).str.strip())
+    return np.flatnonzero(present), norm
+
+def _text_shingles(rows: np.ndarray, norm: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (row, code) for every character 3-gram of the column's normalized cells.
+    All cells are joined into one buffer with NUL separators, so the 3-grams
+    of the whole column come from three shifted views of it.
+    """
+    if not rows.size:
+        return rows, np.empty(0, dtype=np.uint64)
+    # Padding gives short values and word edges their own 3-grams
+    buf = np.frombuffer(("\x00".join(" " + norm + " ") + "\x00").encode("utf-8"), dtype=np.uint8)
+    sep = buf == 0
+    width = SHINGLE - 1
+    valid = ~sep[:-width].copy()
+    for k in range(1, SHINGLE):
+        valid &= ~sep[k:len(buf) - width + k]
+    starts = np.flatnonzero(valid)
+    codes = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(SHINGLE):
+        codes = (codes << np.uint64(8)) | buf[starts + k].astype(np.uint64)
+    segment = np.cumsum(sep)[starts]
+    return rows[segment], codes
+
+def _cell_shingles(s: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    rows = np.flatnonzero(s.notna().to_numpy())
+    return rows, _column_hash(s)[rows]
+
+def _column_shingles(s: pd.Series, pos: int, free_text: Sequence[int]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    (rows, hashes) parts of one column, each sorted by row: the whole cells,
+    then for free text their 3-grams.
+    """
+    tag = np.uint64((pos + 1) * 0x9E3779B97F4A7C15 % (1 << 64))
+    if _is_text(s):
+        rows, norm = _normalized(s)
+        parts = [(rows, _column_hash(norm))]
+        if pos in free_text:
+            parts.append(_text_shingles(rows, norm))
+    else:
+        parts = [_cell_shingles(s)]
+    return [(rows, _mix(codes ^ tag)) for rows, codes in parts]
+
+def _shingles(df: pd.DataFrame, free_text: Sequence[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Shingle sets of df's rows as (indptr, hashes): row i's distinct hashes,
+    sorted, are hashes[indptr[i]:indptr[i + 1]]. free_text lists the column
+    positions that also give 3-grams.
+    """
+    parts = [part for pos in range(df.shape[1]) for part in _column_shingles(df.iloc[:, pos], pos, free_text)]
+    rows = np.concatenate([r for r, _ in parts]) if parts else np.empty(0, dtype=np.int64)
+    hashes = np.concatenate([h for _, h in parts]) if parts else np.empty(0, dtype=np.uint64)
+    order = np.lexsort((hashes, rows))
+    rows, hashes = rows[order], hashes[order]
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = (rows[1:] != rows[:-1]) | (hashes[1:] != hashes[:-1])
+    rows, hashes = rows[keep], hashes[keep]
+    indptr = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(df)), out=indptr[1:])
+    return indptr, hashes
+
+def _common_shingles(df: pd.DataFrame, free_text: Sequence[int]) -> np.ndarray:
+    """
+    Sorted hashes of the shingles in more than COMMON_SHARE of the rows,
+    counted over an evenly spaced sample of them.
+    """
+    n = len(df)
+    sample = df.iloc[np.linspace(0, n - 1, _COMMON_SAMPLE).astype(np.int64)] if n > _COMMON_SAMPLE else df
+    share = _COMMON_SAMPLE / n if n > _COMMON_SAMPLE else 1.0
+    limit = max(COMMON_SHARE * n, _COMMON_ROWS) * share
+    common = [np.empty(0, dtype=np.uint64)]
+    for pos in range(df.shape[1]):
+        for rows, hashes in _column_shingles(sample.iloc[:, pos], pos, free_text):
+            # A repeated 3-gram counts once per row
+            _, once = np.unique(_mix(rows.astype(np.uint64)) ^ hashes, return_index=True)
+            values, counts = np.unique(hashes[once], return_counts=True)
+            common.append(values[counts > limit])
+    return np.unique(np.concatenate(common))
+
+def _is_common(hashes: np.ndarray, common: np.ndarray) -> np.ndarray:
+    if not common.size:
+        return np.zeros(len(hashes), dtype=bool)
+    return common[np.minimum(np.searchsorted(common, hashes), len(common) - 1)] == hashes
+
+def _numbers(df: pd.DataFrame, free_text: Sequence[int]) -> np.ndarray:
+    """
+    Per row, a hash of the digits in each of its free-text cells.
+    """
+    digits = [_column_hash(df.iloc[:, pos].astype(str).str.replace(r"\D+", "", regex=True)
+                           .where(df.iloc[:, pos].notna(), ""))
+              for pos in free_text]
+    return _combine(digits) if digits else np.zeros(len(df), dtype=np.uint64)
+
+def _fold(sig: np.ndarray, rows: np.ndarray, hashes: np.ndarray) -> None:
+    """
+    Lower sig's columns rows to the minimum of each permutation of hashes.
+    """
+    hashes = (hashes >> np.uint64(32)).astype(np.uint32)
+    starts = np.flatnonzero(np.concatenate([[True], rows[1:] != rows[:-1]]))
+    targets = rows[starts]
+    step = max(1, _BATCH_CELLS // len(hashes))
+    for p in range(0, NUM_PERM, step):
+        # One permutation per row keeps each reduceat segment contiguous
+        cells = np.multiply.outer(_PERM_MUL[p:p + step], hashes)
+        cells += _PERM_ADD[p:p + step, None]
+        if len(starts) < len(rows):
+            cells = np.minimum.reduceat(cells, starts, axis=1)
+        if len(targets) == sig.shape[1]:
+            np.minimum(sig[p:p + step], cells, out=sig[p:p + step])
+        else:
+            sig[p:p + step, targets] = np.minimum(sig[p:p + step, targets], cells)
+
+def _signatures(df: pd.DataFrame, free_text: Sequence[int],
+                common: np.ndarray = np.empty(0, dtype=np.uint64)) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (NUM_PERM, rows) MinHash signatures and, in the same shape, whether
+    each minimum came from a shingle in common (or the row is empty; empty
+    rows keep all-ones). A minimum doesn't care about repeats or order, so
+    each column's shingles are folded in as they come, without the sort
+    _shingles needs.
+    """
+    n = len(df)
+    rare_sig = np.full((NUM_PERM, n), _EMPTY, dtype=np.uint32)
+    common_sig = np.full((NUM_PERM, n), _EMPTY, dtype=np.uint32)
+    for pos in range(df.shape[1]):
+        for rows, hashes in _column_shingles(df.iloc[:, pos], pos, free_text):
+            shared = _is_common(hashes, common)
+            for sig, keep in ((rare_sig, ~shared), (common_sig, shared)):
+                if keep.any():
+                    _fold(sig, rows[keep], hashes[keep])
+    from_common = common_sig < rare_sig
+    from_common |= rare_sig == _EMPTY
+    np.minimum(rare_sig, common_sig, out=rare_sig)
+    return rare_sig, from_common
+
+def _sketch(df: pd.DataFrame, free_text: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per row: one 32-bit key per band, the low byte of every signature value
+    (enough to estimate a pair's similarity before confirming it) and per
+    band whether the row goes in its buckets: only if the band holds a
+    minimum from a shingle outside the common ones. Built a batch of rows
+    at a time so only these outlive the batch.
+    """
+    n = len(df)
+    common = _common_shingles(df, free_text)
+    keys = np.empty((BANDS, n), dtype=np.uint32)
+    low_bytes = np.empty((n, NUM_PERM), dtype=np.uint8)
+    bucketed = np.zeros((BANDS, n), dtype=bool)
+    width = NUM_PERM // BANDS
+    for start in range(0, n, _ROW_BATCH):
+        sig, from_common = _signatures(df.iloc[start:start + _ROW_BATCH], free_text, common)
+        stop = start + sig.shape[1]
+        for b in range(BANDS):
+            band = sig[b * width:(b + 1) * width].astype(np.uint64)
+            keys[b, start:stop] = _combine(list(band)) >> np.uint64(32)
+            bucketed[b, start:stop] = ~from_common[b * width:(b + 1) * width].all(axis=0)
+        low_bytes[start:stop] = sig.T
+    return keys, low_bytes, bucketed
+
+def _estimate(low_bytes: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Similarity from b-bit MinHash: two low bytes also agree by chance one
+    time in 256.
+    """
+    agree = (low_bytes[a] == low_bytes[b]).mean(axis=1)
+    return (agree - 1 / 256) / (1 - 1 / 256)
+
+def _candidates(keys: np.ndarray, low_bytes: np.ndarray, bucketed: np.ndarray, numbers: np.ndarray,
+                threshold: float) -> np.ndarray:
+    """
+    Distinct (a, b) row pairs, a < b, that share at least one band, have
+    the same numbers and whose estimated similarity comes within
+    _ESTIMATE_MARGIN of threshold. Within a bucket rows are sorted and
+    paired with the next _WINDOW members.
+    """
+    n = bucketed.shape[1]
+    found = []
+    for band in range(BANDS):
+        rows = np.flatnonzero(bucketed[band])
+        codes, _ = pd.factorize(keys[band, rows])
+        shared = np.bincount(codes)[codes] > 1
+        rows, codes = rows[shared], codes[shared]
+        order = np.argsort(codes, kind="stable")
+        rows, codes = rows[order], codes[order]
+        d = 1
+        while d < min(len(rows), _WINDOW + 1):
+            same = codes[d:] == codes[:-d]
+            if not same.any():
+                break
+            a, b = rows[:-d][same], rows[d:][same]
+            agree = numbers[a] == numbers[b]
+            a, b = a[agree], b[agree]
+            likely = _estimate(low_bytes, a, b) >= threshold - _ESTIMATE_MARGIN
+            found.append(a[likely] * n + b[likely])
+            d += 1
+    pairs = np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+    return np.stack([pairs // max(n, 1), pairs % max(n, 1)], axis=1)
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Concatenated aranges starts[i]:starts[i] + lengths[i].
+    """
+    total = int(lengths.sum())
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return offsets + np.arange(total)
+
+def _jaccard(indptr: np.ndarray, hashes: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Exact Jaccard similarity of the shingle sets of rows a[i] and b[i].
+    Both sets of a batch of pairs go into one array, each shingle keyed by
+    its pair in the top _PAIR_BITS bits and its hash in the rest, so one sort
+    lines up every shingle the two rows share.
+    """
+    out = np.empty(len(a), dtype=np.float64)
+    sizes = np.diff(indptr)
+    cost = np.cumsum(sizes[a] + sizes[b])
+    low = np.uint64(64 - _PAIR_BITS)
+    start = 0
+    while start < len(a):
+        stop = max(start + 1, int(np.searchsorted(cost, (cost[start - 1] if start else 0) + _BATCH_CELLS)))
+        pa, pb = a[start:stop], b[start:stop]
+        la, lb = sizes[pa], sizes[pb]
+        pair = np.arange(len(pa), dtype=np.uint64) << low
+        keys = np.concatenate([np.repeat(pair, la) | (hashes[_ranges(indptr[pa], la)] >> np.uint64(_PAIR_BITS)),
+                               np.repeat(pair, lb) | (hashes[_ranges(indptr[pb], lb)] >> np.uint64(_PAIR_BITS))])
+        keys.sort()
+        twice = keys[1:][keys[1:] == keys[:-1]]
+        shared = np.bincount((twice >> low).astype(np.int64), minlength=len(pa))
+        union = la + lb - shared
+        out[start:stop] = np.where(union > 0, shared / np.maximum(union, 1), 0.0)
+        start = stop
+    return out
+
+def _components(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Connected-component label per node: the smallest node it links to.
+    """
+    labels = np.arange(n)
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        before = labels.copy()
+        np.minimum.at(labels, a, low)
+        np.minimum.at(labels, b, low)
+        labels = labels[labels]
+        if np.array_equal(labels, before):
+            return labels
+
+def _frame(df: pd.DataFrame, subset: Sequence | None) -> pd.DataFrame:
+    if subset is None:
+        return df
+    if isinstance(subset, (str, int)) or not isinstance(subset, Sequence):
+        subset = [subset]
+    unknown = [c for c in subset if c not in df.columns]
+    if unknown:
+        raise ValueError(f"near-duplicate columns not in the data: {', '.join(map(str, unknown))}")
+    return df[list(subset)]
+
+@traced
+def near_duplicate_pairs(df: pd.DataFrame, subset: Sequence | None = None,
+                         threshold: float = NEAR_DUP_THRESHOLD) -> pd.DataFrame:
+    """
+    Confirmed pairs as a frame of row positions "a" < "b" and their
+    "similarity", the Jaccard similarity of the two rows' shingle sets over
+    subset (all columns by default). Rows that exactly duplicate an earlier
+    row are skipped; their first occurrence stands in for them.
+    """
+    frame = _frame(df, subset)
+    firsts = RowHashIndex.for_frame(df).first_positions(subset)
+    unique = frame.iloc[firsts] if len(firsts) < len(frame) else frame
+    free_text = _free_text(unique)
+    keys, low_bytes, bucketed = _sketch(unique, free_text)
+    pairs = _candidates(keys, low_bytes, bucketed, _numbers(unique, free_text), threshold)
+    if len(pairs):
+        rows = np.unique(pairs)
+        indptr, hashes = _shingles(unique.iloc[rows], free_text)
+        local = np.searchsorted(rows, pairs)
+        similarity = _jaccard(indptr, hashes, local[:, 0], local[:, 1])
+        close = similarity >= threshold
+        pairs, similarity = pairs[close], similarity[close]
+    else:
+        similarity = np.empty(0, dtype=np.float64)
+    return pd.DataFrame({"a": firsts[pairs[:, 0]], "b": firsts[pairs[:, 1]], "similarity": similarity})
+
+def near_duplicate_groups(df: pd.DataFrame, subset: Sequence | None = None,
+                          threshold: float = NEAR_DUP_THRESHOLD,
+                          pairs: pd.DataFrame | None = None) -> np.ndarray:
+    """
+    Group id per row (0, 1, ... in order of first appearance) for rows linked
+    by a chain of near-duplicate pairs, or -1. Pass pairs from
+    near_duplicate_pairs to reuse them.
+    """
+    if pairs is None:
+        pairs = near_duplicate_pairs(df, subset, threshold)
+    groups = np.full(len(df), -1, dtype=np.int64)
+    if len(pairs):
+        a, b = pairs["a"].to_numpy(), pairs["b"].to_numpy()
+        nodes = np.unique(np.concatenate([a, b]))
+        labels = _components(len(nodes), np.searchsorted(nodes, a), np.searchsorted(nodes, b))
+        groups[nodes], _ = pd.factorize(labels)
+    return groups
+
+def near_duplicate_summary(df: pd.DataFrame, subset: Sequence | None = None,
+                           threshold: float = NEAR_DUP_THRESHOLD) -> Dict[str, Any]:
+    """
+    The profile's near_duplicates entry: "rows" that repeat an earlier row of
+    their group, "groups", the "threshold", the "subset" compared (None for
+    all columns) and a few of the closest pairs under "examples".
+    """
+    pairs = near_duplicate_pairs(df, subset, threshold)
+    groups = near_duplicate_groups(df, pairs=pairs)
+    n_groups = int(groups.max() + 1) if groups.size else 0
+    top = pairs.sort_values("similarity", ascending=False, kind="stable").head(EXAMPLES)
+    examples: List[Dict[str, Any]] = [
+        {"rows": [int(a), int(b)], "similarity": round(float(s), 4)}
+        for a, b, s in top.itertuples(index=False)
+    ]
+    return {
+        "rows": int((groups >= 0).sum()) - n_groups,
+        "groups": n_groups,
+        "threshold": threshold,
+        "subset": None if subset is None else list(_frame(df, subset).columns),
+        "examples": examples,
+    }
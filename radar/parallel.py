@@ -0,0 +1,174 @@
+"""
+Opt-in multi-process profiling. Column buffers are placed in shared memory
+once and workers attach to them by name, so the dataset is never pickled:
+- float64/int64 columns: one Fortran-ordered block per dtype, sliced by column
+- Arrow-backed string columns: their Arrow buffers, rebuilt zero-copy
+- other object columns: factorized int64 codes; only the uniques are pickled
+Workers run the same summary functions as basic_profile, so the profile is
+identical to the serial one.
+
+The speed-up is unverified. This was only run on a single-core machine,
+where it was checked to match the serial profile and nothing more. Time
+both on your hardware before raising workers.
+"""
+from __future__ import annotations
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Any, List
+import numpy as np
+import pandas as pd
+
+from core.trace import traced
+from radar.dq_checks import (
+    _BLOCK_CELLS, _block_groups, _fill_block, _block_column_summary,
+    _numeric_block_summaries, _column_summary, _report_source_dtypes, basic_profile,
+)
+from radar.correlation import correlation_summary
+from radar.rowhash import RowHashIndex
+
+# Below this many cells the pool start-up costs more than it saves.
+_MIN_CELLS = 2_000_000
+
+def _create(nbytes: int) -> shared_memory.SharedMemory:
+    return shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+
+def _numeric_task(name: str, shape, dtype: str, start: int, stop: int) -> List[Dict[str, Any]]:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        block = np.ndarray(shape, dtype=dtype, buffer=shm.buf, order="F")
+        out = _numeric_block_summaries(block[:, start:stop])
+        del block
+        return out
+    finally:
+        shm.close()
+
+def _arrow_task(name: str, layout, n_rows: int) -> Dict[str, Any]:
+    import pyarrow as pa
+    label, dtype, array_cls, pa_type, length, null_count, offset, spans = layout
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        bufs = [None if sp is None else pa.py_buffer(shm.buf[sp[0]:sp[1]]) for sp in spans]
+        arr = pa.Array.from_buffers(pa_type, length, bufs, null_count, offset)
+        s = pd.Series(array_cls(arr, dtype=dtype), name=label)
+        out = _column_summary(s, n_rows)
+        del s, arr, bufs
+        return out
+    finally:
+        shm.close()
+
+def _codes_task(name: str, shape, j: int, label, uniques: np.ndarray, n_rows: int) -> Dict[str, Any]:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        codes = np.ndarray(shape, dtype=np.int64, buffer=shm.buf, order="F")[:, j]
+        values = uniques.take(codes) if len(uniques) else np.empty(n_rows, dtype=object)
+        values[codes < 0] = np.nan
+        del codes
+        return _column_summary(pd.Series(values, name=label, dtype=object), n_rows)
+    finally:
+        shm.close()
+
+def _arrow_layout(s: pd.Series):
+    """
+    Copy a column's Arrow buffers into one shared segment. Returns the segment
+    and what a worker needs to rebuild the array on top of it.
+    """
+    arr = s.array.__arrow_array__()
+    if hasattr(arr, "combine_chunks"):
+        arr = arr.combine_chunks()
+    bufs = arr.buffers()
+    shm = _create(sum(b.size for b in bufs if b is not None))
+    dest = np.ndarray(shm.size, dtype=np.uint8, buffer=shm.buf)
+    spans, pos = [], 0
+    for b in bufs:
+        if b is None:
+            spans.append(None)
+            continue
+        dest[pos:pos + b.size] = np.frombuffer(b, dtype=np.uint8)
+        spans.append((pos, pos + b.size))
+        pos += b.size
+    del dest
+    layout = (s.name, s.dtype, type(s.array), arr.type, len(arr), arr.null_count, arr.offset, spans)
+    return shm, layout
+
+def _is_arrow_string(s: pd.Series) -> bool:
+    return isinstance(s.dtype, pd.StringDtype) and s.dtype.storage == "pyarrow"
+
+@traced
+def parallel_profile(df: pd.DataFrame, workers: int = 2, correlations: bool = False) -> Dict[str, Any]:
+    """
+    basic_profile with per-column work split across a process pool.
+    Falls back to the serial path for small frames or a single worker.
+    """
+    n_rows, n_cols = df.shape
+    if workers <= 1 or n_cols < 2 or n_rows * n_cols < _MIN_CELLS:
+        return basic_profile(df, correlations=correlations)
+
+    col_summaries: List[Dict[str, Any] | None] = [None] * n_cols
+    segments: List[shared_memory.SharedMemory] = []
+    pending = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            width = max(1, _BLOCK_CELLS // max(n_rows, 1))
+            for dtype, positions in _block_groups(df).items():
+                shm = _create(n_rows * len(positions) * dtype.itemsize)
+                segments.append(shm)
+                block = np.ndarray((n_rows, len(positions)), dtype=dtype, buffer=shm.buf, order="F")
+                _fill_block(df, positions, dtype, out=block)
+                del block
+                step = min(width, max(1, math.ceil(len(positions) / workers)))
+                for start in range(0, len(positions), step):
+                    chunk = positions[start:start + step]
+                    fut = pool.submit(_numeric_task, shm.name, (n_rows, len(positions)), dtype.str, start, start + len(chunk))
+                    pending.append(("block", chunk, dtype, fut))
+
+            blocked = {pos for _, chunk, _, _ in pending for pos in chunk}
+            objects = []
+            for pos in range(n_cols):
+                if pos in blocked:
+                    continue
+                s = df.iloc[:, pos]
+                if _is_arrow_string(s):
+                    shm, layout = _arrow_layout(s)
+                    segments.append(shm)
+                    pending.append(("one", pos, None, pool.submit(_arrow_task, shm.name, layout, n_rows)))
+                elif s.dtype == object:
+                    objects.append(pos)
+
+            if objects:
+                shm = _create(n_rows * len(objects) * 8)
+                segments.append(shm)
+                codes = np.ndarray((n_rows, len(objects)), dtype=np.int64, buffer=shm.buf, order="F")
+                for j, pos in enumerate(objects):
+                    col_codes, uniques = pd.factorize(df.iloc[:, pos].to_numpy(dtype=object))
+                    codes[:, j] = col_codes
+                    fut = pool.submit(_codes_task, shm.name, codes.shape, j, df.columns[pos], np.asarray(uniques, dtype=object), n_rows)
+                    pending.append(("one", pos, None, fut))
+                del codes
+
+            # Work the parent keeps while the pool runs: duplicates and odd dtypes
+            duplicate_rows = RowHashIndex.for_frame(df).duplicate_count()
+            queued = blocked | {p for kind, p, _, _ in pending if kind == "one"}
+            for pos in range(n_cols):
+                if pos not in queued:
+                    col_summaries[pos] = _column_summary(df.iloc[:, pos], n_rows)
+
+            for kind, where, dtype, fut in pending:
+                if kind == "block":
+                    for pos, stats in zip(where, fut.result()):
+                        col_summaries[pos] = _block_column_summary(df.columns[pos], dtype, stats, n_rows)
+                else:
+                    col_summaries[where] = fut.result()
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    _report_source_dtypes(df, col_summaries)
+    return {
+        "rows": n_rows,
+        "cols": n_cols,
+        "duplicate_rows": duplicate_rows,
+        "columns": col_summaries,
+        "correlations": correlation_summary(df) if correlations else None,
+    }
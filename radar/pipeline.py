@@ -0,0 +1,192 @@
+"""
+Lazy recipe pipelines. Steps are recorded as plain dicts, so a plan can be
+saved as JSON and replayed on the next upload without the UI. Running a
+plan fuses neighbouring steps that can share a pass (several mode fills
+become one, group imputations with the same keys share one groupby) and
+works on a single shallow copy of the input: steps replace whole columns
+instead of copying the frame, so untouched columns are never copied. That
+relies on copy-on-write, which is always on from pandas 3; on pandas 2
+without it the input is copied once up front instead.
+"""
+from __future__ import annotations
+import json
+from typing import Dict, Any, List, Sequence, Tuple
+import pandas as pd
+
+from core.trace import span
+from radar import recipes, repair
+from radar.diff import FrameDiff
+
+_PLAN_VERSION = 1
+
+_KERNELS = {
+    "impute_mode": recipes._impute_mode,
+    "impute_grouped": recipes._impute_grouped,
+    "add_known_indicator": recipes._add_known_indicator,
+    "winsorize_iqr": recipes._winsorize_iqr,
+}
+_OPS = tuple(_KERNELS) + ("auto_repair",)
+_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+def _writable_copy(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    A copy of df that steps can write to without changing df: shallow under
+    copy-on-write, deep otherwise.
+    """
+    cow = _COPY_ON_WRITE or pd.options.mode.copy_on_write is True
+    return df.copy(deep=not cow)
+
+def _outputs(step: Dict[str, Any]) -> set:
+    """
+    Columns a step writes; used to keep fused steps independent.
+    """
+    op = step["op"]
+    if op == "impute_mode":
+        return set(step["cols"])
+    if op == "impute_grouped":
+        return set(step["targets"])
+    if op == "winsorize_iqr":
+        return set(step["cols"]) | {f"{c}{step['suffix']}" for c in step["cols"]}
+    return set()
+
+def _try_fuse(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any] | None:
+    """
+    Merge b into a when running them as one step gives the same frame and
+    changelog as running them in order.
+    """
+    if a["op"] != b["op"]:
+        return None
+    if a["op"] == "impute_mode":
+        # A second fill of the same column finds nothing missing and logs nothing
+        return {"op": "impute_mode", "cols": a["cols"] + [c for c in b["cols"] if c not in a["cols"]]}
+    if a["op"] == "impute_grouped":
+        same = all(a[k] == b[k] for k in ("by", "q", "fallback"))
+        if same and not (set(a["targets"]) & set(b["targets"])) and not (_outputs(a) | _outputs(b)) & set(a["by"]):
+            return dict(a, targets={**a["targets"], **b["targets"]})
+        return None
+    if a["op"] == "winsorize_iqr":
+        same = a["factor"] == b["factor"] and a["suffix"] == b["suffix"]
+        if same and not (_outputs(a) & _outputs(b)):
+            return dict(a, cols=a["cols"] + b["cols"])
+    return None
+
+class Pipeline:
+    """
+    Immutable, serializable recipe plan. Builder methods mirror the functions
+    in radar.recipes and return a new Pipeline; nothing runs until run().
+    """
+
+    def __init__(self, steps: Sequence[Dict[str, Any]] = ()):
+        self.steps: List[Dict[str, Any]] = [dict(s) for s in steps]
+        for step in self.steps:
+            if step.get("op") not in _OPS:
+                raise ValueError(f"unknown pipeline op {step.get('op')!r}; expected one of {_OPS}")
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def _then(self, op: str, **params) -> "Pipeline":
+        return Pipeline(self.steps + [dict(op=op, **params)])
+
+    def impute_mode(self, cols: Sequence[str]) -> "Pipeline":
+        return self._then("impute_mode", cols=list(cols))
+
+    def impute_grouped(self, targets, by: Sequence[str], stat: str = "median", q: float = 0.5,
+                       fallback: bool = True) -> "Pipeline":
+        if isinstance(targets, str):
+            targets = [targets]
+        targets = dict(targets) if isinstance(targets, dict) else {t: stat for t in targets}
+        return self._then("impute_grouped", targets=targets, by=list(by), q=q, fallback=fallback)
+
+    def impute_group_median(self, target: str, by: Sequence[str]) -> "Pipeline":
+        return self.impute_grouped(target, by, stat="median", fallback=False)
+
+    def add_known_indicator(self, col: str, name: str | None = None, drop_original: bool = False) -> "Pipeline":
+        return self._then("add_known_indicator", col=col, name=name, drop_original=drop_original)
+
+    def winsorize_iqr(self, cols: Sequence[str], factor: float = 1.5, suffix: str = "_w") -> "Pipeline":
+        return self._then("winsorize_iqr", cols=list(cols), factor=factor, suffix=suffix)
+
+    def auto_repair(self, strategy: str = "safe", near_duplicates: str | None = None,
+                    near_threshold: float | None = None, near_subset: Sequence | None = None) -> "Pipeline":
+        # Near-duplicate options are only recorded when used, so older plans stay as they were
+        params: Dict[str, Any] = {"strategy": strategy}
+        if near_duplicates is not None:
+            params["near_duplicates"] = near_duplicates
+        if near_threshold is not None:
+            params["near_threshold"] = near_threshold
+        if near_subset is not None:
+            params["near_subset"] = list(near_subset)
+        return self._then("auto_repair", **params)
+
+    def stages(self) -> List[Dict[str, Any]]:
+        """
+        The plan as it will execute, with neighbouring steps fused.
+        """
+        out: List[Dict[str, Any]] = []
+        for step in self.steps:
+            fused = _try_fuse(out[-1], step) if out else None
+            if fused is None:
+                out.append(dict(step))
+            else:
+                out[-1] = fused
+        return out
+
+    def run(self, df: pd.DataFrame, diff: FrameDiff | None = None) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+        """
+        Materialize the plan on df. Returns the result and a changelog in the
+        same format as calling the recipe functions one by one. Unchanged
+        columns share memory with df under copy-on-write (always on from
+        pandas 3); without it df is copied first, so writes never reach it.
+        Pass a FrameDiff to also record what each stage changed cell by cell.
+        """
+        out = _writable_copy(df)
+        log: List[Dict[str, Any]] = []
+        for stage in self.stages():
+            params = {k: v for k, v in stage.items() if k != "op"}
+            if diff is not None:
+                # Run on positions so dropped rows are known even with a non-unique index
+                before = out
+                out = _writable_copy(before)
+                out.index = pd.RangeIndex(len(out))
+            with span(f"pipeline.{stage['op']}", out):
+                if stage["op"] == "auto_repair":
+                    out, entries = repair.auto_repair(out, **params)
+                else:
+                    entries = _KERNELS[stage["op"]](out, **params)
+            if diff is not None:
+                kept = out.index.to_numpy()
+                out.index = before.index[kept]
+                diff.record(before, out, kept=kept)
+            log.extend(entries)
+        return out, log
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": _PLAN_VERSION, "steps": [dict(s) for s in self.steps]}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    @classmethod
+    def from_dict(cls, plan: Dict[str, Any]) -> "Pipeline":
+        if plan.get("version") != _PLAN_VERSION:
+            raise ValueError(f"unsupported pipeline version {plan.get('version')!r}")
+        return cls(plan.get("steps", []))
+
+    @classmethod
+    def from_json(cls, text: str) -> "Pipeline":
+        return cls.from_dict(json.loads(text))
+
+def run_plan(df: pd.DataFrame, plan: Dict[str, Any]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Run a serialized plan (Pipeline.to_dict()) on df.
+    """
+    return Pipeline.from_dict(plan).run(df)
+
+def run_plan_with_diff(df: pd.DataFrame, plan: Dict[str, Any]) -> Tuple[pd.DataFrame, List[Dict[str, Any]], bytes]:
+    """
+    run_plan plus the FrameDiff.to_bytes() that turns the result back into df.
+    """
+    diff = FrameDiff()
+    out, log = Pipeline.from_dict(plan).run(df, diff=diff)
+    return out, log, diff.to_bytes()
@@ -1,65 +1,169 @@
 from __future__ import annotations
-from typing import Sequence
+import io
+from typing import Dict, Any, Sequence
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from core.trace import span, traced
+from radar.coerce import as_numeric
+from radar.correlation import cluster_order, corr_matrix, numeric_columns
+from radar.memo import memoize
+
+# Above this many points scatters are drawn as a 2D binned raster
+_SCATTER_POINTS = 50_000
+# Heatmap cell annotations and tick labels stop at these matrix sizes
+_ANNOTATE_MAX = 20
+_LABELS_MAX = 60
+
+def _hist_counts(series: pd.Series, bins: int = 30):
+    s = as_numeric(series).dropna()
+    return np.histogram(s, bins=bins)
+
+def _value_counts(series: pd.Series, top_n: int = 15) -> pd.Series:
+    return series.astype("string").value_counts().head(top_n)
+
+# Cached per column content, so reruns and title changes skip the data pass
+hist_counts = memoize(_hist_counts)
+value_counts = memoize(_value_counts)
+
+@traced
 def plot_hist(ax, series: pd.Series, bins: int = 30, title: str = ""):
-    s = pd.to_numeric(series, errors="coerce")
-    s = s.dropna()
-    ax.hist(s, bins=bins)
+    counts, edges = hist_counts(series, bins)
+    # Weighted bin edges draw the same bars as ax.hist on the raw values
+    ax.hist(edges[:-1], bins=edges, weights=counts)
     ax.set_title(title or "Histogram")
     ax.set_xlabel(series.name or "value")
     ax.set_ylabel("count")
 
-def plot_bar_counts(ax, series: pd.Series, top_n: int = 15, title: str = ""):
-    counts = series.astype("string").value_counts().head(top_n)
+def profile_counts(profile: Dict[str, Any], column, top_n: int = 15) -> pd.Series | None:
+    """
+    Counts of the top_n values of a categorical column as recorded in the
+    profile, or None when the profile doesn't hold enough of them.
+    """
+    for col in profile["columns"]:
+        if col["column"] != column or "top_values" not in col:
+            continue
+        top = col["top_values"]
+        if len(top) < top_n and len(top) < col["unique"]:
+            return None
+        return pd.Series(list(top.values()), index=[str(k) for k in top], dtype="int64")
+    return None
+
+@traced
+def plot_bar_counts(ax, series: pd.Series, top_n: int = 15, title: str = "", counts: pd.Series | None = None):
+    if counts is None:
+        counts = value_counts(series, top_n)
+    counts = counts.head(top_n)
     ax.bar(np.arange(len(counts)), counts.values)
     ax.set_xticks(np.arange(len(counts)))
     ax.set_xticklabels(counts.index.tolist(), rotation=45, ha="right")
     ax.set_title(title or "Counts")
     ax.set_ylabel("count")
 
+@traced
 def plot_group_mean(ax, df: pd.DataFrame, cat: str, num: str, title: str = ""):
     tmp = df[[cat, num]].copy()
-    tmp[num] = pd.to_numeric(tmp[num], errors="coerce")
-    means = tmp.groupby(cat)[num].mean().dropna()
+    tmp[num] = as_numeric(tmp[num])
+    means = tmp.groupby(cat, observed=True)[num].mean().dropna()
     ax.bar(np.arange(len(means)), means.values)
     ax.set_xticks(np.arange(len(means)))
     ax.set_xticklabels(means.index.tolist(), rotation=45, ha="right")
     ax.set_title(title or f"Mean of {num} by {cat}")
     ax.set_ylabel(f"mean({num})")
 
-def plot_scatter_colored(ax, df: pd.DataFrame, x: str, y: str, color_cat: str | None = None, alpha: float = 0.7, title: str = ""):
-    xs = pd.to_numeric(df[x], errors="coerce")
-    ys = pd.to_numeric(df[y], errors="coerce")
+def _binned_scatter(ax, xs: np.ndarray, ys: np.ndarray, codes: np.ndarray | None, n_codes: int, bins: int):
+    """
+    Raster of point density; with codes, each bin takes the colour of its most
+    frequent category. One bincount pass over the points, whatever their number.
+    """
+    xe = np.linspace(xs.min(), xs.max(), bins + 1)
+    ye = np.linspace(ys.min(), ys.max(), bins + 1)
+    xi = np.clip(np.searchsorted(xe, xs, side="right") - 1, 0, bins - 1)
+    yi = np.clip(np.searchsorted(ye, ys, side="right") - 1, 0, bins - 1)
+    cell = yi * bins + xi
+    extent = (xe[0], xe[-1], ye[0], ye[-1])
+    if codes is None:
+        density = np.bincount(cell, minlength=bins * bins).reshape(bins, bins).astype(float)
+        density[density == 0] = np.nan
+        return ax.imshow(np.log1p(density), origin="lower", extent=extent, aspect="auto", interpolation="nearest")
+    k = max(n_codes, 1)
+    per = np.bincount(cell * k + codes, minlength=bins * bins * k).reshape(bins * bins, k)
+    dominant = per.argmax(axis=1).astype(float)
+    dominant[per.sum(axis=1) == 0] = np.nan
+    return ax.imshow(dominant.reshape(bins, bins), origin="lower", extent=extent, aspect="auto",
+                     interpolation="nearest", vmin=0, vmax=k - 1)
+
+@traced
+def plot_scatter_colored(ax, df: pd.DataFrame, x: str, y: str, color_cat: str | None = None, alpha: float = 0.7, title: str = "",
+                         max_points: int = _SCATTER_POINTS, bins: int = 200):
+    xs = as_numeric(df[x])
+    ys = as_numeric(df[y])
     mask = xs.notna() & ys.notna()
     xs, ys = xs[mask], ys[mask]
-    if color_cat and color_cat in df.columns:
+    colored = bool(color_cat and color_cat in df.columns)
+    if colored:
         cats = df.loc[mask, color_cat].astype("category")
         codes = cats.cat.codes
-        sc = ax.scatter(xs, ys, c=codes, alpha=alpha)
-        ax.set_title(title or f"{x} vs {y} colored by {color_cat}")
+    if len(xs) > max_points:
+        if colored:
+            # Missing categories (code -1) get their own slot after the real ones
+            c = codes.to_numpy().astype(np.int64)
+            c[c < 0] = len(cats.cat.categories)
+            _binned_scatter(ax, xs.to_numpy(dtype=float), ys.to_numpy(dtype=float), c, len(cats.cat.categories) + 1, bins)
+        else:
+            _binned_scatter(ax, xs.to_numpy(dtype=float), ys.to_numpy(dtype=float), None, 0, bins)
+    elif colored:
+        ax.scatter(xs, ys, c=codes, alpha=alpha)
     else:
         ax.scatter(xs, ys, alpha=alpha)
+    if colored:
+        ax.set_title(title or f"{x} vs {y} colored by {color_cat}")
+    else:
         ax.set_title(title or f"{x} vs {y}")
     ax.set_xlabel(x)
     ax.set_ylabel(y)
 
-def plot_corr_heatmap(ax, df: pd.DataFrame, title: str = "Correlation heatmap"):
-    num_cols = df.select_dtypes(include=[np.number]).columns
+@traced
+def plot_corr_heatmap(ax, df: pd.DataFrame, title: str = "Correlation heatmap", cluster: bool = False,
+                      annotate_max: int = _ANNOTATE_MAX, labels_max: int = _LABELS_MAX):
+    num_cols = numeric_columns(df)
     if len(num_cols) == 0:
         ax.text(0.5, 0.5, "No numeric columns", ha="center", va="center")
         return
-    corr = df[num_cols].corr()
+    corr = corr_matrix(df, num_cols)
+    if cluster:
+        order = cluster_order(corr)
+        corr = corr.iloc[order, order]
+    num_cols = corr.columns
     im = ax.imshow(corr.values, aspect="auto")
-    ax.set_xticks(np.arange(len(num_cols)))
-    ax.set_yticks(np.arange(len(num_cols)))
-    ax.set_xticklabels(num_cols, rotation=45, ha="right")
-    ax.set_yticklabels(num_cols)
+    if len(num_cols) <= labels_max:
+        ax.set_xticks(np.arange(len(num_cols)))
+        ax.set_yticks(np.arange(len(num_cols)))
+        ax.set_xticklabels(num_cols, rotation=45, ha="right")
+        ax.set_yticklabels(num_cols)
     ax.set_title(title)
-    # annotate
-    for i in range(len(num_cols)):
-        for j in range(len(num_cols)):
-            ax.text(j, i, f"{corr.values[i, j]:.2f}", ha="center", va="center", fontsize=8)
+    # annotate; past a few dozen cells the numbers are unreadable and slow to draw
+    if len(num_cols) <= annotate_max:
+        for i in range(len(num_cols)):
+            for j in range(len(num_cols)):
+                ax.text(j, i, f"{corr.values[i, j]:.2f}", ha="center", va="center", fontsize=8)
     plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+
+@traced
+def figure_png(draw, *args, figsize=(5.5, 3.5), dpi: int = 200, **kwargs) -> bytes:
+    """
+    Render draw(ax, *args, **kwargs) on a fresh figure and return PNG bytes.
+    """
+    fig, ax = plt.subplots(figsize=figsize)
+    try:
+        draw(ax, *args, **kwargs)
+        buf = io.BytesIO()
+        with span("plots.savefig"):
+            fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    return buf.getvalue()
+
+# Rendered charts keyed by the plotted columns' content and every option
+chart_png = memoize(figure_png)
@@ -3,8 +3,15 @@ from typing import List, Dict, Any, Sequence, Tuple
 import numpy as np
 import pandas as pd
 
-def impute_mode(df: pd.DataFrame, cols: Sequence[str]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
-    fixed = df.copy(deep=True)
+from core.trace import traced
+from radar.coerce import as_numeric
+
+# The underscore variants below change `fixed` only by replacing, adding or
+# deleting whole columns, never by writing into existing arrays. They are safe
+# to run on a shallow copy, which is how radar.pipeline avoids a full copy per
+# step. The public functions keep their deep-copy contract.
+
+def _impute_mode(fixed: pd.DataFrame, cols: Sequence[str]) -> List[Dict[str, Any]]:
     log: List[Dict[str, Any]] = []
     for col in cols:
         if col not in fixed.columns:
@@ -17,50 +24,160 @@ def impute_mode(df: pd.DataFrame, cols: Sequence[str]) -> Tuple[pd.DataFrame, Li
             fill_value = mode_val.iloc[0]
             fixed[col] = fixed[col].fillna(fill_value)
             log.append({"op": "impute_mode", "column": col, "missing_filled": miss, "value": str(fill_value)})
-    return fixed, log
+    return log
 
-def impute_group_median(df: pd.DataFrame, target: str, by: Sequence[str]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+@traced
+def impute_mode(df: pd.DataFrame, cols: Sequence[str]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
     fixed = df.copy(deep=True)
+    return fixed, _impute_mode(fixed, cols)
+
+_GROUP_STATS = ("median", "mean", "mode", "quantile")
+
+def _group_mode(codes: np.ndarray, values: pd.Series, n_groups: int) -> pd.Series:
+    """
+    Most frequent value per group code, ties going to the smallest value like
+    Series.mode()[0]. Groups with no values get NaN.
+    """
+    keep = (codes >= 0) & values.notna().to_numpy()
+    pairs = pd.DataFrame({"g": codes[keep], "v": values.to_numpy()[keep]})
+    try:
+        counts = pairs.groupby(["g", "v"], sort=True).size()
+    except TypeError:
+        # Mixed types that can't be ordered: ties go to the first value seen
+        counts = pairs.groupby(["g", "v"], sort=False).size()
+    if counts.empty:
+        return pd.Series(np.nan, index=range(n_groups))
+    best = counts.groupby(level=0, sort=False).idxmax()
+    modes = pd.Series([v for _, v in best], index=best.index, dtype=values.dtype)
+    return modes.reindex(range(n_groups))
+
+def _group_stat(codes: np.ndarray, values: pd.Series, n_groups: int, stat: str, q: float) -> pd.Series:
+    """
+    One statistic per group code in a single groupby pass, indexed 0..n_groups-1.
+    """
+    if stat == "mode":
+        return _group_mode(codes, values, n_groups)
+    grouped = values.groupby(codes)
+    if stat == "median":
+        out = grouped.median()
+    elif stat == "mean":
+        out = grouped.mean()
+    else:
+        out = grouped.quantile(q)
+    return out.reindex(range(n_groups))
+
+def _fill_stat(values: pd.Series, stat: str) -> pd.Series:
+    if stat != "mode" and not pd.api.types.is_numeric_dtype(values):
+        return as_numeric(values)
+    return values
+
+def _impute_grouped(fixed: pd.DataFrame, targets, by: Sequence[str], stat="median", q: float = 0.5,
+                    fallback: bool = True) -> List[Dict[str, Any]]:
     log: List[Dict[str, Any]] = []
-    if target not in fixed.columns:
-        return fixed, log
-    if not pd.api.types.is_numeric_dtype(fixed[target]):
-        # Try coercion
-        fixed[target] = pd.to_numeric(fixed[target], errors="coerce")
-    before_missing = int(fixed[target].isna().sum())
-    if before_missing == 0 or len(by) == 0:
-        return fixed, log
-    # Compute group medians
-    med = fixed.groupby(list(by))[target].median()
-    def fill_row(row):
-        if pd.isna(row[target]):
-            key = tuple(row[b] for b in by)
-            try:
-                return med.loc[key]
-            except KeyError:
-                return row[target]
-        return row[target]
-    fixed[target] = fixed.apply(fill_row, axis=1)
-    after_missing = int(fixed[target].isna().sum())
-    filled = before_missing - after_missing
-    if filled > 0:
-        log.append({"op": "impute_group_median", "column": target, "by": list(by), "missing_filled": int(filled)})
-    return fixed, log
+    if isinstance(targets, str):
+        targets = [targets]
+    stats = dict(targets) if isinstance(targets, dict) else {t: stat for t in targets}
+    for t, st in stats.items():
+        if st not in _GROUP_STATS:
+            raise ValueError(f"unknown statistic {st!r} for {t!r}; expected one of {_GROUP_STATS}")
+    stats = {t: st for t, st in stats.items() if t in fixed.columns}
+    by = list(by)
 
-def add_known_indicator(df: pd.DataFrame, col: str, name: str | None = None, drop_original: bool = False):
+    missing = {}
+    for t, st in stats.items():
+        fixed[t] = _fill_stat(fixed[t], st)
+        mask = fixed[t].isna().to_numpy(copy=True)
+        if mask.any():
+            missing[t] = mask
+    if not missing or len(by) == 0 or any(b not in fixed.columns for b in by):
+        return log
+
+    levels = [by[:k] for k in range(len(by), 0, -1)] if fallback else [by]
+    if fallback:
+        levels.append([])
+    filled: Dict[str, List[int]] = {t: [] for t in missing}
+    for level in levels:
+        if not any(m.any() for m in missing.values()):
+            break
+        if level:
+            # Rows with a missing key get code -1 and are left to coarser levels
+            codes = fixed.groupby(level, sort=False, dropna=True, observed=True).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+            n_groups = int(codes.max()) + 1 if len(codes) else 0
+        else:
+            codes = np.zeros(len(fixed), dtype=np.int64)
+            n_groups = 1
+        for t, mask in missing.items():
+            if not mask.any():
+                filled[t].append(0)
+                continue
+            table = _group_stat(codes, fixed[t], n_groups, stats[t], q)
+            rows = np.flatnonzero(mask & (codes >= 0))
+            fill = table.to_numpy()[codes[rows]]
+            has = pd.notna(fill)
+            rows, fill = rows[has], fill[has]
+            if len(rows):
+                col = fixed[t].copy()
+                col.iloc[rows] = fill
+                fixed[t] = col
+                mask[rows] = False
+            filled[t].append(int(len(rows)))
+
+    for t, counts in filled.items():
+        total = sum(counts)
+        if total == 0:
+            continue
+        entry = {"op": f"impute_group_{stats[t]}", "column": t, "by": list(by), "missing_filled": total}
+        if stats[t] == "quantile":
+            entry["q"] = q
+        if any(counts[1:]):
+            entry["levels"] = [
+                {"by": list(level), "missing_filled": c} for level, c in zip(levels, counts) if c
+            ]
+        log.append(entry)
+    return log
+
+@traced
+def impute_grouped(df: pd.DataFrame, targets, by: Sequence[str], stat="median", q: float = 0.5,
+                   fallback: bool = True) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Fill missing values of one or more target columns with a per-group statistic.
+    targets is a column name, a list of names, or a dict of name -> statistic;
+    statistics are "median", "mean", "mode" or "quantile" (at q).
+    With fallback, values still missing after grouping by all of by are
+    filled from coarser groups (by[:-1], by[:-2], ...) and finally from the
+    global statistic. Each grouping level is computed once for all targets.
+    Changelog entries look like impute_group_median's, with "levels" added
+    when a coarser level filled values.
+    """
     fixed = df.copy(deep=True)
+    return fixed, _impute_grouped(fixed, targets, by, stat=stat, q=q, fallback=fallback)
+
+@traced
+def impute_group_median(df: pd.DataFrame, target: str, by: Sequence[str]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Group median fill for one numeric target. Rows whose group has no median
+    stay missing; use impute_grouped for fallbacks and other statistics.
+    """
+    return impute_grouped(df, target, by, stat="median", fallback=False)
+
+def _add_known_indicator(fixed: pd.DataFrame, col: str, name: str | None = None, drop_original: bool = False):
     if col not in fixed.columns:
-        return fixed, []
+        return []
     ind_name = name or f"{col}Known"
     fixed[ind_name] = fixed[col].notna().astype("int64")
     log = [{"op": "add_indicator", "source": col, "indicator": ind_name}]
     if drop_original:
-        fixed = fixed.drop(columns=[col])
+        del fixed[col]
         log.append({"op": "drop_column", "column": col})
-    return fixed, log
+    return log
+
+@traced
+def add_known_indicator(df: pd.DataFrame, col: str, name: str | None = None, drop_original: bool = False):
+    fixed = df.copy(deep=True)
+    return fixed, _add_known_indicator(fixed, col, name, drop_original)
 
 def iqr_bounds(series: pd.Series, factor: float = 1.5):
-    s = pd.to_numeric(series, errors="coerce")
+    s = as_numeric(series)
     q1 = s.quantile(0.25)
     q3 = s.quantile(0.75)
     iqr = q3 - q1
@@ -68,14 +185,13 @@ def iqr_bounds(series: pd.Series, factor: float = 1.5):
     upper = q3 + factor * iqr
     return lower, upper, iqr
 
-def winsorize_iqr(df: pd.DataFrame, cols: Sequence[str], factor: float = 1.5, suffix: str = "_w"):
-    fixed = df.copy(deep=True)
+def _winsorize_iqr(fixed: pd.DataFrame, cols: Sequence[str], factor: float = 1.5, suffix: str = "_w"):
     log: List[Dict[str, Any]] = []
     for col in cols:
         if col not in fixed.columns:
             continue
         if not pd.api.types.is_numeric_dtype(fixed[col]):
-            fixed[col] = pd.to_numeric(fixed[col], errors="coerce")
+            fixed[col] = as_numeric(fixed[col])
         lower, upper, iqr = iqr_bounds(fixed[col], factor=factor)
         before_out = int(((fixed[col] < lower) | (fixed[col] > upper)).sum())
         new_col = f"{col}{suffix}"
@@ -89,4 +205,9 @@ def winsorize_iqr(df: pd.DataFrame, cols: Sequence[str], factor: float = 1.5, su
             "outliers_capped": before_out,
             "new_column": new_col
         })
-    return fixed, log
+    return log
+
+@traced
+def winsorize_iqr(df: pd.DataFrame, cols: Sequence[str], factor: float = 1.5, suffix: str = "_w"):
+    fixed = df.copy(deep=True)
+    return fixed, _winsorize_iqr(fixed, cols, factor=factor, suffix=suffix)
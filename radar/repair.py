@@ -1,28 +1,126 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Sequence, Tuple
 import pandas as pd
 import numpy as np
 
+from core.trace import span, traced
+from radar.neardup import NEAR_DUP_THRESHOLD, near_duplicate_groups
+from radar.rowhash import RowHashIndex
+
+# What auto_repair may do with near-duplicate rows
+NEAR_DUP_MODES = ("drop", "merge")
+
 def _mode(series: pd.Series):
     try:
         return series.mode(dropna=True).iloc[0]
     except Exception:
         return None
 
-def auto_repair(df: pd.DataFrame, strategy: str = "safe") -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+def _impute_column(cleaned: pd.DataFrame, col) -> Dict[str, Any] | None:
+    """
+    auto_repair's fill for one column of cleaned, replaced in place: median
+    for numeric, mode for everything else. Returns the changelog entry.
+    """
+    s = cleaned[col]
+    miss = int(s.isna().sum())
+    if miss == 0:
+        return None
+    if pd.api.types.is_numeric_dtype(s):
+        fill_value = float(s.median())
+        cleaned[col] = s.fillna(fill_value)
+        return {
+            "op": "impute_median",
+            "column": col,
+            "missing_filled": miss,
+            "value": fill_value
+        }
+    m = _mode(s)
+    if m is not None:
+        cleaned[col] = s.fillna(m)
+        return {
+            "op": "impute_mode",
+            "column": col,
+            "missing_filled": miss,
+            "value": str(m)
+        }
+    # If no mode, leave as is
+    return {
+        "op": "impute_mode_skipped",
+        "column": col,
+        "missing_unfilled": miss
+    }
+
+def _near_duplicate_fix(cleaned: pd.DataFrame, mode: str, threshold: float, subset: Sequence | None = None):
+    """
+    What auto_repair does about near-duplicates in cleaned, compared on the
+    subset columns (all by default): the positions to
+    keep (the first row of each radar.neardup group and every row outside
+    one), per column the (positions, values) that "merge" fills into a kept
+    row's gaps from the first later group member that has the value, and
+    the changelog entry, or None when there are no groups.
+    """
+    groups = near_duplicate_groups(cleaned, subset, threshold=threshold)
+    members = np.flatnonzero(groups >= 0)
+    if not members.size:
+        return np.arange(len(cleaned)), {}, None
+    # Groups are numbered in order of first appearance, so this is each group's first row
+    _, first_idx = np.unique(groups[members], return_index=True)
+    firsts = members[first_idx]
+    kept = groups < 0
+    kept[firsts] = True
+    keep = np.flatnonzero(kept)
+    fills: Dict[Any, Tuple[np.ndarray, np.ndarray]] = {}
+    if mode == "merge":
+        for col in cleaned.columns:
+            missing = cleaned[col].isna().to_numpy()
+            gaps = firsts[missing[firsts]]
+            if not gaps.size:
+                continue
+            donors = members[~missing[members]]
+            donor = np.full(len(firsts), -1, dtype=np.int64)
+            donor_groups, donor_idx = np.unique(groups[donors], return_index=True)
+            donor[donor_groups] = donors[donor_idx]
+            source = donor[groups[gaps]]
+            found = source >= 0
+            if found.any():
+                fills[col] = (gaps[found], cleaned[col].iloc[source[found]].to_numpy())
+    entry = {
+        "op": f"{mode}_near_duplicates",
+        "rows_removed": int(len(cleaned) - len(keep)),
+        "groups": int(len(firsts)),
+        "threshold": threshold,
+    }
+    if subset is not None:
+        entry["subset"] = list(subset) if isinstance(subset, (list, tuple)) else [subset]
+    if mode == "merge":
+        entry["cells_filled"] = int(sum(len(p) for p, _ in fills.values()))
+    return keep, fills, entry
+
+@traced
+def auto_repair(df: pd.DataFrame, strategy: str = "safe", near_duplicates: str | None = None,
+                near_threshold: float = NEAR_DUP_THRESHOLD,
+                near_subset: Sequence | None = None) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
     """
     Reversible, conservative repairs.
     - Drop exact duplicate rows
+    - Optionally ("drop" or "merge" as near_duplicates) keep only the first
+      row of each near-duplicate group, compared on near_subset (all
+      columns by default); "merge" first fills its gaps from the rest of
+      the group
     - Fill numeric NaNs with median
     - Fill categorical NaNs with mode
     Returns cleaned_df and a changelog list of operations.
     """
-    cleaned = df.copy(deep=True)
+    if near_duplicates is not None and near_duplicates not in NEAR_DUP_MODES:
+        raise ValueError(f"unknown near_duplicates mode {near_duplicates!r}; expected one of {NEAR_DUP_MODES}")
     changelog: List[Dict[str, Any]] = []
 
-    # 1) Drop duplicates
-    before = len(cleaned)
-    cleaned = cleaned.drop_duplicates(keep="first")
+    # 1) Drop duplicates, reusing the row hashes the profiler already computed.
+    # Row selection already copies the data, so no separate deep copy is needed;
+    # the shallow copy only detaches it from df for pandas' chained-assignment checks.
+    before = len(df)
+    with span("repair.drop_duplicates", df):
+        cleaned = df.iloc[RowHashIndex.for_frame(df).first_positions()].copy(deep=False)
     dropped = before - len(cleaned)
     if dropped > 0:
         changelog.append({
@@ -30,36 +128,22 @@ def auto_repair(df: pd.DataFrame, strategy: str = "safe") -> Tuple[pd.DataFrame,
             "rows_removed": int(dropped)
         })
 
-    # 2) Impute per column
-    for col in cleaned.columns:
-        s = cleaned[col]
-        miss = int(s.isna().sum())
-        if miss == 0:
-            continue
-        if pd.api.types.is_numeric_dtype(s):
-            fill_value = float(s.median())
-            cleaned[col] = s.fillna(fill_value)
-            changelog.append({
-                "op": "impute_median",
-                "column": col,
-                "missing_filled": miss,
-                "value": fill_value
-            })
-        else:
-            m = _mode(s)
-            if m is not None:
-                cleaned[col] = s.fillna(m)
-                changelog.append({
-                    "op": "impute_mode",
-                    "column": col,
-                    "missing_filled": miss,
-                    "value": str(m)
-                })
-            else:
-                # If no mode, leave as is
-                changelog.append({
-                    "op": "impute_mode_skipped",
-                    "column": col,
-                    "missing_unfilled": miss
-                })
+    # 2) Near-duplicates, only when asked for: finding them costs far more than the rest
+    if near_duplicates is not None:
+        with span("repair.near_duplicates", cleaned):
+            keep, fills, entry = _near_duplicate_fix(cleaned, near_duplicates, near_threshold, near_subset)
+            if entry is not None:
+                for col, (positions, values) in fills.items():
+                    filled = cleaned[col].copy()
+                    filled.iloc[positions] = values
+                    cleaned[col] = filled
+                cleaned = cleaned.iloc[keep].copy(deep=False)
+                changelog.append(entry)
+
+    # 3) Impute per column
+    with span("repair.impute", cleaned):
+        for col in cleaned.columns:
+            entry = _impute_column(cleaned, col)
+            if entry is not None:
+                changelog.append(entry)
     return cleaned, changelog
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import weakref
+from typing import Dict, Any, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+def _column_hash(s: pd.Series) -> np.ndarray:
+    values = s.to_numpy() if isinstance(s.dtype, np.dtype) else None
+    if values is not None and values.dtype.kind == "f":
+        # duplicated() treats -0.0 == 0.0 and every NaN payload as equal
+        values = np.where(np.isnan(values), np.nan, values + 0.0)
+        return pd.util.hash_array(values)
+    return pd.util.hash_pandas_object(s, index=False).to_numpy()
+
+def _combine(hashes: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Order-sensitive mix of per-column hashes into one 64-bit hash per row.
+    """
+    out = np.full(len(hashes[0]), 0x345678, dtype=np.uint64)
+    mult = np.uint64(1000003)
+    for i, h in enumerate(hashes):
+        out ^= h
+        out *= mult
+        mult += np.uint64(82520 + 2 * (len(hashes) - i))
+    out += np.uint64(97531)
+    return out
+
+class RowHashIndex:
+    """
+    Vectorized 64-bit row hashes for duplicate detection, computed once per
+    column and reused for any key subset. Rows that share a hash are
+    confirmed with an exact comparison, so results always match
+    DataFrame.duplicated.
+
+    The index describes the frame as it was when built; don't mutate the
+    frame in place and keep using the same index. It holds the frame only
+    weakly, so a frame that has been indexed can still be freed.
+    """
+
+    _shared: Dict[int, Tuple[weakref.ref, "RowHashIndex"]] = {}
+
+    def __init__(self, df: pd.DataFrame):
+        self._frame = weakref.ref(df)
+        self._column_hashes: Dict[int, np.ndarray] = {}
+        self._masks: Dict[Tuple, np.ndarray] = {}
+
+    @property
+    def df(self) -> pd.DataFrame:
+        df = self._frame()
+        if df is None:
+            raise ReferenceError("the indexed DataFrame no longer exists")
+        return df
+
+    @classmethod
+    def for_frame(cls, df: pd.DataFrame) -> "RowHashIndex":
+        """
+        Index shared by every caller holding the same DataFrame object, so the
+        profiler and the repair step hash each row only once.
+        """
+        hit = cls._shared.get(id(df))
+        if hit is not None and hit[0]() is df:
+            return hit[1]
+        index = cls(df)
+        key = id(df)
+        cls._shared[key] = (weakref.ref(df, lambda _: cls._shared.pop(key, None)), index)
+        return index
+
+    def _positions(self, subset) -> Tuple[int, ...]:
+        if subset is None:
+            return tuple(range(self.df.shape[1]))
+        if isinstance(subset, (str, int)) or not isinstance(subset, Sequence):
+            subset = [subset]
+        cols = list(self.df.columns)
+        return tuple(cols.index(c) for c in subset)
+
+    def column_hash(self, pos: int) -> np.ndarray:
+        if pos not in self._column_hashes:
+            self._column_hashes[pos] = _column_hash(self.df.iloc[:, pos])
+        return self._column_hashes[pos]
+
+    def row_hashes(self, subset: Sequence | None = None) -> np.ndarray:
+        return self._row_hashes_at(self._positions(subset))
+
+    def _row_hashes_at(self, positions: Tuple[int, ...]) -> np.ndarray:
+        return _combine([self.column_hash(p) for p in positions])
+
+    def _candidates(self, positions: Tuple[int, ...]) -> np.ndarray:
+        """
+        Positions of rows whose hash occurs more than once. Equal rows always
+        share a hash, so no duplicate can be outside this set.
+        """
+        codes, _ = pd.factorize(self._row_hashes_at(positions))
+        return np.flatnonzero(np.bincount(codes)[codes] > 1)
+
+    def _confirm(self, candidates: np.ndarray, positions: Tuple[int, ...], keep) -> np.ndarray:
+        """
+        Exact duplicated() mask over the candidate rows. Plain numpy columns
+        are checked against the first row of their hash group in one pass;
+        anything else, or a hash collision, is left to pandas.
+        """
+        codes, _ = pd.factorize(self._row_hashes_at(positions)[candidates])
+        firsts = np.full(codes.max() + 1, -1, dtype=np.int64)
+        firsts[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+        rep = candidates[firsts[codes]]
+        for p in positions:
+            s = self.df.iloc[:, p]
+            if not isinstance(s.dtype, np.dtype) or s.dtype.kind not in "biufmM":
+                break
+            values = s.to_numpy()
+            a, b = values[candidates], values[rep]
+            same = a == b
+            if values.dtype.kind in "fmM":
+                same |= pd.isna(a) & pd.isna(b)
+            if not same.all():
+                break
+        else:
+            return pd.Series(codes).duplicated(keep=keep).to_numpy()
+        sub = self.df.iloc[candidates, list(positions)]
+        return sub.duplicated(keep=keep).to_numpy()
+
+    def duplicated(self, subset: Sequence | None = None, keep="first") -> np.ndarray:
+        """
+        Same mask as DataFrame.duplicated(subset, keep) as a numpy array.
+        Hash collisions can't leak in: candidates are confirmed by pandas.
+        """
+        positions = self._positions(subset)
+        if not positions or not len(self.df):
+            return self.df.duplicated(subset=subset, keep=keep).to_numpy()
+        key = (positions, keep)
+        if key not in self._masks:
+            mask = np.zeros(len(self.df), dtype=bool)
+            candidates = self._candidates(positions)
+            if candidates.size:
+                mask[candidates] = self._confirm(candidates, positions, keep)
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def groups(self, subset: Sequence | None = None) -> np.ndarray:
+        """
+        Duplicate-group id per row (0, 1, ... in order of first appearance),
+        or -1 for rows that have no exact duplicate.
+        """
+        members = self.duplicated(subset, keep=False)
+        groups = np.full(len(members), -1, dtype=np.int64)
+        if members.any():
+            groups[members], _ = pd.factorize(self.row_hashes(subset)[members])
+        return groups
+
+    def duplicate_count(self, subset: Sequence | None = None) -> int:
+        return int(self.duplicated(subset).sum())
+
+    def first_positions(self, subset: Sequence | None = None) -> np.ndarray:
+        """
+        Row positions drop_duplicates(keep="first") would keep.
+        """
+        return np.flatnonzero(~self.duplicated(subset, keep="first"))
+
+    def summary(self, subset: Sequence | None = None) -> Dict[str, Any]:
+        groups = self.groups(subset)
+        return {
+            "duplicate_rows": self.duplicate_count(subset),
+            "duplicate_groups": int(groups.max() + 1) if groups.size else 0,
+            "rows_in_groups": int((groups >= 0).sum()),
+        }
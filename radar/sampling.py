@@ -0,0 +1,328 @@
+"""
+Sampled profiles for a fast first look at large files. A seekable CSV is
+sampled by reading a run of rows at a random byte offset inside each of a
+number of equal slices of the file, so the cost depends on the sample size
+and not on the file size. Other inputs, and files whose quoted fields span
+lines, get a reservoir sample in one streaming pass. The profile has the
+usual shape with counts scaled to the file and confidence intervals per
+column; columns whose interval straddles an issue threshold are re-read in
+full so their severity is never a guess.
+"""
+from __future__ import annotations
+import io
+import math
+import os
+from statistics import NormalDist
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import pandas as pd
+
+from core.io import _encoding_order, iter_csv, load_csv, source_format
+from core.trace import span, traced
+from radar.coerce import as_numeric
+from radar.dq_checks import MISSING_ERROR_PCT, basic_profile, issues_from_profile
+from radar.rowhash import RowHashIndex
+from radar.streaming import ColumnState
+
+# Lines read to estimate the bytes per row before choosing a strategy
+_PROBE_ROWS = 1_000
+
+def _z(confidence: float) -> float:
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+def _fpc(n: int, population: int) -> float:
+    """
+    Finite population correction for sampling n of population rows.
+    """
+    if n >= population:
+        return 0.0
+    return math.sqrt((population - n) / (population - 1)) if population > 1 else 1.0
+
+def wilson_interval(k: int, n: int, z: float, fpc: float = 1.0) -> Tuple[float, float]:
+    """
+    Wilson score interval for a proportion k / n.
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = k / n
+    if fpc == 0:
+        # The sample is the whole population
+        return p, p
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom * fpc
+    return max(0.0, center - half), min(1.0, center + half)
+
+def quantile_interval(ordered: np.ndarray, q: float, z: float) -> Tuple[float, float] | None:
+    """
+    Distribution-free interval for the q quantile from order statistics of a
+    sorted sample: the ranks a binomial(n, q) count falls between.
+    """
+    n = len(ordered)
+    if n == 0:
+        return None
+    spread = z * math.sqrt(n * q * (1 - q))
+    lo = min(max(int(math.floor(n * q - spread)), 0), n - 1)
+    hi = min(max(int(math.ceil(n * q + spread)), 0), n - 1)
+    return float(ordered[lo]), float(ordered[hi])
+
+def _open(uploaded_file):
+    if hasattr(uploaded_file, "read"):
+        uploaded_file.seek(0)
+        return uploaded_file, False
+    return open(uploaded_file, "rb"), True
+
+def _read_rows(f, limit: int, stop: int | None = None) -> List[bytes]:
+    rows = []
+    while len(rows) < limit and (stop is None or f.tell() < stop):
+        line = f.readline()
+        if not line:
+            break
+        rows.append(line if line.endswith(b"\n") else line + b"\n")
+    return rows
+
+def _spans_lines(rows: List[bytes]) -> bool:
+    # An odd number of quote characters means a quoted field continues on the next line
+    return any(r.count(b'"') % 2 for r in rows)
+
+def _stratified(f, body_start: int, size: int, n: int, strata: int, rng) -> Tuple[List[bytes], List[int]] | None:
+    """
+    Up to n rows: a run of n / strata rows from a random offset in each of
+    strata equal byte ranges, and the length of each run. A row belongs to
+    the range it starts in, so runs never overlap. None when rows may
+    contain quoted line breaks.
+    """
+    per = max(1, math.ceil(n / strata))
+    body = size - body_start
+    rows: List[bytes] = []
+    lengths: List[int] = []
+    for i in range(strata):
+        lo = body_start + body * i // strata
+        hi = body_start + body * (i + 1) // strata
+        if hi <= lo:
+            continue
+        f.seek(int(rng.integers(lo, hi)))
+        # Finish the row the offset landed in; it may have started in an earlier range
+        f.readline()
+        run = _read_rows(f, per, stop=hi)
+        if _spans_lines(run):
+            return None
+        rows.extend(run)
+        lengths.append(len(run))
+    return rows, lengths
+
+def _reservoir(uploaded_file, n: int, rng, chunksize: int = 100_000) -> Tuple[pd.DataFrame, int]:
+    """
+    Uniform sample of n rows in one streaming pass: every row gets a random
+    key and the n smallest keys are kept. Returns the sample and the row count.
+    """
+    kept, keys, total = None, np.empty(0), 0
+    for chunk in iter_csv(uploaded_file, chunksize=chunksize):
+        chunk.index = pd.RangeIndex(total, total + len(chunk))
+        total += len(chunk)
+        chunk_keys = rng.random(len(chunk))
+        kept = chunk if kept is None else pd.concat([kept, chunk])
+        keys = np.concatenate([keys, chunk_keys])
+        if len(keys) > n:
+            keep = np.sort(np.argpartition(keys, n - 1)[:n])
+            kept, keys = kept.iloc[keep], keys[keep]
+    if kept is None:
+        return pd.DataFrame(), 0
+    return kept.reset_index(drop=True), total
+
+@traced
+def sample_csv(uploaded_file, n: int = 100_000, strata: int = 64, seed: int = 0,
+               encoding_fallbacks=("utf-8", "latin-1")) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Draw about n rows from a CSV path or file object. Returns the sample and
+    info with "method" ("exact", "stratified" or "reservoir"), "rows" (the
+    file's row count, estimated from bytes per row for stratified samples)
+    and "rows_estimated"; stratified samples also have "runs", the length
+    of each run of consecutive rows, in sample order. Files of up to about
+    2n rows are read in full.
+    Compressed and partitioned inputs (see core.io.load_csv) always get a
+    reservoir sample.
+    """
+    rng = np.random.default_rng(seed)
+    if source_format(uploaded_file) != "csv":
+        # Compressed and partitioned inputs can't be read from a byte offset
+        with span("sampling.reservoir"):
+            sample, total = _reservoir(uploaded_file, n, rng)
+        return sample, {"method": "reservoir", "rows": total, "rows_estimated": False}
+    f, owned = _open(uploaded_file)
+    try:
+        seekable = f.seekable() if hasattr(f, "seekable") else True
+        if seekable:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(0)
+            header = f.readline()
+            body_start = f.tell()
+            probe = _read_rows(f, _PROBE_ROWS)
+            row_bytes = (f.tell() - body_start) / len(probe) if probe else 1.0
+            estimate = int(round((size - body_start) / row_bytes)) if probe else 0
+            if estimate <= 2 * n:
+                f.seek(0)
+                df = load_csv(f, encoding_fallbacks)
+                return df, {"method": "exact", "rows": len(df), "rows_estimated": False}
+            encoding = _encoding_order(f, encoding_fallbacks)[0]
+            with span("sampling.stratified", strata=strata):
+                drawn = _stratified(f, body_start, size, n, strata, rng)
+            if drawn is not None:
+                rows, lengths = drawn
+                sampled = sum(len(r) for r in rows)
+                sample = pd.read_csv(io.BytesIO(header + b"".join(rows)), encoding=encoding)
+                estimate = int(round((size - body_start) * len(rows) / sampled)) if sampled else 0
+                info = {"method": "stratified", "rows": max(estimate, len(sample)), "rows_estimated": True}
+                # Blank lines are skipped by the parser; runs only line up with the rows without them
+                if len(sample) == len(rows):
+                    info["runs"] = lengths
+                return sample, info
+            f.seek(0)
+        with span("sampling.reservoir"):
+            sample, total = _reservoir(f, n, rng)
+        return sample, {"method": "reservoir", "rows": total, "rows_estimated": False}
+    finally:
+        if owned:
+            f.close()
+        else:
+            f.seek(0)
+
+def _column_intervals(col: Dict[str, Any], s: pd.Series, n: int, population: int, z: float) -> Dict[str, Any]:
+    fpc = _fpc(n, population)
+    lo, hi = wilson_interval(col["missing"], n, z, fpc)
+    ci: Dict[str, Any] = {"missing_pct": [lo * 100, hi * 100]}
+    if col.get("mean") is not None:
+        values = np.sort(as_numeric(s).to_numpy(dtype=np.float64, na_value=np.nan))
+        values = values[~np.isnan(values)]
+        m = len(values)
+        half = z * (col["std"] or 0.0) / math.sqrt(m) * _fpc(m, max(int(round(m * population / n)), m))
+        ci["mean"] = [col["mean"] - half, col["mean"] + half]
+        for key, q in (("p05", 0.05), ("p95", 0.95)):
+            bounds = quantile_interval(values, q, z)
+            if bounds is not None:
+                ci[key] = list(bounds)
+    return ci
+
+def poisson_interval(k: int, z: float) -> Tuple[float, float]:
+    """
+    Approximate interval for the mean of a Poisson count k (square-root
+    transform), with a nonzero upper end when k is 0.
+    """
+    return max(0.0, math.sqrt(k) - z / 2) ** 2, (math.sqrt(k + 1) + z / 2) ** 2
+
+def _duplicate_estimate(sample: pd.DataFrame, fraction: float, z: float,
+                        runs: List[int] | None = None) -> Tuple[float, float, float]:
+    """
+    Duplicate rows in the file (rows equal to an earlier row) from the
+    sample. The sampled copies of each row are linked in file order and each
+    link counts one extra row, weighted by the inverse chance that both of
+    its ends were sampled: fraction**2 for rows drawn independently, but
+    about fraction * (run - distance) / run for two rows of the same
+    stratified run, where neighbouring copies come along together. Exact in
+    expectation for doubled rows and for copies stored next to each other;
+    groups of three or more copies spread over the file are overcounted.
+    """
+    groups = RowHashIndex.for_frame(sample).groups()
+    members = np.flatnonzero(groups >= 0)
+    order = members[np.argsort(groups[members], kind="stable")]
+    linked = groups[order[1:]] == groups[order[:-1]]
+    a, b = order[:-1][linked], order[1:][linked]
+    chance = np.full(len(a), fraction * fraction)
+    if runs is not None and len(a):
+        run_of = np.repeat(np.arange(len(runs)), runs)
+        lengths = np.asarray(runs, dtype=np.float64)
+        same = run_of[a] == run_of[b]
+        length = lengths[run_of[a[same]]]
+        chance[same] = fraction * (length - (b[same] - a[same])) / length
+    weights = 1 / np.clip(chance, fraction * fraction, 1.0)
+    links = len(a)
+    lo, hi = poisson_interval(links, z)
+    if not links:
+        return 0.0, 0.0, hi / (fraction * fraction)
+    estimate = float(weights.sum())
+    # The interval scales the Poisson bounds on the link count by the mean weight
+    return estimate, lo * estimate / links, hi * estimate / links
+
+def _scale_counts(col: Dict[str, Any], scale: float) -> None:
+    col["missing"] = int(round(col["missing"] * scale))
+    if col.get("unparseable"):
+        col["unparseable"] = int(round(col["unparseable"] * scale))
+    if col.get("outliers_iqr"):
+        col["outliers_iqr"] = int(round(col["outliers_iqr"] * scale))
+    if "top_values" in col:
+        col["top_values"] = {k: int(round(v * scale)) for k, v in col["top_values"].items()}
+
+def _exact_columns(uploaded_file, cols: List, chunksize: int = 100_000) -> Tuple[Dict[Any, ColumnState], int]:
+    states = {c: ColumnState(c) for c in cols}
+    rows = 0
+    for chunk in iter_csv(uploaded_file, chunksize=chunksize, usecols=cols):
+        rows += len(chunk)
+        for c in cols:
+            states[c].update(chunk[c])
+    return states, rows
+
+@traced
+def run_checks_sampled(uploaded_file, sample_rows: int = 100_000, confidence: float = 0.95, seed: int = 0,
+                       escalate: bool = True, strata: int = 64) -> Dict[str, Any]:
+    """
+    run_checks on a sample of about sample_rows rows. Counts (missing,
+    outliers, duplicates, top values) are scaled to the file; each column
+    gets "ci" with confidence intervals for missing_pct and, for numeric
+    columns, mean, p05 and p95. With escalate, columns whose missing_pct
+    interval straddles the error cutoff are counted exactly in a streaming
+    pass over just those columns. unique, min and max describe the sample.
+    profile["sampling"] says how the sample was drawn, what was escalated
+    and the interval for duplicate_rows, which is estimated from duplicate
+    pairs found in the sample.
+    """
+    sample, info = sample_csv(uploaded_file, n=sample_rows, strata=strata, seed=seed)
+    profile = basic_profile(sample)
+    n = len(sample)
+    if info["method"] == "exact":
+        profile["sampling"] = {**info, "sample_rows": n, "confidence": confidence, "escalated": []}
+        return {"profile": profile, "issues": issues_from_profile(profile)}
+
+    z = _z(confidence)
+    population = info["rows"]
+    by_name = {c["column"]: c for c in profile["columns"]}
+    for name, col in by_name.items():
+        col["ci"] = _column_intervals(col, sample[name], n, population, z)
+
+    escalated = []
+    if escalate:
+        escalated = [name for name, col in by_name.items()
+                     if col["ci"]["missing_pct"][0] <= MISSING_ERROR_PCT < col["ci"]["missing_pct"][1]]
+    if escalated:
+        with span("sampling.escalate", cols=len(escalated)):
+            states, exact_rows = _exact_columns(uploaded_file, escalated)
+        # The pass counted every row, so the row count is exact from here on
+        population, info["rows_estimated"] = exact_rows, False
+
+    scale = population / n if n else 0.0
+    for name, col in by_name.items():
+        if name in escalated:
+            continue
+        _scale_counts(col, scale)
+    for i, col in enumerate(profile["columns"]):
+        if col["column"] in escalated:
+            exact = states[col["column"]].summary(population)
+            exact["exact_pass"] = True
+            profile["columns"][i] = exact
+
+    dup, dup_lo, dup_hi = _duplicate_estimate(sample, n / population if population else 1.0, z, info.get("runs"))
+    top = max(population - 1, 0)
+    dup_hi = min(dup_hi, top)
+    dup = min(dup, dup_hi)
+    dup_lo = min(dup_lo, dup)
+    profile["duplicate_rows"] = int(round(dup))
+    profile["rows"] = population
+    profile["sampling"] = {
+        "method": info["method"],
+        "rows_estimated": info["rows_estimated"],
+        "sample_rows": n,
+        "confidence": confidence,
+        "duplicate_rows_ci": [dup_lo, dup_hi],
+        "escalated": escalated,
+    }
+    return {"profile": profile, "issues": issues_from_profile(profile)}
@@ -0,0 +1,239 @@
+"""
+Small mergeable sketches used by the streaming profiler.
+
+Every sketch can absorb a batch of values with update() and can be folded
+into another sketch of the same shape with merge(), so chunks of a CSV can
+be profiled independently and combined afterwards.
+
+Error bounds (documented in the profile under "streaming"):
+- KLLSketch: normalized rank error of about 2.296 / k**0.9723 (1.3% at
+  k=200, 0.3% at k=1024). Exact while fewer than k values have been seen.
+- HyperLogLog: relative standard error of 1.04 / sqrt(2**p) (0.8% at
+  p=14). Exact up to 64-bit hash collisions while the distinct count stays
+  below the sparse threshold.
+- HeavyHitters: Misra-Gries summary; each reported count undercounts the
+  true count by at most n / (capacity + 1). Exact while the number of
+  distinct values stays below the capacity.
+"""
+from __future__ import annotations
+import math
+from typing import Dict, Any, List
+import numpy as np
+import pandas as pd
+
+def hash_values(values) -> np.ndarray:
+    """
+    Stable 64-bit hashes for a batch of values. Numbers are hashed as
+    float64 so that 5 and 5.0 read in different chunks hash the same.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iufb":
+        arr = arr.astype(np.float64) + 0.0  # fold -0.0 into 0.0
+    return pd.util.hash_array(arr)
+
+class KLLSketch:
+    """
+    Quantile sketch after Karnin, Lang and Liberty (2016). Level h holds
+    items of weight 2**h; full levels are sorted and halved into the next.
+    """
+
+    def __init__(self, k: int = 1024, c: float = 2.0 / 3.0, seed: int = 0):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    @property
+    def rank_error(self) -> float:
+        return 0.0 if self.exact else 2.296 / self.k ** 0.9723
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _compress(self) -> None:
+        while True:
+            for h, items in enumerate(self.levels):
+                if len(items) >= self._capacity(h) and sum(map(len, self.levels)) > self._total_capacity():
+                    break
+            else:
+                return
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            keep = items[-1:] if len(items) % 2 else items[:0]
+            pairs = items[:len(items) - len(keep)]
+            promoted = pairs[int(self._rng.integers(2))::2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def _total_capacity(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.n += int(values.size)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2 ** h, dtype=np.int64) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def percentiles(self, pcts) -> np.ndarray:
+        """
+        Percentiles (0-100). Exact linear interpolation while the sketch is
+        exact, otherwise the weighted item at that rank.
+        """
+        pcts = np.asarray(pcts, dtype=np.float64)
+        if self.n == 0:
+            return np.full(pcts.shape, np.nan)
+        if self.exact:
+            return np.percentile(self.levels[0], pcts)
+        items, cum = self._weighted()
+        idx = np.searchsorted(cum, pcts / 100 * cum[-1], side="left")
+        return items[np.minimum(idx, len(items) - 1)]
+
+    def count_outside(self, lower: float, upper: float) -> int:
+        """
+        Number of values strictly below lower or strictly above upper.
+        """
+        if self.n == 0:
+            return 0
+        if self.exact:
+            v = self.levels[0]
+            return int(((v < lower) | (v > upper)).sum())
+        items, cum = self._weighted()
+        total = int(cum[-1])
+        lo = np.searchsorted(items, lower, side="left")
+        hi = np.searchsorted(items, upper, side="right")
+        below = int(cum[lo - 1]) if lo > 0 else 0
+        at_or_below_upper = int(cum[hi - 1]) if hi > 0 else 0
+        # Bounds can cross (lower > upper); a value is then counted once.
+        if lower > upper:
+            return total
+        return below + (total - at_or_below_upper)
+
+class HyperLogLog:
+    """
+    Distinct counter. Keeps the exact set of hashes until it grows past
+    sparse_limit, then switches to 2**p registers.
+    """
+
+    def __init__(self, p: int = 14, sparse_limit: int = 4096):
+        self.p = p
+        self.sparse_limit = sparse_limit
+        self.sparse: np.ndarray | None = np.empty(0, dtype=np.uint64)
+        self.registers: np.ndarray | None = None
+
+    @property
+    def exact(self) -> bool:
+        return self.sparse is not None
+
+    @property
+    def relative_error(self) -> float:
+        return 0.0 if self.exact else 1.04 / math.sqrt(1 << self.p)
+
+    def _to_dense(self) -> None:
+        self.registers = np.zeros(1 << self.p, dtype=np.uint8)
+        self._fold(self.sparse)
+        self.sparse = None
+
+    def _fold(self, hashes: np.ndarray) -> None:
+        if hashes.size == 0:
+            return
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # rest < 2**53 converts to float exactly, so frexp gives its bit length
+        _, bits = np.frexp(rest.astype(np.float64))
+        rank = (64 - self.p) - bits + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        if self.sparse is not None:
+            self.sparse = np.union1d(self.sparse, hashes)
+            if self.sparse.size > self.sparse_limit:
+                self._to_dense()
+        else:
+            self._fold(hashes)
+
+    def update(self, values) -> None:
+        self.update_hashes(hash_values(values))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.sparse is not None:
+            self.update_hashes(other.sparse)
+            return
+        if self.sparse is not None:
+            self._to_dense()
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        if self.sparse is not None:
+            return int(self.sparse.size)
+        m = float(1 << self.p)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * math.log(m / zeros)
+        return int(round(est))
+
+class HeavyHitters:
+    """
+    Misra-Gries frequent items summary over exact per-chunk value counts.
+    Keys keep first-seen order so ties break like pandas value_counts.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.n = 0
+        self.decremented = 0
+
+    @property
+    def exact(self) -> bool:
+        return self.decremented == 0
+
+    @property
+    def max_error(self) -> int:
+        return self.decremented
+
+    def _update_counts(self, items, n: int) -> None:
+        for key, cnt in items:
+            self.counts[key] = self.counts.get(key, 0) + int(cnt)
+        self.n += n
+        if len(self.counts) > self.capacity:
+            cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+            self.decremented += cut
+            self.counts = {k: v - cut for k, v in self.counts.items() if v > cut}
+
+    def update(self, series: pd.Series) -> None:
+        vc = series.value_counts(dropna=True, sort=False)
+        self._update_counts(vc.items(), int(vc.sum()))
+
+    def merge(self, other: "HeavyHitters") -> None:
+        self.decremented += other.decremented
+        self._update_counts(other.counts.items(), other.n)
+
+    def top(self, n: int = 5) -> Dict[Any, int]:
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return dict(ranked[:n])
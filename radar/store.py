@@ -0,0 +1,167 @@
+"""
+Local store of profiles for drift comparison. Each saved run_checks result
+is one row of a SQLite table indexed by dataset name and time, holding the
+profile, its issues and the radar.drift sketches as zlib-compressed JSON
+(a few KB per column at most), so comparing any two uploads never touches
+their CSVs:
+
+    store = ProfileStore()
+    store.save("orders", report, df)
+    issues = store.drift_issues("orders")   # latest upload vs the one before
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+import pandas as pd
+
+from core.cache import default_cache_dir
+from radar.drift import compare_profiles, drift_issues, profile_sketches
+
+# Bump when the payload layout changes; older rows are skipped, not misread
+_PAYLOAD_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset TEXT NOT NULL,
+    created REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_dataset_created ON profiles (dataset, created);
+"""
+
+def default_store_path() -> str:
+    return os.environ.get("DQR_PROFILE_STORE") or os.path.join(default_cache_dir(), "profiles.sqlite")
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+class ProfileStore:
+    """
+    A connection is opened per call, so one store object can be shared
+    across threads and several processes can write to the same file.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or default_store_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, dataset: str, report: Dict[str, Any], df: pd.DataFrame | None = None,
+             created: float | None = None) -> int:
+        """
+        Store a run_checks report under dataset and return its id. With df
+        the drift sketches are computed from it; without, later comparisons
+        only cover the schema and missingness.
+        """
+        profile = report["profile"]
+        record = {
+            "profile": profile,
+            "issues": report.get("issues", []),
+            "sketches": profile_sketches(df) if df is not None else {},
+        }
+        payload = zlib.compress(json.dumps(record, default=str).encode("utf-8"))
+        with self._connect() as con:
+            cur = con.execute(
+                "INSERT INTO profiles (dataset, created, rows, cols, version, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                (dataset, time.time() if created is None else created, profile["rows"], profile["cols"],
+                 _PAYLOAD_VERSION, payload),
+            )
+            return int(cur.lastrowid)
+
+    def _record(self, row) -> Dict[str, Any]:
+        pid, dataset, created, payload = row
+        record = json.loads(zlib.decompress(payload).decode("utf-8"))
+        record.update(id=pid, dataset=dataset, created=_iso(created))
+        return record
+
+    def get(self, profile_id: int) -> Dict[str, Any]:
+        """
+        The stored record: {"id", "dataset", "created", "profile", "issues", "sketches"}.
+        """
+        with self._connect() as con:
+            row = con.execute("SELECT id, dataset, created, payload FROM profiles WHERE id = ? AND version = ?",
+                              (profile_id, _PAYLOAD_VERSION)).fetchone()
+        if row is None:
+            raise KeyError(profile_id)
+        return self._record(row)
+
+    def history(self, dataset: str, limit: int | None = None) -> List[Dict[str, Any]]:
+        """
+        Newest first: {"id", "created", "rows", "cols"} without the payloads.
+        """
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT id, created, rows, cols FROM profiles WHERE dataset = ? AND version = ? "
+                "ORDER BY created DESC, id DESC LIMIT ?",
+                (dataset, _PAYLOAD_VERSION, -1 if limit is None else limit),
+            ).fetchall()
+        return [{"id": i, "created": _iso(c), "rows": r, "cols": n} for i, c, r, n in rows]
+
+    def datasets(self) -> List[str]:
+        with self._connect() as con:
+            return [d for (d,) in con.execute("SELECT DISTINCT dataset FROM profiles ORDER BY dataset")]
+
+    def latest(self, dataset: str, before: int | None = None) -> Dict[str, Any] | None:
+        """
+        The newest record of dataset, or the newest saved before the record
+        with id before; None when there is none.
+        """
+        query = "SELECT id, dataset, created, payload FROM profiles WHERE dataset = ? AND version = ?"
+        args: list = [dataset, _PAYLOAD_VERSION]
+        if before is not None:
+            query += " AND (created, id) < (SELECT created, id FROM profiles WHERE id = ?)"
+            args.append(before)
+        with self._connect() as con:
+            row = con.execute(query + " ORDER BY created DESC, id DESC LIMIT 1", args).fetchone()
+        return None if row is None else self._record(row)
+
+    def delete(self, dataset: str, keep: int = 0) -> int:
+        """
+        Drop all but the newest keep records of dataset; returns how many went.
+        """
+        with self._connect() as con:
+            cur = con.execute(
+                "DELETE FROM profiles WHERE dataset = ? AND id NOT IN "
+                "(SELECT id FROM profiles WHERE dataset = ? ORDER BY created DESC, id DESC LIMIT ?)",
+                (dataset, dataset, keep),
+            )
+            return cur.rowcount
+
+    def drift(self, dataset: str, current: int | None = None, reference: int | None = None) -> Dict[str, Any] | None:
+        """
+        compare_profiles between two stored records of dataset: by default
+        the latest and the one saved just before it. None when fewer than
+        two records exist. The result names both records under "reference"
+        and "current".
+        """
+        cur = self.get(current) if current is not None else self.latest(dataset)
+        if cur is None:
+            return None
+        ref = self.get(reference) if reference is not None else self.latest(dataset, before=cur["id"])
+        if ref is None:
+            return None
+        result = compare_profiles(ref, cur)
+        result["reference"] = {"id": ref["id"], "created": ref["created"]}
+        result["current"] = {"id": cur["id"], "created": cur["created"]}
+        return result
+
+    def drift_issues(self, dataset: str, current: int | None = None, reference: int | None = None) -> List[Dict[str, Any]]:
+        """
+        drift() phrased as issues; empty when there is nothing to compare.
+        """
+        result = self.drift(dataset, current=current, reference=reference)
+        return drift_issues(result) if result is not None else []
@@ -0,0 +1,284 @@
+from __future__ import annotations
+from typing import Dict, Any, Iterable
+import numpy as np
+import pandas as pd
+
+from core.io import iter_csv
+from radar.coerce import infer_kind, unparseable
+from radar.dq_checks import TOP_VALUES, _is_numeric, _is_datetime, _outlier_bounds, issues_from_profile
+from radar.sketches import KLLSketch, HyperLogLog, HeavyHitters
+
+def _merge_dtype(a: str | None, b: str) -> str:
+    if a is None or a == b:
+        return b
+    try:
+        da, db = np.dtype(a), np.dtype(b)
+    except TypeError:
+        return "object"
+    if da.kind in "iuf" and db.kind in "iuf":
+        return str(np.result_type(da, db))
+    return "object"
+
+class RowHashSet:
+    """
+    Exact duplicate-row counter over chunks, keyed by 64-bit row hashes.
+    Hashes are kept in sorted runs, each at least twice as long as the next
+    one; a new chunk's run merges into the runs it outgrows, so every hash
+    is moved O(log rows) times in all instead of once per chunk.
+    """
+
+    def __init__(self):
+        self._runs: list = []
+
+    @property
+    def seen(self) -> np.ndarray:
+        """
+        Every hash added so far, sorted.
+        """
+        if len(self._runs) > 1:
+            self._runs = [np.sort(np.concatenate(self._runs), kind="stable")]
+        return self._runs[0] if self._runs else np.empty(0, dtype=np.uint64)
+
+    def add(self, chunk: pd.DataFrame) -> int:
+        norm = chunk.copy(deep=False)
+        for col in norm.columns:
+            if pd.api.types.is_numeric_dtype(norm[col]):
+                norm[col] = norm[col].astype("float64") + 0.0
+        hashes = pd.util.hash_pandas_object(norm, index=False).to_numpy()
+        unique, inverse = np.unique(hashes, return_inverse=True)
+        known = self.contains(unique)
+        self._insert(unique[~known])
+        return int((pd.Series(hashes).duplicated().to_numpy() | known[inverse]).sum())
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        # Binary search keeps the cost proportional to the chunk, not to every row seen;
+        # sorted hashes (as add and merge pass) walk each run in order
+        hit = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, hashes)
+            found = pos < len(run)
+            found[found] = run[pos[found]] == hashes[found]
+            hit |= found
+        return hit
+
+    def _insert(self, run: np.ndarray) -> None:
+        """
+        Add sorted hashes that aren't in the set yet.
+        """
+        # Runs are disjoint and sorted, so a stable sort of two of them is a linear merge
+        while self._runs and len(self._runs[-1]) <= 2 * len(run):
+            run = np.sort(np.concatenate([self._runs.pop(), run]), kind="stable")
+        if len(run):
+            self._runs.append(run)
+
+    def merge(self, other: "RowHashSet") -> None:
+        theirs = other.seen
+        self._insert(theirs[~self.contains(theirs)])
+
+class ColumnState:
+    """
+    Mergeable per-column profile state: exact counts and moments plus
+    sketches for quantiles, distinct values and frequent items.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.dtype: str | None = None
+        self.kind: str | None = None
+        self.missing = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.quantiles = KLLSketch()
+        self.distinct = HyperLogLog()
+        self.top = HeavyHitters()
+        # What a text column really holds, guessed from its first non-empty
+        # chunk, and the cells of later chunks that don't parse as that
+        self.inferred: str | None = None
+        self.unparseable = 0
+
+    def _set_kind(self, kind: str) -> None:
+        if self.kind is None:
+            self.kind = kind
+        elif self.kind != kind:
+            # Mixed chunks parse to object in a full read; numeric state no longer applies.
+            self.kind = "other"
+
+    def _fold_moments(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 = self.m2 + m2 + delta * delta * self.count * count / total
+        self.mean = self.mean + delta * count / total
+        self.count = total
+
+    def update(self, s: pd.Series) -> None:
+        self.dtype = _merge_dtype(self.dtype, str(s.dtype))
+        self.missing += int(s.isna().sum())
+        if _is_numeric(s):
+            self._set_kind("numeric")
+            v = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            v = v[~np.isnan(v)]
+            self.distinct.update(v)
+            if v.size == 0 or self.kind != "numeric":
+                return
+            with np.errstate(invalid="ignore"):
+                mean = float(v.mean())
+                m2 = float(((v - mean) ** 2).sum())
+            self._fold_moments(int(v.size), mean, m2)
+            lo, hi = float(v.min()), float(v.max())
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+            self.quantiles.update(v)
+        elif _is_datetime(s):
+            self._set_kind("datetime")
+            v = s.dropna()
+            self.distinct.update(v.to_numpy().view("int64"))
+            if v.empty or self.kind != "datetime":
+                return
+            lo, hi = v.min(), v.max()
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+        else:
+            self._set_kind("other")
+            v = s.dropna()
+            self.distinct.update(v.to_numpy(dtype=object))
+            if self.inferred is None and not v.empty:
+                self.inferred = infer_kind(v)
+            if self.inferred not in (None, "text"):
+                self.unparseable += int(unparseable(v, self.inferred, cache=False).sum())
+        if self.kind == "other":
+            self.top.update(s)
+
+    def merge(self, other: "ColumnState") -> None:
+        if other.dtype is not None:
+            self.dtype = _merge_dtype(self.dtype, other.dtype)
+        if other.kind is not None:
+            self._set_kind(other.kind)
+        self.missing += other.missing
+        if self.inferred is None:
+            self.inferred = other.inferred
+        elif other.inferred not in (None, self.inferred):
+            # Parts disagree on what the column holds; claim nothing
+            self.inferred = "text"
+        self.unparseable += other.unparseable
+        if other.count:
+            self._fold_moments(other.count, other.mean, other.m2)
+        for attr, pick in (("min", min), ("max", max)):
+            ours, theirs = getattr(self, attr), getattr(other, attr)
+            if theirs is not None:
+                setattr(self, attr, theirs if ours is None else pick(ours, theirs))
+        self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self.top.merge(other.top)
+
+    def summary(self, n_rows: int) -> Dict[str, Any]:
+        info = {
+            "column": self.name,
+            "dtype": self.dtype,
+            "missing": self.missing,
+            "missing_pct": (self.missing / n_rows * 100) if n_rows else 0.0,
+            "unique": self.distinct.count(),
+        }
+        has = self.count > 0
+        if self.kind == "numeric":
+            p05, q1, q3, p95 = self.quantiles.percentiles([5, 25, 75, 95])
+            info.update({
+                "min": float(self.min) if has else None,
+                "max": float(self.max) if has else None,
+                "mean": float(self.mean) if has else None,
+                "std": float(np.sqrt(self.m2 / self.count)) if has else None,
+                "p95": float(p95) if has else None,
+                "p05": float(p05) if has else None,
+            })
+            lower, upper, iqr = _outlier_bounds(q1, q3)
+            if not np.isnan(iqr) and iqr > 0:
+                info["outliers_iqr"] = self.quantiles.count_outside(lower, upper)
+            else:
+                info["outliers_iqr"] = 0
+        elif self.kind == "datetime":
+            info.update({
+                "min_date": str(self.min) if self.min is not None else None,
+                "max_date": str(self.max) if self.max is not None else None,
+            })
+        else:
+            info["top_values"] = self.top.top(TOP_VALUES)
+            if self.inferred not in (None, "text"):
+                info["inferred_type"] = self.inferred
+                info["unparseable"] = self.unparseable
+        return info
+
+class ProfileState:
+    """
+    Mergeable state behind a streaming profile. Fold chunks in with update(),
+    combine partial states with merge(), and call profile() for the same dict
+    basic_profile returns.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.duplicate_rows = 0
+        self.hashes = RowHashSet()
+        self.columns: Dict[Any, ColumnState] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        self.chunks += 1
+        self.duplicate_rows += self.hashes.add(chunk)
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnState(col)
+            self.columns[col].update(chunk[col])
+
+    def merge(self, other: "ProfileState") -> None:
+        # Rows of other that repeat rows already seen here become duplicates too.
+        self.duplicate_rows += other.duplicate_rows + int(self.hashes.contains(other.hashes.seen).sum())
+        self.hashes.merge(other.hashes)
+        self.rows += other.rows
+        self.chunks += other.chunks
+        for col, state in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(state)
+            else:
+                self.columns[col] = state
+
+    def profile(self) -> Dict[str, Any]:
+        cols = list(self.columns.values())
+        return {
+            "rows": self.rows,
+            "cols": len(cols),
+            "duplicate_rows": self.duplicate_rows,
+            "columns": [c.summary(self.rows) for c in cols],
+            "streaming": {
+                "chunks": self.chunks,
+                "error_bounds": {
+                    # Normalized rank error of p05/p95 and the IQR outlier bounds
+                    "quantile_rank": max((c.quantiles.rank_error for c in cols), default=0.0),
+                    # Relative standard error of "unique"
+                    "unique_relative": max((c.distinct.relative_error for c in cols), default=0.0),
+                    # Largest possible undercount of any "top_values" count
+                    "top_values_count": max((c.top.max_error for c in cols), default=0),
+                },
+            },
+        }
+
+def stream_profile(chunks: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Profile an iterable of DataFrame chunks in bounded memory.
+    Counts, missingness, min/max, mean/std and duplicate rows are exact
+    (duplicates up to 64-bit hash collisions); quantiles, outlier counts,
+    unique and top_values come from sketches, see "streaming.error_bounds".
+    Text columns get inferred_type from their first chunk and an exact
+    unparseable count, as in basic_profile.
+    """
+    state = ProfileState()
+    for chunk in chunks:
+        state.update(chunk)
+    return state.profile()
+
+def run_checks_streaming(uploaded_file, chunksize: int = 100_000, workers: int | None = None) -> Dict[str, Any]:
+    profile = stream_profile(iter_csv(uploaded_file, chunksize=chunksize, workers=workers))
+    issues = issues_from_profile(profile)
+    return {"profile": profile, "issues": issues}